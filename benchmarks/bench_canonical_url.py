@@ -0,0 +1,110 @@
+# benchmarks/bench_canonical_url.py
+"""Benchmark kanonisasi URL (src.utils.canonical_url) pada korpus bentuk URL.
+
+Korpus dibangkitkan dari bentuk-bentuk URL yang dipakai di YouTube, TikTok dan Instagram
+(subdomain, path, parameter pelacak) dengan ID acak; bukan log URL pengguna sungguhan.
+Setiap URL diperiksa terhadap ID yang diharapkan. Jalankan dari root proyek:
+
+    python -m benchmarks.bench_canonical_url --count 200000
+"""
+import argparse
+import random
+import string
+import time
+from src.utils import canonical_url
+
+YOUTUBE_SHAPES = [
+    "https://www.youtube.com/watch?v={id}",
+    "https://youtube.com/watch?v={id}&t=42s",
+    "https://m.youtube.com/watch?feature=share&v={id}",
+    "https://music.youtube.com/watch?v={id}&list=RDAMVM{id}",
+    "https://www.youtube.com/watch?v={id}&list=PL0123456789&index=3",
+    "http://www.youtube.com/watch?v={id}",
+    "https://WWW.YouTube.com/watch?v={id}",
+    "https://youtu.be/{id}",
+    "https://youtu.be/{id}?si=AbCdEfGhIjKlMnOp",
+    "https://youtu.be/{id}?t=10",
+    "https://www.youtube.com/shorts/{id}",
+    "https://youtube.com/shorts/{id}?feature=share",
+    "https://www.youtube.com/embed/{id}?autoplay=1",
+    "https://www.youtube-nocookie.com/embed/{id}",
+    "https://www.youtube.com/live/{id}?si=xyz",
+    "https://www.youtube.com/attribution_link?u=/watch%3Fv%3D{id}%26feature%3Dshare",
+]
+TIKTOK_SHAPES = [
+    "https://www.tiktok.com/@{user}/video/{id}",
+    "https://www.tiktok.com/@{user}/video/{id}?is_from_webapp=1&sender_device=pc",
+    "https://m.tiktok.com/v/{id}.html",
+    "https://www.tiktok.com/embed/v2/{id}",
+    "https://tiktok.com/@{user}/photo/{id}?lang=id-ID",
+]
+INSTAGRAM_SHAPES = [
+    "https://www.instagram.com/p/{id}/",
+    "https://www.instagram.com/reel/{id}/?igsh=MWQ1ZGUxMzBkMA==",
+    "https://instagram.com/reels/{id}",
+    "https://www.instagram.com/tv/{id}/?utm_source=ig_web_copy_link",
+    "https://www.instagram.com/{user}/p/{id}/",
+]
+OTHER_SHAPES = [
+    "https://vm.tiktok.com/ZM{short}/",
+    "https://www.tiktok.com/t/ZT{short}/",
+    "https://example.com/watch?v={short}",
+    "https://www.youtube.com/@{user}",
+]
+
+def _random_token(alphabet: str, length: int) -> str:
+    return "".join(random.choices(alphabet, k=length))
+
+def build_corpus(count: int) -> list:
+    """[(url, (platform, id) yang diharapkan atau None)]"""
+    yt_alphabet = string.ascii_letters + string.digits + "-_"
+    corpus = []
+    for _ in range(count):
+        user = _random_token(string.ascii_lowercase + "._", 8)
+        short = _random_token(string.ascii_letters + string.digits, 7)
+        roll = random.random()
+        if roll < 0.5:
+            video_id = _random_token(yt_alphabet, 11)
+            corpus.append((random.choice(YOUTUBE_SHAPES).format(id=video_id, user=user), ("youtube", video_id)))
+        elif roll < 0.75:
+            video_id = str(random.randrange(10**18, 10**19))
+            corpus.append((random.choice(TIKTOK_SHAPES).format(id=video_id, user=user), ("tiktok", video_id)))
+        elif roll < 0.95:
+            video_id = _random_token(yt_alphabet, 11)
+            corpus.append((random.choice(INSTAGRAM_SHAPES).format(id=video_id, user=user), ("instagram", video_id)))
+        else:
+            corpus.append((random.choice(OTHER_SHAPES).format(short=short, user=user), None))
+    return corpus
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=200_000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    corpus = build_corpus(args.count)
+    urls = [url for url, _ in corpus]
+
+    canonical_url._parse.cache_clear()
+    started = time.perf_counter()
+    results = [canonical_url.canonicalize(url) for url in urls]
+    cold = time.perf_counter() - started
+
+    # Link populer yang dikirim berulang: 1000 URL teratas diulang sebanyak ukuran korpus
+    hot_urls = (urls[:1000] * (len(urls) // 1000 + 1))[:len(urls)]
+    started = time.perf_counter()
+    for url in hot_urls:
+        canonical_url.canonicalize(url)
+    warm = time.perf_counter() - started
+
+    wrong = [(url, expected, got) for (url, expected), got in zip(corpus, results) if expected != got]
+    short_links = sum(canonical_url.is_short_link(url) for url in urls)
+    print(f"URL: {len(urls)}, benar: {len(urls) - len(wrong)}, salah: {len(wrong)}, link pendek (perlu resolve): {short_links}")
+    print(f"cold: {cold:.2f} dtk ({len(urls) / cold:,.0f} URL/dtk, {cold / len(urls) * 1e6:.1f} µs/URL)")
+    print(f"warm (1000 URL berulang, lru_cache): {warm:.2f} dtk ({len(urls) / warm:,.0f} URL/dtk)")
+    for url, expected, got in wrong[:10]:
+        print(f"  SALAH {url}: harap {expected}, dapat {got}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+# benchmarks/bench_format_shaping.py
+"""Benchmark offline pembentukan menu format YouTube dari fixture info dict.
+
+Mengukur youtube.shape_video_formats, youtube.shape_audio_formats,
+keyboard.build_video_resolution_menu dan keyboard.build_format_menu untuk setiap fixture di
+benchmarks/fixtures/ (lihat benchmarks/info_fixtures.py), tanpa akses jaringan. Hasil dicocokkan
+dengan keluaran golden; waktu dan alokasi dibandingkan dengan baseline lokal. Keluar dengan
+kode 1 jika ada hasil yang berubah atau regresi. Jalankan dari root proyek:
+
+    python -m benchmarks.bench_format_shaping --save-baseline   # sekali, di mesin yang sama
+    python -m benchmarks.bench_format_shaping
+    python -m benchmarks.bench_format_shaping --update-golden   # setelah perubahan yang disengaja
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from src.service import youtube
+from src.telegram import keyboard
+from benchmarks.info_fixtures import load_fixtures
+
+GOLDEN_DIR = os.path.join(os.path.dirname(__file__), 'golden')
+# Waktu bergantung mesin: baseline disimpan lokal, tidak ikut di-commit
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'format_shaping_baseline.json')
+PLATFORM = 'youtube'
+
+def _menu_rows(markup) -> list | None:
+    if markup is None:
+        return None
+    return [[button.text, button.callback_data] for row in markup.inline_keyboard for button in row]
+
+def build_cases(info: dict) -> dict:
+    """nama kasus -> fungsi tanpa argumen. Menu memakai salinan daftar karena keyboard mengurutkannya di tempat."""
+    url = info['webpage_url']
+    video_formats = youtube.shape_video_formats(info, url)
+    audio_formats = youtube.shape_audio_formats(info)
+    return {
+        'video_formats': lambda: youtube.shape_video_formats(info, url),
+        'audio_formats': lambda: youtube.shape_audio_formats(info),
+        'video_menu': lambda: _menu_rows(keyboard.build_video_resolution_menu(list(video_formats or []), PLATFORM)),
+        'format_menu': lambda: _menu_rows(keyboard.build_format_menu(
+            list(video_formats or []), list(audio_formats or []), PLATFORM)),
+    }
+
+def time_case(func, min_seconds: float, repeat: int) -> float:
+    """Waktu per panggilan (mikrodetik), yang terbaik dari beberapa putaran."""
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_seconds / repeat:
+            break
+        loops *= 2
+    best = elapsed / loops
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        best = min(best, (time.perf_counter() - started) / loops)
+    return best * 1_000_000
+
+def measure_allocations(func) -> dict:
+    """Puncak memori dan jumlah blok yang dialokasikan selama satu panggilan."""
+    tracemalloc.start()
+    try:
+        before_current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        snapshot_before = tracemalloc.take_snapshot()
+        result = func()
+        _, peak = tracemalloc.get_traced_memory()
+        snapshot_after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in snapshot_after.compare_to(snapshot_before, 'filename') if stat.count_diff > 0)
+    del result
+    return {'peak_kb': round((peak - before_current) / 1024, 1), 'blocks': blocks}
+
+def _golden_path(fixture: str) -> str:
+    return os.path.join(GOLDEN_DIR, f"{fixture}.json")
+
+def check_golden(fixture: str, outputs: dict, update: bool) -> list:
+    """Daftar nama kasus yang keluarannya berbeda dari golden."""
+    path = _golden_path(fixture)
+    if update or not os.path.exists(path):
+        os.makedirs(GOLDEN_DIR, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(outputs, f, ensure_ascii=False, indent=1, sort_keys=True)
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        golden = json.load(f)
+    # Bandingkan lewat JSON agar tuple/list dan key int/str diperlakukan sama seperti saat disimpan
+    actual = json.loads(json.dumps(outputs, ensure_ascii=False))
+    return [case for case in sorted(set(golden) | set(actual)) if golden.get(case) != actual.get(case)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--fixtures', nargs='*', help="Hanya fixture tertentu (nama tanpa .json)")
+    parser.add_argument('--min-seconds', type=float, default=0.3, help="Waktu minimal pengukuran per kasus")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--update-golden', action='store_true')
+    parser.add_argument('--time-tolerance', type=float, default=1.5, help="Regresi jika waktu > baseline x nilai ini")
+    parser.add_argument('--alloc-tolerance', type=float, default=1.10, help="Regresi jika puncak memori > baseline x nilai ini")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures)
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    results = {}
+    mismatches = []
+    regressions = []
+    print(f"{'fixture':<22} {'format':>6} {'kasus':<14} {'us/panggil':>11} {'puncak KB':>10} {'blok':>6} {'vs baseline':>12}")
+    for fixture, info in fixtures.items():
+        cases = build_cases(info)
+        outputs = {case: func() for case, func in cases.items()}
+        mismatches += [f"{fixture}/{case}" for case in check_golden(fixture, outputs, args.update_golden)]
+        for case, func in cases.items():
+            name = f"{fixture}/{case}"
+            micros = time_case(func, args.min_seconds, args.repeat)
+            allocations = measure_allocations(func)
+            results[name] = {'us': round(micros, 2), **allocations}
+            note = ''
+            previous = baseline.get(name)
+            if previous:
+                ratio = micros / previous['us']
+                note = f"{ratio:.2f}x"
+                if ratio > args.time_tolerance:
+                    regressions.append(f"{name}: waktu {previous['us']:.1f} -> {micros:.1f} us")
+                    note += ' WAKTU!'
+                if allocations['peak_kb'] > previous['peak_kb'] * args.alloc_tolerance + 1:
+                    regressions.append(f"{name}: puncak memori {previous['peak_kb']} -> {allocations['peak_kb']} KB")
+                    note += ' MEM!'
+            print(f"{fixture:<22} {len(info.get('formats') or []):>6} {case:<14} {micros:>11.1f} "
+                  f"{allocations['peak_kb']:>10.1f} {allocations['blocks']:>6} {note:>12}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+        print(f"Baseline disimpan ke {args.baseline}.")
+    elif not baseline:
+        print("Belum ada baseline; jalankan dengan --save-baseline untuk mendeteksi regresi.")
+    for mismatch in mismatches:
+        print(f"GOLDEN BERBEDA: {mismatch}")
+    for regression in regressions:
+        print(f"REGRESI: {regression}")
+    if mismatches or regressions:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+# benchmarks/bench_local_bot_api.py
+"""Benchmark unggah Bot API: multipart biasa vs local mode (path file) terhadap server tiruan lokal.
+
+Server tiruan menjawab getMe/sendVideo seperti telegram-bot-api. Pada local mode ia menerima
+URI file:// dan membaca file dari disk sendiri, seperti server --local sungguhan. Diukur: waktu,
+byte yang lewat HTTP dan puncak memori Python (tracemalloc) selama send_video.
+Jalankan dari root proyek:
+
+    python -m benchmarks.bench_local_bot_api --size-mb 256
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+import urllib.parse
+from telegram import Bot
+from telegram.request import HTTPXRequest
+from src.telegram.handlers import upload_source
+
+TOKEN = '123456:BENCH'
+
+def _result(method: str, received: dict) -> dict:
+    if method == 'getMe':
+        return {'id': 123456, 'is_bot': True, 'first_name': 'Bench', 'username': 'bench_bot'}
+    if method in ('sendVideo', 'sendAudio'):
+        media_key = 'video' if method == 'sendVideo' else 'audio'
+        media = {'file_id': f"BENCH{received['requests']}", 'file_unique_id': 'U', 'duration': 0}
+        if media_key == 'video':
+            media.update(width=0, height=0)
+        return {'message_id': received['requests'], 'date': 0, 'chat': {'id': 1, 'type': 'private'}, media_key: media}
+    return True
+
+def _local_path(body: bytes, content_type: str) -> str | None:
+    """Path dari parameter file://, jika request memakai local mode."""
+    if 'json' in content_type:
+        params = json.loads(body or b'{}')
+    else:
+        params = dict(urllib.parse.parse_qsl(body.decode('latin-1')))
+    for value in params.values():
+        if isinstance(value, str) and value.startswith('file://'):
+            return urllib.parse.unquote(value[len('file://'):])
+    return None
+
+async def _handle(reader, writer, received: dict):
+    try:
+        head = await reader.readuntil(b'\r\n\r\n')
+        request_line, *header_lines = head.decode('latin-1').split('\r\n')
+        headers = {line.split(':', 1)[0].lower(): line.split(':', 1)[1].strip() for line in header_lines if ':' in line}
+        method = request_line.split(' ')[1].rsplit('/', 1)[-1]
+        content_type = headers.get('content-type', '')
+        remaining = int(headers.get('content-length', 0))
+        received['requests'] += 1
+        received['body_bytes'] += remaining
+        if 'multipart' in content_type:
+            # Dibuang per potongan agar server tiruan tidak ikut menahan file di memori
+            boundary = content_type.split('boundary=', 1)[1].strip('"').encode('latin-1')
+            tail = b''
+            while remaining:
+                chunk = await reader.readexactly(min(remaining, 256 * 1024))
+                remaining -= len(chunk)
+                tail = (tail + chunk)[-len(boundary) - 8:]
+            assert tail.rstrip(b'\r\n').endswith(b'--' + boundary + b'--'), "Body multipart terpotong"
+            body = b''
+        else:
+            body = await reader.readexactly(remaining)
+        if method in ('sendVideo', 'sendAudio') and 'multipart' not in content_type:
+            path = _local_path(body, content_type)
+            # Server --local membaca sendiri file dari disk
+            with open(path, 'rb') as f:
+                while f.read(1024 * 1024):
+                    pass
+            received['local_reads'] += 1
+        payload = json.dumps({'ok': True, 'result': _result(method, received)}).encode('utf-8')
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                     b"Content-Length: " + str(len(payload)).encode() + b"\r\nConnection: close\r\n\r\n" + payload)
+        await writer.drain()
+    finally:
+        writer.close()
+
+async def run_once(file_path: str, local_mode: bool) -> dict:
+    received = {'requests': 0, 'body_bytes': 0, 'local_reads': 0}
+    server = await asyncio.start_server(lambda r, w: _handle(r, w, received), '127.0.0.1', 0)
+    base = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+    request = HTTPXRequest(read_timeout=None, write_timeout=None, connect_timeout=None, pool_timeout=None)
+    bot = Bot(TOKEN, base_url=f"{base}/bot", base_file_url=f"{base}/file/bot", local_mode=local_mode, request=request)
+    async with bot:
+        received['body_bytes'] = 0
+        tracemalloc.start()
+        started = time.perf_counter()
+        with upload_source(file_path, local_mode=local_mode) as media:
+            message = await bot.send_video(chat_id=1, video=media, supports_streaming=True, write_timeout=None)
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    server.close()
+    await server.wait_closed()
+    assert message.video.file_id.startswith('BENCH')
+    return {'seconds': elapsed, 'body_bytes': received['body_bytes'], 'peak_bytes': peak, 'local_reads': received['local_reads']}
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size-mb', type=int, default=256)
+    args = parser.parse_args()
+    size = args.size_mb * 1024 * 1024
+    with tempfile.NamedTemporaryFile(suffix='.mp4') as tmp:
+        chunk = os.urandom(1024 * 1024)
+        for _ in range(args.size_mb):
+            tmp.write(chunk)
+        tmp.flush()
+        print(f"{'mode':<10} {'detik':>8} {'MB lewat HTTP':>14} {'puncak MB Python':>17}")
+        for local_mode in (False, True):
+            result = await run_once(tmp.name, local_mode)
+            if local_mode:
+                assert result['local_reads'] == 1, "Server tidak menerima path file"
+            print(f"{'local' if local_mode else 'multipart':<10} {result['seconds']:>8.2f} "
+                  f"{result['body_bytes'] / 1024 / 1024:>14.2f} {result['peak_bytes'] / 1024 / 1024:>17.2f}")
+    print(f"Ukuran file: {size / 1024 / 1024:.0f} MB")
+
+if __name__ == '__main__':
+    asyncio.run(main())
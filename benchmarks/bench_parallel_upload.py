@@ -0,0 +1,85 @@
+# benchmarks/bench_parallel_upload.py
+"""Benchmark mesin unggah paralel terhadap endpoint unggah tiruan lokal.
+
+Server tiruan meniru perilaku MTProto: setiap koneksi hanya punya satu part "in flight",
+dibatasi bandwidth per koneksi dan RTT. Jalankan dari root proyek:
+
+    python -m benchmarks.bench_parallel_upload --size-mb 64 --connections 1 2 4 8
+"""
+import argparse
+import asyncio
+import os
+import struct
+import tempfile
+import time
+from src.service.parallel_upload import PART_SIZE, upload_parts, file_part_reader
+
+HEADER = struct.Struct('!II') # index part, panjang data
+
+async def _handle_connection(reader, writer, bandwidth_bps, rtt, received):
+    try:
+        while True:
+            header = await reader.readexactly(HEADER.size)
+            index, length = HEADER.unpack(header)
+            await reader.readexactly(length)
+            # Waktu transfer per koneksi + RTT, seperti satu SaveBigFilePart yang ditunggu balasannya
+            await asyncio.sleep(length / bandwidth_bps + rtt)
+            received[index] = length
+            writer.write(b'\x01')
+            await writer.drain()
+    except asyncio.IncompleteReadError:
+        pass
+    finally:
+        writer.close()
+
+async def _open_sender(port):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+
+    async def send(index, total_parts, data):
+        writer.write(HEADER.pack(index, len(data)) + data)
+        await writer.drain()
+        if await reader.readexactly(1) != b'\x01':
+            raise RuntimeError(f"Part {index} ditolak")
+    return send, writer
+
+async def run_once(file_path, size, connections, bandwidth_bps, rtt):
+    received = {}
+    server = await asyncio.start_server(
+        lambda r, w: _handle_connection(r, w, bandwidth_bps, rtt, received), '127.0.0.1', 0
+    )
+    port = server.sockets[0].getsockname()[1]
+    opened = [await _open_sender(port) for _ in range(connections)]
+    started = time.perf_counter()
+    total_parts = await upload_parts(file_part_reader(file_path), size, PART_SIZE, [send for send, _ in opened])
+    elapsed = time.perf_counter() - started
+    for _, writer in opened:
+        writer.close()
+        await writer.wait_closed()
+    server.close()
+    await server.wait_closed()
+    await asyncio.sleep(0.1) # Beri waktu handler server menerima EOF
+    assert len(received) == total_parts and sum(received.values()) == size, "Part hilang atau ganda"
+    return elapsed
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size-mb', type=int, default=64)
+    parser.add_argument('--connections', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--bandwidth-mbps', type=float, default=40.0, help="Bandwidth per koneksi (Mbit/s)")
+    parser.add_argument('--rtt-ms', type=float, default=60.0)
+    args = parser.parse_args()
+
+    size = args.size_mb * 1024 * 1024
+    bandwidth_bps = args.bandwidth_mbps * 1_000_000 / 8
+    with tempfile.NamedTemporaryFile(suffix='.bin') as tmp:
+        tmp.write(os.urandom(size))
+        tmp.flush()
+        baseline = None
+        print(f"{'koneksi':>8} {'detik':>8} {'MB/s':>8} {'speedup':>8}")
+        for connections in args.connections:
+            elapsed = await run_once(tmp.name, size, connections, bandwidth_bps, args.rtt_ms / 1000)
+            baseline = baseline or elapsed
+            print(f"{connections:>8} {elapsed:>8.2f} {size / elapsed / 1024 / 1024:>8.2f} {baseline / elapsed:>7.2f}x")
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,127 @@
+# benchmarks/bench_segmented_download.py
+"""Benchmark mesin unduhan: yt-dlp bawaan (satu koneksi) vs segmented (beberapa koneksi per file).
+
+Server HTTP tiruan lokal membatasi kecepatan per koneksi, seperti CDN video yang men-throttle
+tiap koneksi. Ia menyajikan file progresif (mendukung Range) dan playlist HLS berisi potongan
+file yang sama. Setiap hasil unduhan dicek byte demi byte terhadap sumbernya. Jalankan dari root proyek:
+
+    python -m benchmarks.bench_segmented_download --size-mb 32 --rate-mb 4 --connections 1 2 4 8
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from src.service.downloader_base import get_common_ydl_opts
+from src.service.download_engine import ENGINES
+
+SEGMENT_BYTES = 1024 * 1024 # Panjang satu segmen HLS tiruan
+SEND_BYTES = 64 * 1024
+
+class ThrottledServer:
+    """Server tiruan di thread sendiri: /video.mp4 (Range) dan /hls/index.m3u8 + /hls/<n>.ts."""
+
+    def __init__(self, payload: bytes, rate_bytes: int):
+        self.payload = payload
+        self.rate_bytes = rate_bytes
+        self.connections = 0
+        self.loop = asyncio.new_event_loop()
+        self.ready = threading.Event()
+        threading.Thread(target=self._run, daemon=True).start()
+        self.ready.wait()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.server = self.loop.run_until_complete(asyncio.start_server(self._handle, '127.0.0.1', 0))
+        self.base = f"http://127.0.0.1:{self.server.sockets[0].getsockname()[1]}"
+        self.ready.set()
+        self.loop.run_forever()
+
+    def _playlist(self) -> bytes:
+        count = -(-len(self.payload) // SEGMENT_BYTES)
+        lines = ['#EXTM3U', '#EXT-X-VERSION:3', '#EXT-X-TARGETDURATION:2', '#EXT-X-MEDIA-SEQUENCE:0']
+        for i in range(count):
+            lines += ['#EXTINF:2.0,', f"{i}.ts"]
+        lines.append('#EXT-X-ENDLIST')
+        return ('\n'.join(lines) + '\n').encode()
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+            request_line, *header_lines = head.decode('latin-1').split('\r\n')
+            method, path = request_line.split(' ')[:2]
+            headers = {line.split(':', 1)[0].lower(): line.split(':', 1)[1].strip() for line in header_lines if ':' in line}
+            status, content_type, body, extra = '200 OK', 'video/mp4', self.payload, ''
+            if path == '/hls/index.m3u8':
+                content_type, body = 'application/vnd.apple.mpegurl', self._playlist()
+            elif path.startswith('/hls/'):
+                index = int(path.rsplit('/', 1)[1].split('.')[0])
+                content_type, body = 'video/mp2t', self.payload[index * SEGMENT_BYTES:(index + 1) * SEGMENT_BYTES]
+            elif path != '/video.mp4':
+                status, content_type, body = '404 Not Found', 'text/plain', b'not found'
+            elif headers.get('range', '').startswith('bytes='):
+                start, _, end = headers['range'][len('bytes='):].partition('-')
+                start, end = int(start), min(int(end) if end else len(body) - 1, len(body) - 1)
+                status, extra = '206 Partial Content', f"Content-Range: bytes {start}-{end}/{len(body)}\r\n"
+                body = body[start:end + 1]
+            writer.write(f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\n"
+                         f"Accept-Ranges: bytes\r\n{extra}Connection: close\r\n\r\n".encode('latin-1'))
+            if method != 'HEAD':
+                # Batas kecepatan per koneksi
+                for offset in range(0, len(body), SEND_BYTES):
+                    writer.write(body[offset:offset + SEND_BYTES])
+                    await writer.drain()
+                    await asyncio.sleep(SEND_BYTES / self.rate_bytes)
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.server.close)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+def run_case(server: ThrottledServer, folder: str, url: str, engine: str, connections: int) -> dict:
+    ydl_opts = get_common_ydl_opts(output_template=os.path.join(folder, f"{engine}_{connections}_%(id)s.%(ext)s"))
+    ydl_opts['noprogress'] = True
+    download_sync = ENGINES[engine][0]
+    before = server.connections
+    started = time.perf_counter()
+    path = download_sync(url, ydl_opts, connections)
+    elapsed = time.perf_counter() - started
+    with open(path, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    os.remove(path)
+    return {'seconds': elapsed, 'sha256': digest, 'connections_used': server.connections - before}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size-mb', type=int, default=32)
+    parser.add_argument('--rate-mb', type=float, default=4, help="Batas kecepatan per koneksi (MB/dtk)")
+    parser.add_argument('--connections', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+    payload = os.urandom(args.size_mb * 1024 * 1024)
+    expected = hashlib.sha256(payload).hexdigest()
+    server = ThrottledServer(payload, int(args.rate_mb * 1024 * 1024))
+    cases = {'progresif': f"{server.base}/video.mp4", 'hls': f"{server.base}/hls/index.m3u8"}
+    print(f"{'sumber':<10} {'mesin':<10} {'koneksi':>7} {'detik':>7} {'MB/dtk':>7} {'x ytdlp':>8} {'request':>8}")
+    try:
+        with tempfile.TemporaryDirectory() as folder:
+            for name, url in cases.items():
+                baseline = run_case(server, folder, url, 'ytdlp', 1)
+                rows = [('ytdlp', 1, baseline)]
+                rows += [('segmented', n, run_case(server, folder, url, 'segmented', n)) for n in args.connections]
+                for engine, connections, result in rows:
+                    assert result['sha256'] == expected, f"Isi file {name}/{engine}/{connections} berbeda dari sumber"
+                    print(f"{name:<10} {engine:<10} {connections:>7} {result['seconds']:>7.2f} "
+                          f"{args.size_mb / result['seconds']:>7.1f} {baseline['seconds'] / result['seconds']:>8.2f} "
+                          f"{result['connections_used']:>8}")
+    finally:
+        server.close()
+
+if __name__ == '__main__':
+    main()
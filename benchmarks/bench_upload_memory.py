@@ -0,0 +1,88 @@
+# benchmarks/bench_upload_memory.py
+"""Benchmark memori unggah Bot API: file dibaca utuh (cara lama) vs di-stream per potongan.
+
+Setiap kombinasi (mode, ukuran, jumlah unggahan bersamaan) dijalankan di proses terpisah agar
+puncak RSS-nya bersih; unggahan dikirim ke server tiruan dari bench_local_bot_api yang membuang
+body per potongan. Yang dilaporkan adalah kenaikan puncak RSS dan puncak tracemalloc selama
+unggahan. Jalankan dari root proyek:
+
+    python -m benchmarks.bench_upload_memory --size-mb 32 128 512 --concurrency 1 4
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from telegram import Bot
+from telegram.request import HTTPXRequest
+from src.telegram.handlers import upload_source
+from benchmarks.bench_local_bot_api import TOKEN, _handle
+
+def _max_rss_bytes() -> int:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 # Linux: KiB
+
+async def _send(bot: Bot, file_path: str, mode: str):
+    if mode == 'buffered':
+        # Perilaku sebelumnya: handle diteruskan ke send_video dan PTB membaca seluruh isinya
+        with open(file_path, 'rb') as f:
+            return await bot.send_video(chat_id=1, video=f, supports_streaming=True, write_timeout=None)
+    with upload_source(file_path, local_mode=False) as media:
+        return await bot.send_video(chat_id=1, video=media, supports_streaming=True, write_timeout=None)
+
+async def child(mode: str, file_path: str, concurrency: int) -> dict:
+    received = {'requests': 0, 'body_bytes': 0, 'local_reads': 0}
+    server = await asyncio.start_server(lambda r, w: _handle(r, w, received), '127.0.0.1', 0)
+    base = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+    request = HTTPXRequest(read_timeout=None, write_timeout=None, connect_timeout=None, pool_timeout=None,
+                           connection_pool_size=concurrency + 1)
+    async with Bot(TOKEN, base_url=f"{base}/bot", base_file_url=f"{base}/file/bot", request=request) as bot:
+        rss_before = _max_rss_bytes()
+        received['body_bytes'] = 0
+        tracemalloc.start()
+        started = time.perf_counter()
+        messages = await asyncio.gather(*(_send(bot, file_path, mode) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        rss_after = _max_rss_bytes()
+    server.close()
+    await server.wait_closed()
+    assert all(message.video for message in messages)
+    assert received['body_bytes'] >= os.path.getsize(file_path) * concurrency, "Body lebih kecil dari file"
+    return {'seconds': elapsed, 'rss_growth': rss_after - rss_before, 'traced_peak': peak}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size-mb', type=int, nargs='+', default=[32, 128, 512])
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4])
+    parser.add_argument('--child', nargs=3, metavar=('MODE', 'FILE', 'CONCURRENCY'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        mode, file_path, concurrency = args.child
+        print(json.dumps(asyncio.run(child(mode, file_path, int(concurrency)))))
+        return
+
+    print(f"{'mode':<9} {'MB':>5} {'paralel':>7} {'detik':>7} {'+RSS MB':>8} {'tracemalloc MB':>15}")
+    for size_mb in args.size_mb:
+        with tempfile.NamedTemporaryFile(suffix='.mp4') as tmp:
+            chunk = os.urandom(1024 * 1024)
+            for _ in range(size_mb):
+                tmp.write(chunk)
+            tmp.flush()
+            for concurrency in args.concurrency:
+                for mode in ('buffered', 'stream'):
+                    output = subprocess.run(
+                        [sys.executable, '-m', 'benchmarks.bench_upload_memory', '--child', mode, tmp.name, str(concurrency)],
+                        check=True, capture_output=True, text=True
+                    ).stdout
+                    result = json.loads(output.strip().splitlines()[-1])
+                    print(f"{mode:<9} {size_mb:>5} {concurrency:>7} {result['seconds']:>7.2f} "
+                          f"{result['rss_growth'] / 1024 / 1024:>8.1f} {result['traced_peak'] / 1024 / 1024:>15.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+# benchmarks/info_fixtures.py
+"""Fixture info dict yt-dlp untuk benchmark offline.
+
+Fixture bawaan di benchmarks/fixtures/ dibangkitkan oleh skrip ini: bentuknya meniru keluaran
+extract_info YouTube (tangga format DASH avc1/vp9/av01, HLS, storyboard, trek audio dubbing,
+varian DRC), dengan ID dan ukuran sintetis yang deterministik. Fixture sungguhan bisa direkam
+dari URL jika ada akses jaringan. Jalankan dari root proyek:
+
+    python -m benchmarks.info_fixtures --synthesize
+    python -m benchmarks.info_fixtures --record https://youtu.be/<id> --name vod_asli
+"""
+import argparse
+import json
+import os
+import random
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+# (tinggi, fps, avc1, vp9, av01) -> format_id DASH YouTube
+VIDEO_LADDER = [
+    (144, 30, '160', '278', '394'), (240, 30, '133', '242', '395'), (360, 30, '134', '243', '396'),
+    (480, 30, '135', '244', '397'), (720, 30, '136', '247', '398'), (1080, 30, '137', '248', '399'),
+    (720, 60, '298', '302', '698'), (1080, 60, '299', '303', '699'), (1440, 60, None, '308', '700'),
+    (2160, 60, None, '315', '701'),
+]
+HLS_LADDER = [(144, '91'), (240, '92'), (360, '93'), (480, '94'), (720, '95'), (1080, '96'), (720, '300'), (1080, '301')]
+# (format_id, ext, acodec, abr, kualitas)
+AUDIO_LADDER = [
+    ('139', 'm4a', 'mp4a.40.5', 48.8, 'low'), ('140', 'm4a', 'mp4a.40.2', 129.5, 'medium'),
+    ('249', 'webm', 'opus', 53.0, 'low'), ('250', 'webm', 'opus', 70.0, 'low'), ('251', 'webm', 'opus', 135.0, 'medium'),
+]
+LANGUAGES = ['en', 'id', 'es', 'pt', 'fr', 'de', 'it', 'ja', 'ko', 'hi', 'ar', 'ru', 'tr', 'pl', 'nl', 'vi', 'th', 'uk', 'zh', 'ms', 'sv', 'cs', 'he', 'bn']
+
+def _size(rng: random.Random, tbr: float, duration: float) -> int:
+    return int(tbr * 1000 / 8 * duration * rng.uniform(0.9, 1.1))
+
+def _storyboards() -> list:
+    return [{'format_id': f'sb{i}', 'format_note': 'storyboard', 'ext': 'mhtml', 'protocol': 'mhtml',
+             'vcodec': 'none', 'acodec': 'none', 'resolution': res}
+            for i, res in enumerate(['48x27', '80x45', '160x90', '320x180'])]
+
+def _video_formats(rng: random.Random, duration: float, max_height: int, approx_share: float) -> list:
+    formats = []
+    for height, fps, *ids in VIDEO_LADDER:
+        if height > max_height:
+            continue
+        for codec, ext, format_id in zip(('avc1.640028', 'vp9', 'av01.0.08M.08'), ('mp4', 'webm', 'mp4'), ids):
+            if format_id is None: # avc1 tidak tersedia di atas 1080p
+                continue
+            # Bitrate kasar per tinggi; vp9/av01 lebih hemat dari avc1
+            tbr = height * 2.2 * (1.5 if fps == 60 else 1) * (1 if codec.startswith('avc1') else 0.7)
+            size = _size(rng, tbr, duration)
+            note = f"{height}p{fps}" if fps == 60 else f"{height}p"
+            fmt = {'format_id': format_id, 'format_note': note, 'ext': ext, 'protocol': 'https',
+                   'vcodec': codec, 'acodec': 'none', 'width': height * 16 // 9, 'height': height,
+                   'fps': fps, 'tbr': round(tbr, 3), 'resolution': f"{height * 16 // 9}x{height}"}
+            fmt['filesize_approx' if rng.random() < approx_share else 'filesize'] = size
+            formats.append(fmt)
+    return formats
+
+def _hls_formats(rng: random.Random, max_height: int, variants: int = 1) -> list:
+    formats = []
+    for variant in range(variants):
+        for height, format_id in HLS_LADDER:
+            if height > max_height:
+                continue
+            suffix = f"-{variant}" if variants > 1 else ''
+            formats.append({'format_id': f"{format_id}{suffix}", 'format_note': f"{height}p", 'ext': 'mp4',
+                            'protocol': 'm3u8_native', 'vcodec': 'avc1.4d401f', 'acodec': 'mp4a.40.2',
+                            'height': height, 'width': height * 16 // 9, 'tbr': round(height * 2.6 * rng.uniform(0.95, 1.05), 3),
+                            'resolution': f"{height * 16 // 9}x{height}"})
+    return formats
+
+def _audio_formats(rng: random.Random, duration: float, languages: list, drc: bool) -> list:
+    formats = []
+    for index, language in enumerate(languages):
+        original = 'original' if index == 0 else 'dubbed'
+        variants = [('', '')] + ([('-drc', ', DRC')] if drc else [])
+        for format_id, ext, acodec, abr, quality in AUDIO_LADDER:
+            for id_suffix, note_suffix in variants:
+                if id_suffix and format_id not in ('140', '251'):
+                    continue
+                full_id = f"{format_id}{id_suffix}" + (f"-{index}" if len(languages) > 1 else '')
+                note = f"{language} {original}, {quality}{note_suffix}" if len(languages) > 1 else f"{quality}{note_suffix}"
+                formats.append({'format_id': full_id, 'format_note': note, 'ext': ext, 'protocol': 'https',
+                                'vcodec': 'none', 'acodec': acodec, 'abr': abr, 'asr': 48000 if ext == 'webm' else 44100,
+                                'language': language, 'filesize': _size(rng, abr, duration)})
+    return formats
+
+def _progressive(rng: random.Random, duration: float) -> dict:
+    return {'format_id': '18', 'format_note': '360p', 'ext': 'mp4', 'protocol': 'https', 'vcodec': 'avc1.42001E',
+            'acodec': 'mp4a.40.2', 'width': 640, 'height': 360, 'tbr': 500.0, 'filesize': _size(rng, 500.0, duration)}
+
+def _info(video_id: str, title: str, duration: float | None, formats: list, **extra) -> dict:
+    # yt-dlp mengurutkan formats dari terburuk ke terbaik; cukup dekati dengan tinggi lalu bitrate
+    formats.sort(key=lambda f: (f.get('height') or 0, f.get('tbr') or f.get('abr') or 0))
+    info = {'id': video_id, 'title': title, 'duration': duration, 'extractor': 'youtube', 'extractor_key': 'Youtube',
+            'webpage_url': f"https://www.youtube.com/watch?v={video_id}", 'formats': formats}
+    info.update(extra)
+    return info
+
+def synthesize() -> dict:
+    """nama fixture -> info dict."""
+    rng = random.Random(20240518)
+    fixtures = {}
+    duration = 212
+    fixtures['vod_music_short'] = _info('SyntVod0001', "Klip musik 3 menit", duration,
+        _storyboards() + _video_formats(rng, duration, 1080, 0.0) + _hls_formats(rng, 1080)
+        + _audio_formats(rng, duration, ['en'], drc=True) + [_progressive(rng, duration)])
+    duration = 5423
+    fixtures['vod_long_4k'] = _info('SyntVod0002', "Dokumenter 90 menit 4K", duration,
+        _storyboards() + _video_formats(rng, duration, 2160, 0.3) + _hls_formats(rng, 1080)
+        + _audio_formats(rng, duration, ['en'], drc=True) + [_progressive(rng, duration)])
+    duration = 1337
+    fixtures['vod_multilang_dubbed'] = _info('SyntVod0003', "Video dengan 24 trek audio dubbing", duration,
+        _storyboards() + _video_formats(rng, duration, 2160, 0.5) + _hls_formats(rng, 1080)
+        + _audio_formats(rng, duration, LANGUAGES, drc=True) + [_progressive(rng, duration)])
+    fixtures['live_dvr_multicdn'] = _info('SyntLive001', "Siaran langsung (DVR, multi-CDN)", None,
+        _storyboards() + _hls_formats(rng, 1080, variants=26), is_live=True, live_status='is_live')
+    duration = 58
+    fixtures['short_vertical'] = _info('SyntShort01', "Shorts vertikal", duration,
+        _storyboards() + _video_formats(rng, duration, 1080, 1.0) + _audio_formats(rng, duration, ['id'], drc=False))
+    return fixtures
+
+def load_fixtures(names: list | None = None) -> dict:
+    fixtures = {}
+    for file_name in sorted(os.listdir(FIXTURES_DIR)):
+        name, ext = os.path.splitext(file_name)
+        if ext != '.json' or (names and name not in names):
+            continue
+        with open(os.path.join(FIXTURES_DIR, file_name), 'r', encoding='utf-8') as f:
+            fixtures[name] = json.load(f)
+    return fixtures
+
+def save_fixture(name: str, info: dict):
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    with open(os.path.join(FIXTURES_DIR, f"{name}.json"), 'w', encoding='utf-8') as f:
+        json.dump(info, f, ensure_ascii=False, separators=(',', ':'))
+
+def record(url: str) -> dict:
+    """Merekam info dict sungguhan (butuh jaringan); disanitasi seperti yt-dlp --dump-json."""
+    import yt_dlp
+    with yt_dlp.YoutubeDL({'quiet': True, 'no_warnings': True, 'noplaylist': True}) as ydl:
+        return ydl.sanitize_info(ydl.extract_info(url, download=False))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--synthesize', action='store_true', help="Tulis ulang fixture sintetis bawaan")
+    parser.add_argument('--record', metavar='URL', help="Rekam info dict dari URL sungguhan")
+    parser.add_argument('--name', help="Nama fixture untuk --record")
+    args = parser.parse_args()
+    if args.synthesize:
+        for name, info in synthesize().items():
+            save_fixture(name, info)
+            print(f"{name}: {len(info['formats'])} format")
+    if args.record:
+        if not args.name:
+            parser.error("--record butuh --name")
+        info = record(args.record)
+        save_fixture(args.name, info)
+        print(f"{args.name}: {len(info.get('formats') or [])} format direkam")
+
+if __name__ == '__main__':
+    main()
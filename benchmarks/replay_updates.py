@@ -0,0 +1,82 @@
+# benchmarks/replay_updates.py
+"""Mengirim update rekaman ke webhook bot lokal (BOT_MODE=webhook) dan mengukur latensinya.
+
+Setiap update di file JSON dikirim sebagai POST dengan header X-Telegram-Bot-Api-Secret-Token,
+persis seperti Telegram. update_id dan message_id dinaikkan per putaran agar tidak dianggap
+duplikat. Sebelumnya satu POST dengan secret salah dikirim dan wajib ditolak (403).
+Gunakan --chat-id dengan ID chat Anda sendiri agar balasan bot benar-benar terkirim.
+Jalankan dari root proyek selagi bot berjalan:
+
+    python -m benchmarks.replay_updates --secret $WEBHOOK_SECRET_TOKEN --chat-id 123456 --rounds 20
+"""
+import argparse
+import copy
+import json
+import os
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_UPDATES = os.path.join(os.path.dirname(__file__), 'updates', 'sample_updates.json')
+
+def post(url: str, secret: str, update: dict) -> tuple:
+    """(status HTTP, detik)"""
+    request = urllib.request.Request(
+        url, data=json.dumps(update).encode('utf-8'), method='POST',
+        headers={'Content-Type': 'application/json', 'X-Telegram-Bot-Api-Secret-Token': secret},
+    )
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    return status, time.perf_counter() - started
+
+def _retarget(update: dict, chat_id: int | None, round_index: int, count: int) -> dict:
+    update = copy.deepcopy(update)
+    update['update_id'] += round_index * count
+    for key in ('message', 'callback_query'):
+        payload = update.get(key)
+        if payload is None:
+            continue
+        message = payload.get('message', payload)
+        message['message_id'] += round_index * count
+        if chat_id is not None:
+            message['chat']['id'] = chat_id
+            payload['from']['id'] = chat_id
+    return update
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default=f"http://127.0.0.1:{os.getenv('WEBHOOK_PORT', '8443')}/{os.getenv('WEBHOOK_PATH', 'telegram')}")
+    parser.add_argument('--secret', default=os.getenv('WEBHOOK_SECRET_TOKEN'), required=not os.getenv('WEBHOOK_SECRET_TOKEN'))
+    parser.add_argument('--updates', default=DEFAULT_UPDATES, help="File JSON berisi daftar update")
+    parser.add_argument('--chat-id', type=int, help="Ganti chat/user ID di semua update")
+    parser.add_argument('--rounds', type=int, default=1)
+    parser.add_argument('--concurrency', type=int, default=4)
+    args = parser.parse_args()
+
+    with open(args.updates, 'r', encoding='utf-8') as f:
+        updates = json.load(f)
+    status, _ = post(args.url, args.secret + 'x', updates[0])
+    print(f"Secret salah -> HTTP {status} ({'OK' if status == 403 else 'SEHARUSNYA 403'})")
+
+    batch = [_retarget(update, args.chat_id, round_index, len(updates))
+             for round_index in range(args.rounds) for update in updates]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        results = list(pool.map(lambda update: post(args.url, args.secret, update), batch))
+    elapsed = time.perf_counter() - started
+
+    statuses = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    latencies = sorted(seconds * 1000 for _, seconds in results)
+    print(f"{len(batch)} update dalam {elapsed:.2f} dtk ({len(batch) / elapsed:.1f}/dtk), status: {statuses}")
+    print(f"Latensi ms: p50 {statistics.median(latencies):.1f}, p95 {latencies[int(len(latencies) * 0.95) - 1]:.1f}, maks {latencies[-1]:.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,7 @@
 # config.py
 import os
 import logging
+import socket
 from dotenv import load_dotenv
 
 logger = logging.getLogger(__name__)
@@ -8,7 +9,9 @@ load_dotenv() # Memuat variabel dari file .env
 
 # Kredensial utama Bot
 TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
-TEMP_DOWNLOAD_PATH = "downloads/"
+# Worker antrean memakai folder sendiri (lihat worker.py): dua worker yang mengunduh file bernama
+# sama tidak menulis ke .part yang sama atau menghapus file yang masih diunggah worker lain
+TEMP_DOWNLOAD_PATH = os.path.join(os.getenv('WORKER_TEMP_DIR') or "downloads", "")
 
 # Kredensial opsional untuk login Instagram
 IG_USERNAME = os.getenv('IG_USERNAME')
@@ -18,6 +21,114 @@ IG_PASSWORD = os.getenv('IG_PASSWORD')
 TELEGRAM_API_ID = os.getenv('TELEGRAM_API_ID')
 TELEGRAM_API_HASH = os.getenv('TELEGRAM_API_HASH')
 TELEGRAM_PHONE_NUMBER_UPLOADER = os.getenv('TELEGRAM_PHONE_NUMBER_UPLOADER')
+TELETHON_UPLOAD_WORKERS = int(os.getenv('TELETHON_UPLOAD_WORKERS', '2')) # Unggahan besar yang berjalan bersamaan
+TELETHON_UPLOAD_CONNECTIONS = int(os.getenv('TELETHON_UPLOAD_CONNECTIONS', '4')) # Koneksi paralel per unggahan
+# File sesi Telethon; setiap proses (bot, tiap worker) butuh sesi terotorisasi sendiri
+TELETHON_SESSION_NAME = os.getenv('TELETHON_SESSION_NAME') or f"user_session_{(TELEGRAM_PHONE_NUMBER_UPLOADER or '').replace('+', '')}"
+
+# Server Bot API sendiri (opsional): telegram-bot-api --local menaikkan batas unggah ke 2000 MB dan
+# membaca file langsung dari path-nya, jadi folder unduhan harus terlihat dengan path yang sama oleh
+# server. Bot harus logOut sekali dari api.telegram.org sebelum pindah ke server sendiri.
+BOT_API_BASE_URL = (os.getenv('BOT_API_BASE_URL') or '').rstrip('/') or None # mis. http://127.0.0.1:8081
+BOT_API_LOCAL_MODE = os.getenv('BOT_API_LOCAL_MODE', 'false').lower() in ('1', 'true', 'yes')
+BOT_API_MAX_UPLOAD_MB = 2000 if BOT_API_LOCAL_MODE else 50 # Batas dari server itu sendiri
+
+# Batas ukuran pengiriman: Bot API vs pengunggah akun pribadi (Telethon)
+BOT_API_UPLOAD_LIMIT_BYTES = min(
+    int(os.getenv('BOT_API_UPLOAD_LIMIT_MB', str(BOT_API_MAX_UPLOAD_MB) if BOT_API_LOCAL_MODE else '30')),
+    BOT_API_MAX_UPLOAD_MB
+) * 1024 * 1024
+USER_BOT_MAX_UPLOAD_BYTES = int(os.getenv('USER_BOT_MAX_UPLOAD_MB', '2048')) * 1024 * 1024
+
+# Executor untuk pekerjaan yt-dlp yang blocking ('thread' atau 'process')
+EXECUTOR_MODE = os.getenv('EXECUTOR_MODE', 'thread').lower()
+PROBE_WORKERS = int(os.getenv('PROBE_WORKERS', '8')) # Batas paralel pengambilan info/format
+DOWNLOAD_WORKERS = int(os.getenv('DOWNLOAD_WORKERS', '3')) # Batas paralel unduhan
+# Pool ffmpeg (merge/konversi) terpisah dari unduhan; 0 = otomatis sesuai jumlah core
+POSTPROCESS_WORKERS = int(os.getenv('POSTPROCESS_WORKERS', '0'))
+FFMPEG_THREADS = int(os.getenv('FFMPEG_THREADS', '0')) # -threads per proses ffmpeg
+
+# Mesin unduhan: 'segmented' (beberapa koneksi per file) atau 'ytdlp' (bawaan yt-dlp, satu koneksi)
+DOWNLOAD_ENGINE = os.getenv('DOWNLOAD_ENGINE', 'segmented').lower()
+# Koneksi per unduhan: fragmen DASH/HLS bersamaan dan potongan Range paralel untuk file HTTP biasa.
+# DOWNLOAD_CONNECTIONS berlaku untuk semua platform, DOWNLOAD_CONNECTIONS_<PLATFORM> menimpanya.
+DOWNLOAD_CONNECTIONS = {
+    platform: int(os.getenv(f"DOWNLOAD_CONNECTIONS_{platform.upper()}", os.getenv('DOWNLOAD_CONNECTIONS', '4')))
+    for platform in ('youtube', 'instagram', 'tiktok', 'other')
+}
+SEGMENTED_MIN_BYTES = int(os.getenv('SEGMENTED_MIN_MB', '8')) * 1024 * 1024 # File lebih kecil diunduh biasa
+SEGMENT_CHUNK_BYTES = int(os.getenv('SEGMENT_CHUNK_MB', '4')) * 1024 * 1024 # Ukuran satu permintaan Range
+
+# Scheduler job unduhan: batas global dan per user
+MAX_CONCURRENT_JOBS = int(os.getenv('MAX_CONCURRENT_JOBS', '4'))
+USER_MAX_RUNNING_JOBS = int(os.getenv('USER_MAX_RUNNING_JOBS', '1'))
+USER_MAX_PENDING_JOBS = int(os.getenv('USER_MAX_PENDING_JOBS', '3')) # Termasuk yang sedang berjalan
+
+# Batas laju link masuk (token bucket): tiap link memicu ekstraksi yt-dlp, dan terlalu banyak
+# ekstraksi beruntun bisa membuat IP di-throttle platform. BURST = link yang boleh berturut-turut,
+# PER_MINUTE = laju isi ulang; PER_MINUTE 0 menonaktifkan bucket tersebut.
+RATE_LIMIT_USER_BURST = int(os.getenv('RATE_LIMIT_USER_BURST', '5'))
+RATE_LIMIT_USER_PER_MINUTE = float(os.getenv('RATE_LIMIT_USER_PER_MINUTE', '10'))
+RATE_LIMIT_PLATFORM_BURST = int(os.getenv('RATE_LIMIT_PLATFORM_BURST', '20'))
+RATE_LIMIT_PLATFORM_PER_MINUTE = {
+    platform: float(os.getenv(f"RATE_LIMIT_PLATFORM_PER_MINUTE_{platform.upper()}", os.getenv('RATE_LIMIT_PLATFORM_PER_MINUTE', '60')))
+    for platform in ('youtube', 'instagram', 'tiktok', 'other')
+}
+RATE_LIMIT_GLOBAL_BURST = int(os.getenv('RATE_LIMIT_GLOBAL_BURST', '60'))
+RATE_LIMIT_GLOBAL_PER_MINUTE = float(os.getenv('RATE_LIMIT_GLOBAL_PER_MINUTE', '120'))
+# 'memory' (per proses) atau 'sqlite' (dibagi semua instance bot di mesin yang sama)
+RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'memory').lower()
+RATE_LIMIT_PATH = os.getenv('RATE_LIMIT_PATH', 'data/rate_limits.sqlite3')
+
+# Cache info yt-dlp di memori (URL format YouTube biasanya kedaluwarsa setelah ~6 jam)
+INFO_CACHE_MAX_ENTRIES = int(os.getenv('INFO_CACHE_MAX_ENTRIES', '256'))
+INFO_CACHE_TTL_SECONDS = int(os.getenv('INFO_CACHE_TTL_SECONDS', '1800'))
+
+# Antrean job bersama (opsional): front-end bot hanya mengurus percakapan, unduh/unggah
+# dikerjakan proses worker.py yang berbagi file SQLite ini
+JOB_QUEUE_ENABLED = os.getenv('JOB_QUEUE_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+JOB_QUEUE_PATH = os.getenv('JOB_QUEUE_PATH', 'data/jobs.sqlite3')
+JOB_QUEUE_ORIGIN = os.getenv('JOB_QUEUE_ORIGIN', socket.gethostname()) # Unik per front-end
+JOB_QUEUE_POLL_SECONDS = float(os.getenv('JOB_QUEUE_POLL_SECONDS', '0.5'))
+JOB_LEASE_SECONDS = int(os.getenv('JOB_LEASE_SECONDS', '60')) # Worker yang diam selama ini dianggap mati
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '2'))
+WORKER_CONCURRENCY = int(os.getenv('WORKER_CONCURRENCY', '2')) # Job bersamaan per proses worker
+
+# Cara menerima update: 'polling' (bawaan) atau 'webhook' (server HTTP lokal, bisa di belakang reverse proxy/LB)
+BOT_MODE = os.getenv('BOT_MODE', 'polling').lower()
+WEBHOOK_LISTEN = os.getenv('WEBHOOK_LISTEN', '127.0.0.1')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', '8443'))
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', 'telegram')
+WEBHOOK_URL = os.getenv('WEBHOOK_URL') # URL publik lengkap yang didaftarkan ke Telegram, mis. https://bot.example.com/telegram
+WEBHOOK_SECRET_TOKEN = os.getenv('WEBHOOK_SECRET_TOKEN') # Wajib sama di semua instance; hanya A-Z, a-z, 0-9, _ dan -
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv('WEBHOOK_MAX_CONNECTIONS', '40'))
+
+# Endpoint metrik Prometheus lokal (0 = nonaktif)
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))
+
+# Laporan progres: pesan status diedit paling sering sekali per interval per chat
+PROGRESS_EDIT_INTERVAL_SECONDS = float(os.getenv('PROGRESS_EDIT_INTERVAL_SECONDS', '3'))
+PROGRESS_STALL_SECONDS = int(os.getenv('PROGRESS_STALL_SECONDS', '60')) # Tanpa progres selama ini = macet
+
+# Cache media di disk (opsional): file hasil unduhan disimpan untuk permintaan berikutnya
+MEDIA_CACHE_ENABLED = os.getenv('MEDIA_CACHE_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+MEDIA_CACHE_DIR = os.getenv('MEDIA_CACHE_DIR', 'cache/media/')
+MEDIA_CACHE_MAX_BYTES = int(os.getenv('MEDIA_CACHE_MAX_MB', '5120')) * 1024 * 1024
+
+# Prefetch spekulatif (opsional): mulai mengunduh pilihan yang paling mungkin selagi user memilih
+PREFETCH_ENABLED = os.getenv('PREFETCH_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+PREFETCH_MAX_BYTES = int(os.getenv('PREFETCH_MAX_MB', '300')) * 1024 * 1024 # Total byte spekulatif bersamaan
+PREFETCH_TTL_SECONDS = int(os.getenv('PREFETCH_TTL_SECONDS', '120')) # Dibatalkan jika user tidak memilih
+PREFETCH_STATS_PATH = os.getenv('PREFETCH_STATS_PATH', 'data/selection_stats.json')
+
+# Mode batch: playlist YouTube, carousel Instagram, dsb. diunduh per item dan dikirim sebagai album
+BATCH_MAX_ENTRIES = int(os.getenv('BATCH_MAX_ENTRIES', '50')) # Item pertama yang diambil dari satu link
+BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', '3')) # Item yang diunduh bersamaan per job batch
+
+# Cache file_id Telegram agar media yang sama bisa dikirim ulang tanpa unduh/unggah
+FILE_ID_CACHE_PATH = os.getenv('FILE_ID_CACHE_PATH', 'data/file_ids.sqlite3')
+FILE_ID_CACHE_MAX_ENTRIES = int(os.getenv('FILE_ID_CACHE_MAX_ENTRIES', '5000'))
 
 
 # Validasi Token Bot Utama
@@ -25,6 +136,22 @@ if not TELEGRAM_BOT_TOKEN:
     logger.critical("KESALAHAN: TELEGRAM_BOT_TOKEN tidak ditemukan di .env.")
     exit("TELEGRAM_BOT_TOKEN tidak ditemukan.")
 
+if BOT_API_LOCAL_MODE and not BOT_API_BASE_URL:
+    logger.critical("KESALAHAN: BOT_API_LOCAL_MODE butuh BOT_API_BASE_URL (server telegram-bot-api --local).")
+    exit("BOT_API_BASE_URL tidak ditemukan.")
+if DOWNLOAD_ENGINE not in ('segmented', 'ytdlp'):
+    logger.critical(f"KESALAHAN: DOWNLOAD_ENGINE tidak dikenal: {DOWNLOAD_ENGINE}.")
+    exit(f"DOWNLOAD_ENGINE harus 'segmented' atau 'ytdlp', bukan '{DOWNLOAD_ENGINE}'.")
+if RATE_LIMIT_BACKEND not in ('memory', 'sqlite'):
+    logger.critical(f"KESALAHAN: RATE_LIMIT_BACKEND tidak dikenal: {RATE_LIMIT_BACKEND}.")
+    exit(f"RATE_LIMIT_BACKEND harus 'memory' atau 'sqlite', bukan '{RATE_LIMIT_BACKEND}'.")
+if BOT_MODE not in ('polling', 'webhook'):
+    logger.critical(f"KESALAHAN: BOT_MODE tidak dikenal: {BOT_MODE}.")
+    exit(f"BOT_MODE harus 'polling' atau 'webhook', bukan '{BOT_MODE}'.")
+if BOT_MODE == 'webhook' and not (WEBHOOK_URL and WEBHOOK_SECRET_TOKEN):
+    logger.critical("KESALAHAN: mode webhook butuh WEBHOOK_URL dan WEBHOOK_SECRET_TOKEN di .env.")
+    exit("WEBHOOK_URL/WEBHOOK_SECRET_TOKEN tidak ditemukan.")
+
 logger.info("Konfigurasi berhasil dimuat.")
 
 # Membuat folder unduhan jika belum ada
@@ -0,0 +1,64 @@
+# src/service/audio_pipeline.py
+import logging
+from . import info_cache
+
+logger = logging.getLogger(__name__)
+
+# Ekstraksi audio "remux dulu": jika codec sumber sudah bisa diputar Telegram (AAC/MP3),
+# stream cukup disalin ke container yang cocok; encode ulang hanya bila memang perlu.
+PLAYABLE_CONTAINERS = {'mp4a': 'm4a', 'aac': 'm4a', 'mp3': 'mp3'} # codec -> container tujuan
+TRANSCODE_BITRATE_KBPS = 192 # Sama dengan -b:a di extract_audio_from_file_sync
+
+def _codec_family(acodec: str | None) -> str | None:
+    if not acodec or acodec == 'none':
+        return None
+    return acodec.split('.')[0].lower() # 'mp4a.40.2' -> 'mp4a'
+
+def source_format(info: dict, selector: str) -> dict | None:
+    """Format yang akan dipakai yt-dlp sebagai sumber audio untuk selector ini (perkiraan dari info)."""
+    formats = info.get('formats') or []
+    # yt-dlp mengurutkan formats dari terburuk ke terbaik
+    audio_only = [f for f in formats if f.get('vcodec') == 'none' and _codec_family(f.get('acodec'))]
+    for f in formats:
+        if f.get('format_id') == selector:
+            return f
+    if selector.startswith('bestaudio[ext=m4a]'):
+        m4a = [f for f in audio_only if f.get('ext') == 'm4a']
+        if m4a:
+            return m4a[-1]
+    if audio_only:
+        return audio_only[-1]
+    with_audio = [f for f in formats if _codec_family(f.get('acodec'))]
+    return with_audio[-1] if with_audio else (info if _codec_family(info.get('acodec')) else None)
+
+def plan_output(source_acodec: str | None, preferred_format: str) -> dict:
+    """Menentukan container tujuan dan apakah cukup copy atau harus transcode.
+
+    preferred_format 'mp3'/'m4a' dipatuhi; nilai lain ('auto', 'webm', ...) memilih container
+    yang bisa di-copy dari codec sumber, dengan MP3 sebagai cadangan.
+    """
+    source = _codec_family(source_acodec)
+    if preferred_format in ('mp3', 'm4a'):
+        target = preferred_format
+    else:
+        target = PLAYABLE_CONTAINERS.get(source, 'mp3')
+    mode = 'copy' if source and PLAYABLE_CONTAINERS.get(source) == target else 'transcode'
+    return {'ext': target, 'mode': mode, 'source_codec': source or 'unknown'}
+
+def plan_from_info(info: dict, selector: str, preferred_format: str) -> dict:
+    """Rencana lengkap: selector format yang dipakai + hasil plan_output untuk sumbernya."""
+    if selector == 'bestaudio/best' and preferred_format != 'mp3':
+        selector = 'bestaudio[ext=m4a]/bestaudio/best' # AAC bisa langsung di-remux ke m4a
+    fmt = source_format(info, selector)
+    audio_plan = plan_output(fmt.get('acodec') if fmt else None, preferred_format)
+    audio_plan['format'] = selector
+    return audio_plan
+
+def plan_for(url: str, selector: str, preferred_format: str) -> dict:
+    """plan_from_info memakai info di cache. Tanpa akses jaringan."""
+    return plan_from_info(info_cache.peek(url) or {}, selector, preferred_format)
+
+def describe(audio_plan: dict) -> str:
+    if audio_plan['mode'] == 'copy':
+        return f"tanpa konversi ({audio_plan['source_codec']} → {audio_plan['ext'].upper()})"
+    return f"konversi {audio_plan['source_codec']} → {audio_plan['ext'].upper()}"
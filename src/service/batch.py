@@ -0,0 +1,159 @@
+# src/service/batch.py
+import asyncio
+import logging
+import os
+import threading
+from urllib.parse import urlsplit, parse_qs
+from yt_dlp.utils import DownloadCancelled, DownloadError
+from .downloader_base import download_cancel_event, get_common_ydl_opts, extract_info_sync
+from .executor import run_probe
+from . import audio_pipeline, info_cache, metrics, postprocess
+from config import EXECUTOR_MODE, BATCH_MAX_ENTRIES, BATCH_CONCURRENCY, IG_USERNAME, IG_PASSWORD, TEMP_DOWNLOAD_PATH
+from src.utils.url_parser import identify_platform
+
+logger = logging.getLogger(__name__)
+
+# Mode batch: link berisi banyak item (playlist, carousel) didaftar dengan ekstraksi flat, item
+# diunduh bersamaan dengan batas per job, lalu diserahkan per kelompok album begitu siap.
+ALBUM_SIZE = 10 # Batas item per sendMediaGroup
+PHOTO_EXTS = ('jpg', 'jpeg', 'png', 'webp')
+PHOTO_LIMIT_BYTES = 10 * 1024 * 1024 # Batas sendPhoto Bot API; foto lebih besar dikirim sebagai dokumen
+# Item album dikirim lewat Bot API, jadi resolusi dibatasi agar tiap file muat
+VIDEO_FORMAT = 'bv*[height<=720][ext=mp4]+ba[ext=m4a]/b[height<=720][ext=mp4]/bv*[height<=720]+ba/b'
+
+def _auth_opts(url: str) -> dict:
+    if identify_platform(url) == 'instagram' and IG_USERNAME and IG_PASSWORD:
+        return {'username': IG_USERNAME, 'password': IG_PASSWORD}
+    return {}
+
+def playlist_only(url: str) -> bool:
+    """Link yang hanya berisi daftar (youtube.com/playlist?list=...), tanpa satu video utama."""
+    parts = urlsplit(url)
+    return (identify_platform(url) == 'youtube' and parts.path.rstrip('/') == '/playlist'
+            and 'list' in parse_qs(parts.query))
+
+def has_entries(url: str) -> bool:
+    """Link yang mungkin berisi banyak item: punya parameter list= YouTube, atau hasil probe-nya playlist."""
+    if identify_platform(url) == 'youtube' and 'list' in parse_qs(urlsplit(url).query):
+        return True
+    info = info_cache.peek(url)
+    return bool(info and info.get('_type') == 'playlist')
+
+async def list_entries(url: str) -> dict | None:
+    """Daftar item lewat ekstraksi flat (tanpa info format tiap item).
+
+    Mengembalikan {'title', 'entries': [{'index', 'url', 'title'}]}, atau None jika link hanya
+    berisi satu media. 'url' None berarti item diambil dari link induk dengan playlist_items.
+    """
+    ydl_opts = {'quiet': True, 'no_warnings': True, 'extract_flat': 'in_playlist', 'noplaylist': False,
+                'playlistend': BATCH_MAX_ENTRIES, **_auth_opts(url)}
+    try:
+        with metrics.StageTimer('probe', identify_platform(url)):
+            info = await run_probe(extract_info_sync, url, ydl_opts)
+    except Exception as e:
+        logger.warning(f"Gagal mendaftar item playlist ({url}): {e}")
+        return None
+    if info.get('_type') != 'playlist':
+        return None
+    entries = []
+    for position, entry in enumerate(info.get('entries') or [], start=1):
+        if not entry:
+            continue
+        # Item flat cukup URL-nya; item yang sudah lengkap (carousel) tidak punya halaman sendiri
+        entry_url = entry.get('url') if entry.get('_type') in ('url', 'url_transparent') else None
+        entries.append({'index': position, 'url': entry_url, 'title': entry.get('title') or f"Item {position}"})
+    if len(entries) < 2:
+        return None
+    logger.info(f"Playlist {url}: {len(entries)} item (maks {BATCH_MAX_ENTRIES}).")
+    return {'title': info.get('title') or info.get('id') or url, 'entries': entries[:BATCH_MAX_ENTRIES]}
+
+async def _parent_item_info(url: str, entry: dict, ydl_opts: dict) -> dict:
+    """Info lengkap item tanpa URL sendiri (carousel), diekstraksi dari link induk dengan playlist_items."""
+    ydl_opts = dict(ydl_opts, noplaylist=False, playlist_items=str(entry['index']))
+    with metrics.StageTimer('probe', identify_platform(url)):
+        info = await run_probe(extract_info_sync, url, ydl_opts)
+    items = [item for item in info.get('entries') or [info] if item]
+    if not items:
+        raise DownloadError(f"Item {entry['index']} tidak ditemukan di {url}")
+    return items[0]
+
+async def download_entry(url: str, entry: dict, kind: str, tag: str, preferred_format: str = 'auto') -> str:
+    """Mengunduh satu item batch ('video' juga mencakup foto carousel, 'audio' mengikuti rencana audio_pipeline).
+
+    Sama seperti item tunggal: yt-dlp hanya mengunduh stream, merge/konversi ffmpeg mengantre di pool postprocess.
+    """
+    output_template = f"{TEMP_DOWNLOAD_PATH}batch_{tag}_{entry['index']:03d}_%(id)s_%(format_id)s.%(ext)s"
+    source = entry['url'] or url
+    ydl_opts = get_common_ydl_opts(output_template=output_template)
+    ydl_opts.update(_auth_opts(source))
+    # Item dengan URL sendiri memakai cache info seperti biasa; item carousel membawa info-nya sendiri
+    item_info = await _parent_item_info(url, entry, ydl_opts) if entry['url'] is None else None
+    if kind == 'audio':
+        info = item_info or await info_cache.get_info(source, ydl_opts)
+        audio_plan = audio_pipeline.plan_from_info(info, 'bestaudio/best', preferred_format)
+        return await postprocess.download_audio(source, ydl_opts, audio_plan, item_info)
+    ydl_opts.update(format=VIDEO_FORMAT, merge_output_format='mp4')
+    return await postprocess.download_merged(source, ydl_opts, item_info)
+
+def media_type(path: str, kind: str) -> str:
+    """Jenis media Telegram untuk file item: 'audio', 'photo' atau 'video'."""
+    if kind == 'audio':
+        return 'audio'
+    return 'photo' if path.rsplit('.', 1)[-1].lower() in PHOTO_EXTS else 'video'
+
+def release(album: list):
+    """Menghapus file item album setelah dikirim."""
+    for item in album:
+        if item.get('path') and os.path.exists(item['path']):
+            try:
+                os.remove(item['path'])
+            except OSError as e:
+                logger.warning(f"Gagal menghapus file batch {item['path']}: {e}")
+
+async def albums(url: str, entries: list, kind: str, tag: str, failed: list, preferred_format: str = 'auto'):
+    """Mengunduh item (BATCH_CONCURRENCY bersamaan) dan menghasilkan album hingga ALBUM_SIZE item
+    yang sudah di disk, urut selesai, tanpa menunggu seluruh playlist.
+
+    Item album: entry + 'path'; pemanggil menghapus file setelah dikirim. Item yang gagal diunduh
+    ditambahkan ke failed.
+    """
+    limit = asyncio.Semaphore(BATCH_CONCURRENCY)
+    stop = threading.Event()
+
+    async def fetch(entry: dict) -> dict:
+        if EXECUTOR_MODE != 'process': # Event tidak bisa dikirim ke worker proses
+            download_cancel_event.set(stop) # Unduhan di thread ikut berhenti saat batch dibatalkan
+        async with limit:
+            try:
+                return {**entry, 'path': await download_entry(url, entry, kind, tag, preferred_format)}
+            except DownloadCancelled:
+                raise
+            except Exception as e:
+                logger.warning(f"Item {entry['index']} dari {url} gagal diunduh: {e}")
+                return {**entry, 'path': None}
+
+    tasks = [asyncio.create_task(fetch(entry), name=f"batch-{tag}-{entry['index']}") for entry in entries]
+    yielded = set()
+    ready = []
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            item = await next_done
+            if item['path'] is None or not os.path.exists(item['path']):
+                failed.append(item)
+                continue
+            ready.append(item)
+            if len(ready) == ALBUM_SIZE:
+                album, ready = sorted(ready, key=lambda i: i['index']), []
+                yielded.update(i['path'] for i in album)
+                yield album
+        if ready:
+            album, ready = sorted(ready, key=lambda i: i['index']), []
+            yielded.update(i['path'] for i in album)
+            yield album
+    finally:
+        # Dibatalkan/gagal di tengah jalan: hentikan sisa unduhan dan hapus file yang belum diserahkan
+        stop.set()
+        for task in tasks:
+            task.cancel()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        release([r for r in results if isinstance(r, dict) and r['path'] not in yielded])
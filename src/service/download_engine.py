@@ -0,0 +1,197 @@
+# src/service/download_engine.py
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import yt_dlp
+from yt_dlp.networking import Request
+from yt_dlp.utils import DownloadCancelled, DownloadError
+from .downloader_base import download_sync, download_with_info_sync
+from config import DOWNLOAD_CONNECTIONS, SEGMENTED_MIN_BYTES, SEGMENT_CHUNK_BYTES
+
+logger = logging.getLogger(__name__)
+
+# Mesin unduhan yang bisa dipilih lewat DOWNLOAD_ENGINE. 'ytdlp' = perilaku bawaan yt-dlp.
+# 'segmented' memakai beberapa koneksi per file: fragmen DASH/HLS diunduh paralel oleh yt-dlp
+# (concurrent_fragment_downloads), dan file HTTP biasa diambil per potongan Range secara paralel
+# lewat jaringan yt-dlp sendiri (header, cookie, proxy tetap sama). Server yang membatasi
+# kecepatan per koneksi jadi tidak membatasi satu unduhan.
+READ_SIZE = 256 * 1024
+CHUNK_RETRIES = 3
+
+class RangeNotSupported(Exception):
+    """Server tidak menjawab Range dengan 206; unduhan dikembalikan ke yt-dlp."""
+
+def connections_for(platform: str) -> int:
+    return max(1, DOWNLOAD_CONNECTIONS.get(platform, DOWNLOAD_CONNECTIONS['other']))
+
+def _with_fragments(ydl_opts: dict, connections: int) -> dict:
+    """Salinan ydl_opts dengan fragmen DASH/HLS paralel (nilai eksplisit tidak ditimpa)."""
+    ydl_opts = dict(ydl_opts)
+    ydl_opts.setdefault('concurrent_fragment_downloads', connections)
+    return ydl_opts
+
+def _ranged_format(result: dict, ydl_opts: dict) -> dict | None:
+    """Format tunggal yang bisa diambil per Range, atau None jika yt-dlp sebaiknya mengunduh sendiri."""
+    if result.get('requested_formats') or ydl_opts.get('nopart'):
+        return None # Merge ditangani postprocess per format; pipeline membaca file secara berurutan
+    if result.get('protocol') not in ('http', 'https') or not result.get('url'):
+        return None
+    size = result.get('filesize')
+    if size is not None and size < SEGMENTED_MIN_BYTES:
+        return None
+    # Container DASH perlu fixup yt-dlp kecuali nanti di-remux oleh merge ffmpeg
+    if str(result.get('container', '')).endswith('_dash') and not ydl_opts.get('merge_output_format'):
+        return None
+    return result
+
+def _open_range(ydl, fmt: dict, start: int, end: int):
+    headers = dict(fmt.get('http_headers') or {}, Range=f"bytes={start}-{end}")
+    response = ydl.urlopen(Request(fmt['url'], headers=headers))
+    if response.status != 206:
+        response.close()
+        raise RangeNotSupported(f"HTTP {response.status} untuk Range {start}-{end}")
+    return response
+
+def _total_size(ydl, fmt: dict) -> int:
+    response = _open_range(ydl, fmt, 0, 0)
+    try:
+        content_range = response.headers.get('Content-Range') or ''
+        total = content_range.rpartition('/')[2]
+        if not total.isdigit():
+            raise RangeNotSupported(f"Content-Range tidak berisi ukuran: {content_range!r}")
+        return int(total)
+    finally:
+        response.close()
+
+def fetch_ranges(ydl, fmt: dict, filename: str, connections: int, hooks: list) -> int:
+    """Mengunduh fmt['url'] ke filename dengan `connections` koneksi paralel, per potongan
+    SEGMENT_CHUNK_BYTES. progress_hooks dipanggil seperti oleh yt-dlp (termasuk hook pembatalan).
+    """
+    total = fmt.get('filesize') or _total_size(ydl, fmt)
+    max_filesize = ydl.params.get('max_filesize')
+    if max_filesize is not None and total > max_filesize:
+        # Sama seperti pengecekan downloader HTTP yt-dlp, sebelum ruang disk dipesan
+        raise DownloadError(f"File is larger than max-filesize ({total} bytes > {max_filesize} bytes). Aborting.")
+    if total < SEGMENTED_MIN_BYTES:
+        raise RangeNotSupported(f"File {total} byte terlalu kecil untuk dipotong")
+    part_path = f"{filename}.part"
+    with open(part_path, 'wb') as f:
+        f.truncate(total)
+    chunks = [(start, min(start + SEGMENT_CHUNK_BYTES, total) - 1) for start in range(0, total, SEGMENT_CHUNK_BYTES)]
+    lock = threading.Lock()
+    stop = threading.Event()
+    state = {'next': 0, 'downloaded': 0}
+    started = time.monotonic()
+
+    def report(size: int):
+        with lock:
+            state['downloaded'] += size
+            elapsed = time.monotonic() - started
+            speed = state['downloaded'] / elapsed if elapsed else None
+            status = {
+                'status': 'downloading', 'filename': filename, 'tmpfilename': part_path,
+                'downloaded_bytes': state['downloaded'], 'total_bytes': total, 'elapsed': elapsed,
+                'speed': speed, 'eta': (total - state['downloaded']) / speed if speed else None,
+            }
+            for hook in hooks:
+                hook(status)
+
+    def worker():
+        fd = os.open(part_path, os.O_WRONLY)
+        try:
+            while not stop.is_set():
+                with lock:
+                    if state['next'] >= len(chunks):
+                        return
+                    start, end = chunks[state['next']]
+                    state['next'] += 1
+                position = start
+                for attempt in range(CHUNK_RETRIES):
+                    try:
+                        response = _open_range(ydl, fmt, position, end)
+                        try:
+                            while position <= end:
+                                data = response.read(min(READ_SIZE, end - position + 1))
+                                if not data:
+                                    raise DownloadError(f"Koneksi terputus di byte {position} dari potongan {start}-{end}")
+                                os.pwrite(fd, data, position)
+                                position += len(data)
+                                report(len(data))
+                                if stop.is_set():
+                                    return
+                        finally:
+                            response.close()
+                        break
+                    except (DownloadCancelled, RangeNotSupported):
+                        raise
+                    except Exception as e:
+                        # Potongan dilanjutkan dari byte terakhir yang sudah tertulis
+                        if attempt == CHUNK_RETRIES - 1:
+                            raise
+                        logger.warning(f"Potongan {start}-{end} gagal di byte {position} ({e}), mencoba lagi.")
+        except BaseException:
+            stop.set()
+            raise
+        finally:
+            os.close(fd)
+
+    try:
+        with ThreadPoolExecutor(max_workers=min(connections, len(chunks)), thread_name_prefix="segment") as pool:
+            futures = [pool.submit(worker) for _ in range(min(connections, len(chunks)))]
+        errors = [future.exception() for future in futures if future.exception() is not None]
+        if errors:
+            raise errors[0]
+        os.replace(part_path, filename)
+    except BaseException:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+    for hook in hooks:
+        hook({'status': 'finished', 'filename': filename, 'downloaded_bytes': total, 'total_bytes': total,
+              'elapsed': time.monotonic() - started})
+    return total
+
+def _segmented_with_info(ydl, info: dict, ydl_opts: dict, connections: int) -> str:
+    clean_info = ydl.sanitize_info(info, remove_private_keys=True)
+    if connections > 1:
+        result = ydl.process_ie_result(clean_info, download=False)
+        fmt = _ranged_format(result, ydl_opts)
+        if fmt is not None:
+            filename = ydl.prepare_filename(result)
+            try:
+                started = time.monotonic()
+                total = fetch_ranges(ydl, fmt, filename, connections, ydl_opts.get('progress_hooks') or [])
+                logger.info(f"Unduhan {connections} koneksi: {filename} ({total / (1024 * 1024):.1f} MB "
+                            f"dalam {time.monotonic() - started:.1f} dtk).")
+                return filename
+            except RangeNotSupported as e:
+                logger.info(f"Unduhan paralel tidak dipakai untuk format {fmt.get('format_id')}: {e}. Memakai yt-dlp.")
+    result = ydl.process_ie_result(clean_info, download=True)
+    return ydl.prepare_filename(result)
+
+def segmented_download_with_info_sync(info, ydl_opts, connections):
+    """Seperti download_with_info_sync, dengan Range paralel untuk format HTTP tunggal. Blocking."""
+    ydl_opts = _with_fragments(ydl_opts, connections)
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        return _segmented_with_info(ydl, info, ydl_opts, connections)
+
+def segmented_download_sync(url, ydl_opts, connections):
+    """Seperti download_sync: ekstraksi dulu, lalu unduh lewat mesin segmented. Blocking."""
+    ydl_opts = _with_fragments(ydl_opts, connections)
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        info = ydl.extract_info(url, download=False)
+        return _segmented_with_info(ydl, info, ydl_opts, connections)
+
+def ytdlp_download_with_info_sync(info, ydl_opts, connections):
+    return download_with_info_sync(info, ydl_opts)
+
+def ytdlp_download_sync(url, ydl_opts, connections):
+    return download_sync(url, ydl_opts)
+
+# nama -> (unduh dari URL, unduh dari info dict); keduanya blocking, dijalankan lewat executor.run_download
+ENGINES = {
+    'ytdlp': (ytdlp_download_sync, ytdlp_download_with_info_sync),
+    'segmented': (segmented_download_sync, segmented_download_with_info_sync),
+}
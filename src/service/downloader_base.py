@@ -1,9 +1,24 @@
 # src/services/downloader_base.py
+import contextvars
 import logging
-from config import TEMP_DOWNLOAD_PATH
+import subprocess
+import yt_dlp
+from yt_dlp.utils import DownloadCancelled
+from config import TEMP_DOWNLOAD_PATH, EXECUTOR_MODE
+from . import progress
 
 logger = logging.getLogger(__name__)
 
+# Unduhan berjalan di thread executor dan tidak bisa di-cancel dari asyncio. Task yang perlu
+# membatalkannya memasang threading.Event di sini; get_common_ydl_opts() memasang hook-nya.
+download_cancel_event = contextvars.ContextVar('download_cancel_event', default=None)
+
+def _cancel_hook(event):
+    def hook(status):
+        if event.is_set():
+            raise DownloadCancelled("Unduhan dibatalkan")
+    return hook
+
 def get_human_readable_size(size_bytes):
     """Mengubah byte menjadi format yang mudah dibaca (MB atau GB)."""
     if size_bytes is None: return "N/A"
@@ -20,9 +35,10 @@ def get_human_readable_size(size_bytes):
 def get_common_ydl_opts(output_template=None):
     """Mengembalikan opsi yt-dlp yang umum digunakan untuk unduhan."""
     if output_template is None:
-        output_template = f"{TEMP_DOWNLOAD_PATH}%(title)s_%(id)s.%(ext)s"
+        # format_id di nama file: unduhan format berbeda dari video yang sama tidak saling menimpa
+        output_template = f"{TEMP_DOWNLOAD_PATH}%(title)s_%(id)s_%(format_id)s.%(ext)s"
 
-    return {
+    ydl_opts = {
         'outtmpl': output_template,
         'quiet': True,
         'no_warnings': True,
@@ -32,3 +48,67 @@ def get_common_ydl_opts(output_template=None):
         'retries': 3,
         'fragment_retries': 3,
     }
+    hooks = []
+    cancel_event = download_cancel_event.get()
+    if cancel_event is not None and EXECUTOR_MODE != 'process': # threading.Event tidak terlihat dari proses lain
+        hooks.append(_cancel_hook(cancel_event))
+    progress_key = progress.current_key.get()
+    # Hook progres menulis ke kanal di proses bot; closure-nya juga tidak bisa di-pickle ke ProcessPoolExecutor
+    if progress_key is not None and EXECUTOR_MODE != 'process':
+        hooks.append(progress.ydl_hook(progress_key))
+    if hooks:
+        ydl_opts['progress_hooks'] = hooks
+    return ydl_opts
+
+def extract_info_sync(url, ydl_opts):
+    """Mengambil info tanpa mengunduh. Blocking, jalankan lewat executor.run_probe."""
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        info = ydl.extract_info(url, download=False)
+        return ydl.sanitize_info(info)
+
+def download_sync(url, ydl_opts):
+    """Mengunduh URL dan mengembalikan nama file hasil. Blocking, jalankan lewat executor.run_download."""
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        info = ydl.extract_info(url, download=True)
+        return ydl.prepare_filename(info)
+
+def download_with_info_sync(info, ydl_opts):
+    """Mengunduh memakai info dict yang sudah ada (tanpa ekstraksi ulang ke situs). Blocking."""
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        # Sama seperti --load-info-json: salinan tanpa kunci privat, lalu proses ulang pemilihan format
+        clean_info = ydl.sanitize_info(info, remove_private_keys=True)
+        result = ydl.process_ie_result(clean_info, download=True)
+        return ydl.prepare_filename(result)
+
+def select_formats_sync(info, ydl_opts):
+    """Format yang akan dipilih yt-dlp untuk opsi ini: [video, audio] jika perlu digabung. Blocking."""
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        clean_info = ydl.sanitize_info(info, remove_private_keys=True)
+        result = ydl.process_ie_result(clean_info, download=False)
+        return result.get('requested_formats') or [result]
+
+def _run_ffmpeg(args, threads):
+    command = ['ffmpeg', '-y', '-loglevel', 'error', *args[:-1], '-threads', str(threads), args[-1]]
+    subprocess.run(command, check=True, capture_output=True)
+
+def _faststart_args(output_path):
+    """moov di awal file mp4/m4a agar Telegram bisa memutarnya sebelum unduhan selesai."""
+    return ['-movflags', '+faststart'] if output_path.rsplit('.', 1)[-1].lower() in ('mp4', 'm4a') else []
+
+def merge_av_sync(video_path, audio_path, output_path, threads=1):
+    """Menggabungkan stream video dan audio tanpa encode ulang. Blocking, jalankan di pool postprocess."""
+    _run_ffmpeg(['-i', video_path, '-i', audio_path, '-map', '0:v:0', '-map', '1:a:0', '-c', 'copy', *_faststart_args(output_path), output_path], threads)
+    return output_path
+
+def extract_audio_from_file_sync(source_path, output_path, audio_ext, transcode=True, threads=1):
+    """Mengambil trek audio dari file lokal dengan ffmpeg (tanpa jaringan). Blocking."""
+    if not transcode:
+        codec_args = ['-c:a', 'copy']
+        if audio_ext == 'm4a':
+            codec_args += ['-bsf:a', 'aac_adtstoasc'] # AAC dari container ADTS/TS
+    elif audio_ext == 'mp3':
+        codec_args = ['-c:a', 'libmp3lame', '-b:a', '192k']
+    else:
+        codec_args = ['-c:a', 'aac', '-b:a', '192k']
+    _run_ffmpeg(['-i', source_path, '-vn', *codec_args, *_faststart_args(output_path), output_path], threads)
+    return output_path
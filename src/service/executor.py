@@ -0,0 +1,100 @@
+# src/service/executor.py
+import asyncio
+import functools
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from . import metrics
+from config import EXECUTOR_MODE, PROBE_WORKERS, DOWNLOAD_WORKERS, POSTPROCESS_WORKERS, FFMPEG_THREADS
+
+logger = logging.getLogger(__name__)
+
+# Pool terpisah agar pengambilan info (murah) tidak mengantre di belakang unduhan besar,
+# dan pekerjaan ffmpeg (CPU) tidak memakan slot unduhan (jaringan)
+_pools = {}
+_counters = {
+    'probe': {'waiting': 0, 'running': 0},
+    'download': {'waiting': 0, 'running': 0},
+    'postprocess': {'waiting': 0, 'running': 0},
+}
+
+def available_cores() -> int:
+    try:
+        return len(os.sched_getaffinity(0)) # Menghormati batas CPU container/taskset
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def postprocess_budget() -> tuple[int, int]:
+    """(jumlah proses ffmpeg bersamaan, -threads per proses) agar totalnya tidak melebihi core."""
+    cores = available_cores()
+    workers = POSTPROCESS_WORKERS or max(1, cores // 2)
+    threads = FFMPEG_THREADS or max(1, cores // workers)
+    return workers, threads
+
+def _pool_size(kind: str) -> int:
+    if kind == 'probe':
+        return PROBE_WORKERS
+    if kind == 'download':
+        return DOWNLOAD_WORKERS
+    return postprocess_budget()[0]
+
+def _uses_processes(kind: str) -> bool:
+    # ffmpeg sudah berjalan sebagai subprocess; worker-nya cukup thread yang menunggu
+    return EXECUTOR_MODE == 'process' and kind != 'postprocess'
+
+def _get_pool(kind: str):
+    """Membuat pool secara lazy sesuai EXECUTOR_MODE."""
+    pool = _pools.get(kind)
+    if pool is None:
+        workers = _pool_size(kind)
+        if _uses_processes(kind):
+            pool = ProcessPoolExecutor(max_workers=workers)
+        else:
+            pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"ytdlp-{kind}")
+        _pools[kind] = pool
+        logger.info(f"Executor '{kind}' dibuat ({EXECUTOR_MODE}, {workers} worker).")
+    return pool
+
+def _run_counted(kind: str, submitted_at: float, func, *args, **kwargs):
+    """Dijalankan di dalam worker; hanya berguna untuk mode thread (counter bersama)."""
+    metrics.record_wait(kind, time.monotonic() - submitted_at)
+    counter = _counters[kind]
+    counter['waiting'] -= 1
+    counter['running'] += 1
+    try:
+        return func(*args, **kwargs)
+    finally:
+        counter['running'] -= 1
+
+async def _submit(kind: str, func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    pool = _get_pool(kind)
+    if _uses_processes(kind):
+        # Fungsi dan argumen harus bisa di-pickle; counter tidak bisa dibagi antar proses
+        return await loop.run_in_executor(pool, functools.partial(func, *args, **kwargs))
+    _counters[kind]['waiting'] += 1
+    return await loop.run_in_executor(pool, functools.partial(_run_counted, kind, time.monotonic(), func, *args, **kwargs))
+
+async def run_probe(func, *args, **kwargs):
+    """Menjalankan fungsi blocking pengambilan info di pool probe dan menunggu hasilnya."""
+    return await _submit('probe', func, *args, **kwargs)
+
+async def run_download(func, *args, **kwargs):
+    """Menjalankan fungsi blocking unduhan di pool download dan menunggu hasilnya."""
+    return await _submit('download', func, *args, **kwargs)
+
+async def run_postprocess(func, *args, **kwargs):
+    """Menjalankan pekerjaan ffmpeg di pool postprocess (ukuran mengikuti jumlah core)."""
+    return await _submit('postprocess', func, *args, **kwargs)
+
+def stats() -> dict:
+    """Mengembalikan jumlah pekerjaan yang menunggu/berjalan per pool (mode thread)."""
+    return {kind: dict(values) for kind, values in _counters.items()}
+
+def shutdown(wait: bool = False):
+    """Menutup semua pool. Dipanggil saat bot berhenti."""
+    for kind, pool in list(_pools.items()):
+        pool.shutdown(wait=wait, cancel_futures=True)
+        logger.info(f"Executor '{kind}' ditutup.")
+    _pools.clear()
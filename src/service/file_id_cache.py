@@ -0,0 +1,91 @@
+# src/service/file_id_cache.py
+import logging
+import os
+import sqlite3
+import time
+from config import FILE_ID_CACHE_PATH, FILE_ID_CACHE_MAX_ENTRIES
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# source: 'botapi' -> file_ref adalah file_id Bot API
+#         'telethon' -> file_ref adalah '<chat_id>:<message_id>' milik akun pengunggah
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS file_ids (
+    platform TEXT NOT NULL,
+    video_id TEXT NOT NULL,
+    format_id TEXT NOT NULL,
+    preferred_format TEXT NOT NULL,
+    source TEXT NOT NULL,
+    file_ref TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (platform, video_id, format_id, preferred_format)
+);
+CREATE INDEX IF NOT EXISTS idx_file_ids_last_used ON file_ids (last_used);
+"""
+
+_conn = None
+
+def _get_conn() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        folder = os.path.dirname(FILE_ID_CACHE_PATH)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        _conn = sqlite3.connect(FILE_ID_CACHE_PATH, check_same_thread=False)
+        _conn.row_factory = sqlite3.Row
+        _conn.executescript(_SCHEMA)
+        _conn.commit()
+        logger.info(f"Cache file_id dibuka: {FILE_ID_CACHE_PATH}")
+    return _conn
+
+def lookup(platform: str, video_id: str, format_id: str, preferred_format: str) -> dict | None:
+    """Mencari file_id tersimpan. Mengembalikan {'source', 'file_ref'} atau None."""
+    conn = _get_conn()
+    key = (platform, video_id, format_id, preferred_format)
+    row = conn.execute(
+        "SELECT source, file_ref FROM file_ids WHERE platform=? AND video_id=? AND format_id=? AND preferred_format=?",
+        key
+    ).fetchone()
+    metrics.record_cache('file_id', row is not None)
+    if row is None:
+        return None
+    conn.execute(
+        "UPDATE file_ids SET last_used=? WHERE platform=? AND video_id=? AND format_id=? AND preferred_format=?",
+        (time.time(), *key)
+    )
+    conn.commit()
+    return {'source': row['source'], 'file_ref': row['file_ref']}
+
+def store(platform: str, video_id: str, format_id: str, preferred_format: str, source: str, file_ref: str):
+    """Menyimpan file_id hasil unggahan, lalu membuang entri yang paling lama tidak dipakai."""
+    conn = _get_conn()
+    now = time.time()
+    conn.execute(
+        "INSERT OR REPLACE INTO file_ids VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (platform, video_id, format_id, preferred_format, source, file_ref, now, now)
+    )
+    conn.execute(
+        "DELETE FROM file_ids WHERE rowid IN ("
+        " SELECT rowid FROM file_ids ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+        (FILE_ID_CACHE_MAX_ENTRIES,)
+    )
+    conn.commit()
+    logger.info(f"file_id disimpan untuk {platform}:{video_id} ({format_id}/{preferred_format}) via {source}.")
+
+def invalidate(platform: str, video_id: str, format_id: str, preferred_format: str):
+    """Menghapus entri, dipakai ketika pengiriman dengan file_id tersimpan gagal."""
+    conn = _get_conn()
+    conn.execute(
+        "DELETE FROM file_ids WHERE platform=? AND video_id=? AND format_id=? AND preferred_format=?",
+        (platform, video_id, format_id, preferred_format)
+    )
+    conn.commit()
+    logger.info(f"file_id untuk {platform}:{video_id} ({format_id}/{preferred_format}) dihapus dari cache.")
+
+def close():
+    global _conn
+    if _conn is not None:
+        _conn.close()
+        _conn = None
@@ -0,0 +1,170 @@
+# src/service/info_cache.py
+import logging
+import os
+import time
+from collections import OrderedDict
+from yt_dlp.utils import DownloadCancelled
+from .downloader_base import extract_info_sync, select_formats_sync
+from .download_engine import ENGINES, connections_for
+from .executor import run_probe, run_download
+from config import INFO_CACHE_MAX_ENTRIES, INFO_CACHE_TTL_SECONDS, DOWNLOAD_ENGINE
+from src.utils.canonical_url import canonical_key
+from src.utils.url_parser import identify_platform
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+def media_key(info: dict) -> str:
+    """Kunci kanonis sebuah media: '<extractor>:<id video>'."""
+    extractor = (info.get('extractor_key') or info.get('extractor') or 'generic').lower()
+    return f"{extractor}:{info.get('id')}"
+
+class InfoCache:
+    """Cache LRU dengan TTL untuk info dict yt-dlp, dikunci dengan ID video kanonis.
+
+    Beberapa URL (youtu.be, watch?v=..., dsb.) bisa menunjuk ke entri yang sama lewat alias.
+    Hanya diakses dari event loop, jadi tidak perlu lock.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict() # key -> (expires_at, info)
+        self._aliases = {} # url -> key
+        self._urls_by_key = {} # key -> set(url)
+        self.hits = 0
+        self.misses = 0
+
+    def _drop(self, key: str):
+        self._entries.pop(key, None)
+        for url in self._urls_by_key.pop(key, ()):
+            self._aliases.pop(url, None)
+
+    def _key_for(self, url: str) -> str | None:
+        key = self._aliases.get(url)
+        if key is None:
+            # Bentuk URL lain dari video yang sama (youtu.be, shorts, m.) memakai entri yang ada
+            key = canonical_key(url)
+            if key is not None and key in self._entries:
+                self.add_alias(url, key)
+        return key
+
+    def get(self, url: str) -> dict | None:
+        key = self._key_for(url)
+        entry = self._entries.get(key) if key else None
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, info = entry
+        if expires_at < time.monotonic():
+            self._drop(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return info
+
+    def peek(self, url: str) -> dict | None:
+        """Seperti get(), tapi tidak mengubah statistik maupun urutan LRU."""
+        entry = self._entries.get(self._key_for(url))
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1]
+
+    def put(self, url: str, info: dict) -> str:
+        key = media_key(info)
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, info)
+        self._entries.move_to_end(key)
+        self.add_alias(url, key)
+        while len(self._entries) > self.max_entries:
+            oldest_key = next(iter(self._entries))
+            self._drop(oldest_key)
+        return key
+
+    def add_alias(self, url: str, key: str):
+        old_key = self._aliases.get(url)
+        if old_key and old_key != key:
+            self._urls_by_key.get(old_key, set()).discard(url)
+        self._aliases[url] = key
+        self._urls_by_key.setdefault(key, set()).add(url)
+
+    def invalidate(self, url: str):
+        key = self._key_for(url)
+        if key:
+            self._drop(key)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits / lookups) if lookups else 0.0,
+        }
+
+_cache = InfoCache(INFO_CACHE_MAX_ENTRIES, INFO_CACHE_TTL_SECONDS)
+
+def lookup(url: str) -> dict | None:
+    """Mengambil info dari cache tanpa menyentuh jaringan."""
+    return _cache.get(url)
+
+def peek(url: str) -> dict | None:
+    """Mengambil info dari cache tanpa memengaruhi statistik hit/miss."""
+    return _cache.peek(url)
+
+def prime(url: str, info: dict):
+    """Menyimpan info yang sudah di-probe proses lain (mis. front-end untuk job di worker)."""
+    _cache.put(url, info)
+
+def invalidate(url: str):
+    _cache.invalidate(url)
+
+def stats() -> dict:
+    """Statistik hit/miss cache info."""
+    return _cache.stats()
+
+async def get_info(url: str, ydl_opts: dict) -> dict:
+    """Mengambil info dari cache, atau menjalankan extract_info di pool probe jika belum ada."""
+    info = _cache.get(url)
+    metrics.record_cache('info', info is not None)
+    if info is not None:
+        logger.info(f"Info cache HIT untuk {url} (hit rate {_cache.stats()['hit_rate']:.0%})")
+        return info
+    with metrics.StageTimer('probe', identify_platform(url)):
+        info = await run_probe(extract_info_sync, url, ydl_opts)
+    key = _cache.put(url, info)
+    logger.info(f"Info cache MISS untuk {url}, disimpan sebagai {key} (hit rate {_cache.stats()['hit_rate']:.0%})")
+    return info
+
+async def download(url: str, ydl_opts: dict, info: dict | None = None) -> str:
+    """Mengunduh URL, memakai ulang info dari probe jika masih ada di cache.
+
+    info diisi untuk item playlist tanpa URL sendiri (mis. carousel): dipakai langsung, tanpa cache.
+    """
+    with metrics.StageTimer('download', identify_platform(url), ignored=(DownloadCancelled,)) as timer:
+        filename = await _download(url, ydl_opts, info)
+        timer.size_bytes = os.path.getsize(filename) if filename and os.path.exists(filename) else None
+    return filename
+
+async def _download(url: str, ydl_opts: dict, info: dict | None = None) -> str:
+    download_url_sync, download_info_sync = ENGINES[DOWNLOAD_ENGINE]
+    connections = connections_for(identify_platform(url))
+    if info is not None:
+        return await run_download(download_info_sync, info, ydl_opts, connections) # URL hanya menunjuk induknya
+    info = _cache.get(url)
+    if info is not None:
+        try:
+            return await run_download(download_info_sync, info, ydl_opts, connections)
+        except DownloadCancelled:
+            raise
+        except Exception as e:
+            # URL format bisa sudah kedaluwarsa; buang cache dan ekstraksi ulang
+            logger.warning(f"Unduhan dengan info cache gagal untuk {url}: {e}. Mengekstraksi ulang.")
+            _cache.invalidate(url)
+    return await run_download(download_url_sync, url, ydl_opts, connections)
+
+async def select_formats(url: str, ydl_opts: dict, info: dict | None = None) -> list:
+    """Format yang akan diunduh untuk ydl_opts['format'], dipilih dari info (di cache, atau probe baru)."""
+    if info is None:
+        info = await get_info(url, ydl_opts)
+    return await run_probe(select_formats_sync, info, ydl_opts)
@@ -1,8 +1,8 @@
 # src/services/instagram.py
-import yt_dlp
 import logging
 import os
 from .downloader_base import get_human_readable_size, get_common_ydl_opts
+from . import info_cache, audio_pipeline, postprocess
 from config import IG_USERNAME, IG_PASSWORD, TEMP_DOWNLOAD_PATH
 
 logger = logging.getLogger(__name__)
@@ -13,12 +13,11 @@ async def get_video_formats(url: str) -> list | None:
         ydl_opts['username'] = IG_USERNAME
         ydl_opts['password'] = IG_PASSWORD
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
-            size = info.get('filesize') or info.get('filesize_approx')
-            return [{'id': 'best', 'res': 'Best Quality',
-                     'size_mb': get_human_readable_size(size) if size else 'Unknown',
-                     'size_bytes': size, 'url': url, 'has_audio': True}]
+        info = await info_cache.get_info(url, ydl_opts)
+        size = info.get('filesize') or info.get('filesize_approx')
+        return [{'id': 'best', 'res': 'Best Quality',
+                 'size_mb': get_human_readable_size(size) if size else 'Unknown',
+                 'size_bytes': size, 'url': url, 'has_audio': True}]
     except Exception as e:
         logger.warning(f"Gagal mendapatkan info format video Instagram ({url}): {e}. Menawarkan opsi default.")
         return [{'id': 'best', 'res': 'Best Quality', 'size_mb': 'Unknown',
@@ -31,11 +30,9 @@ async def download_video(url: str, format_id: str = 'best') -> str | None:
         ydl_opts['username'] = IG_USERNAME
         ydl_opts['password'] = IG_PASSWORD
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=True)
-            filename = ydl.prepare_filename(info)
-            logger.info(f"Instagram video diunduh: {filename}")
-            return filename
+        filename = await info_cache.download(url, ydl_opts)
+        logger.info(f"Instagram video diunduh: {filename}")
+        return filename
     except Exception as e:
         logger.error(f"Gagal mengunduh video Instagram ({url}): {e}")
         return None
@@ -45,39 +42,19 @@ async def get_audio_formats(url: str) -> list | None:
     return None
 
 async def download_audio(url: str, format_id: str = 'best_video_for_audio_extraction', preferred_format: str = 'mp3') -> str | None:
-    output_template = f"{TEMP_DOWNLOAD_PATH}%(title)s_%(id)s_audio.%(ext)s"
+    output_template = f"{TEMP_DOWNLOAD_PATH}%(title)s_%(id)s_%(format_id)s_audio.%(ext)s"
     ydl_opts = get_common_ydl_opts(output_template=output_template)
-    ydl_opts['format'] = 'bestvideo+bestaudio/best'
-    ydl_opts['extract_audio'] = True
-    ydl_opts['audioformat'] = preferred_format
-    ydl_opts['audioquality'] = '0'
+    audio_plan = audio_pipeline.plan_for(url, 'bestaudio/best', preferred_format)
     if IG_USERNAME and IG_PASSWORD:
         ydl_opts['username'] = IG_USERNAME
         ydl_opts['password'] = IG_PASSWORD
-    if preferred_format == 'mp3':
-        ydl_opts['postprocessor_args'] = ['-b:a', '192k']
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=True)
-            filename = ydl.prepare_filename(info)
-            base, current_ext = os.path.splitext(filename)
-            expected_filename = f"{base}.{preferred_format}"
-            if current_ext != f".{preferred_format}" and os.path.exists(filename):
-                if os.path.exists(expected_filename):
-                    logger.info(f"File audio target {expected_filename} sudah ada.")
-                    filename = expected_filename
-                else:
-                    try:
-                        os.rename(filename, expected_filename)
-                        logger.info(f"Audio di-rename dari {filename} ke: {expected_filename}")
-                        filename = expected_filename
-                    except Exception as e_rename:
-                        logger.error(f"Gagal rename audio file dari {filename} ke {expected_filename}: {e_rename}")
-            if not os.path.exists(filename):
-                 logger.error(f"File audio akhir {filename} tidak ditemukan setelah proses download/konversi.")
-                 return None
-            logger.info(f"Instagram audio diunduh dan dikonversi: {filename}")
-            return filename
+        filename = await postprocess.download_audio(url, ydl_opts, audio_plan)
+        if not os.path.exists(filename):
+             logger.error(f"File audio akhir {filename} tidak ditemukan setelah proses download/konversi.")
+             return None
+        logger.info(f"Instagram audio selesai, {audio_pipeline.describe(audio_plan)}: {filename}")
+        return filename
     except Exception as e:
-        logger.error(f"Gagal mengunduh/mengonversi audio Instagram ({url}, to: {preferred_format}): {e}")
-        return None
+        logger.error(f"Gagal mengunduh/mengonversi audio Instagram ({url}, format: {audio_plan['format']}, to: {audio_plan['ext']}): {e}", exc_info=True)
+        return None
\ No newline at end of file
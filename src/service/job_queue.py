@@ -0,0 +1,238 @@
+# src/service/job_queue.py
+import json
+import logging
+import os
+import sqlite3
+import time
+from config import (
+    JOB_QUEUE_PATH, JOB_LEASE_SECONDS, JOB_MAX_ATTEMPTS, USER_MAX_RUNNING_JOBS, USER_MAX_PENDING_JOBS
+)
+from .scheduler import UNKNOWN_SIZE_BYTES, AGING_SECONDS
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# Antrean job bersama antara front-end bot dan proses worker. SQLite (WAL) cukup untuk banyak
+# proses di satu mesin; antar mesin butuh backend lain dengan fungsi yang sama (SQLite di
+# network filesystem tidak aman). Status dan hasil job dikirim balik lewat tabel events,
+# ditujukan ke front-end asal (origin) yang memegang pesan status di chat.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    origin TEXT NOT NULL,
+    user_id INTEGER NOT NULL,
+    chat_id INTEGER NOT NULL,
+    message_id INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    cache_key TEXT,
+    size_bytes INTEGER,
+    status TEXT NOT NULL DEFAULT 'queued',
+    worker TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_until REAL,
+    created_at REAL NOT NULL,
+    started_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, user_id);
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id INTEGER NOT NULL,
+    origin TEXT NOT NULL,
+    type TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_events_origin ON events (origin, id);
+"""
+
+# Prioritas sama dengan scheduler lokal; parameter: (UNKNOWN_SIZE_BYTES, sekarang, AGING_SECONDS)
+_PRIORITY = "COALESCE(size_bytes, ?) / (1 + (? - created_at) / ?)"
+_RANKED = (f"SELECT id, chat_id, message_id, origin, ROW_NUMBER() OVER (ORDER BY {_PRIORITY}, id) AS position "
+           "FROM jobs WHERE status='queued'")
+
+_conn = None
+
+def _get_conn() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        folder = os.path.dirname(JOB_QUEUE_PATH)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        # Autocommit; transaksi yang perlu atomik memakai BEGIN IMMEDIATE secara eksplisit
+        _conn = sqlite3.connect(JOB_QUEUE_PATH, timeout=30, isolation_level=None, check_same_thread=False)
+        _conn.row_factory = sqlite3.Row
+        _conn.execute("PRAGMA journal_mode=WAL") # Pembaca tidak memblokir penulis dari proses lain
+        _conn.executescript(_SCHEMA)
+        logger.info(f"Antrean job dibuka: {JOB_QUEUE_PATH}")
+    return _conn
+
+def _job_dict(row: sqlite3.Row) -> dict:
+    job = dict(row)
+    job['params'] = json.loads(job['params'])
+    job['cache_key'] = tuple(json.loads(job['cache_key'])) if job['cache_key'] else None
+    return job
+
+def enqueue(origin: str, user_id: int, chat_id: int, message_id: int, kind: str, params: dict,
+            cache_key: tuple | None, size_bytes: int | None) -> dict:
+    """Mengantrekan job. Mengembalikan {'accepted': True, 'job_id', 'position'} atau
+    {'accepted': False, 'reason'} jika user sudah mencapai USER_MAX_PENDING_JOBS."""
+    conn = _get_conn()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        pending = conn.execute(
+            "SELECT COUNT(*) FROM jobs WHERE user_id=? AND status IN ('queued', 'running')", (user_id,)
+        ).fetchone()[0]
+        if pending >= USER_MAX_PENDING_JOBS:
+            conn.execute("ROLLBACK")
+            return {'accepted': False, 'reason': f"Anda masih punya {USER_MAX_PENDING_JOBS} unduhan yang berjalan/menunggu."}
+        job_id = conn.execute(
+            "INSERT INTO jobs (origin, user_id, chat_id, message_id, kind, params, cache_key, size_bytes, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (origin, user_id, chat_id, message_id, kind, json.dumps(params),
+             json.dumps(cache_key) if cache_key else None, size_bytes, time.time())
+        ).lastrowid
+        position = conn.execute(
+            f"SELECT position FROM ({_RANKED}) WHERE id=?", (UNKNOWN_SIZE_BYTES, time.time(), AGING_SECONDS, job_id)
+        ).fetchone()[0]
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    logger.info(f"Job {job_id} ({kind}, user {user_id}, ~{size_bytes or 'N/A'} byte) masuk antrean bersama.")
+    return {'accepted': True, 'job_id': job_id, 'position': position}
+
+def claim(worker: str) -> dict | None:
+    """Mengambil job berikutnya untuk worker ini, atau None.
+
+    Urutannya sama dengan scheduler lokal: file kecil dulu dengan penuaan, dan user yang sudah
+    punya USER_MAX_RUNNING_JOBS job berjalan dilewati.
+    """
+    conn = _get_conn()
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute(
+            "SELECT * FROM jobs WHERE status='queued' AND user_id NOT IN ("
+            " SELECT user_id FROM jobs WHERE status='running' GROUP BY user_id HAVING COUNT(*) >= ?) "
+            f"ORDER BY {_PRIORITY}, id LIMIT 1",
+            (USER_MAX_RUNNING_JOBS, UNKNOWN_SIZE_BYTES, now, AGING_SECONDS)
+        ).fetchone()
+        if row is not None:
+            conn.execute(
+                "UPDATE jobs SET status='running', worker=?, lease_until=?, started_at=?, attempts=attempts+1 WHERE id=?",
+                (worker, now + JOB_LEASE_SECONDS, now, row['id'])
+            )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    if row is None:
+        return None
+    metrics.record_wait('job_queue', now - row['created_at'])
+    logger.info(f"Job {row['id']} diambil worker {worker} setelah menunggu {now - row['created_at']:.1f} dtk.")
+    return _job_dict(row)
+
+def renew(job_id: int, worker: str) -> bool:
+    """Memperpanjang lease job yang sedang dikerjakan. False jika job sudah diambil alih."""
+    cursor = _get_conn().execute(
+        "UPDATE jobs SET lease_until=? WHERE id=? AND worker=? AND status='running'",
+        (time.time() + JOB_LEASE_SECONDS, job_id, worker)
+    )
+    return cursor.rowcount == 1
+
+def post_event(job_id: int, event_type: str, payload: dict | None = None):
+    """Mengirim status/hasil job ke front-end asalnya."""
+    _get_conn().execute(
+        "INSERT INTO events (job_id, origin, type, payload, created_at) SELECT id, origin, ?, ?, ? FROM jobs WHERE id=?",
+        (event_type, json.dumps(payload or {}), time.time(), job_id)
+    )
+
+def finish(job_id: int, worker: str, delivery: dict | None):
+    """Menandai job selesai dan mengirim event 'done' berisi hasil kirim ({'source', 'file_ref'} atau None)."""
+    conn = _get_conn()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        cursor = conn.execute("UPDATE jobs SET status='done', lease_until=NULL WHERE id=? AND worker=? AND status='running'", (job_id, worker))
+        if cursor.rowcount == 1: # Lease yang sudah diambil alih worker lain tidak boleh menutup job-nya
+            post_event(job_id, 'done', {'delivery': delivery})
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+def release_worker(worker: str) -> int:
+    """Mengembalikan job yang sedang dikerjakan worker ini ke antrean (berhenti dengan rapi)."""
+    cursor = _get_conn().execute(
+        "UPDATE jobs SET status='queued', worker=NULL, lease_until=NULL, attempts=attempts-1 "
+        "WHERE worker=? AND status='running'", (worker,)
+    )
+    return cursor.rowcount
+
+def requeue_expired() -> int:
+    """Job yang lease-nya habis (worker mati) diantrekan ulang, atau gagal setelah JOB_MAX_ATTEMPTS."""
+    conn = _get_conn()
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        expired = conn.execute(
+            "SELECT id, worker, attempts FROM jobs WHERE status='running' AND lease_until < ?", (now,)
+        ).fetchall()
+        for row in expired:
+            if row['attempts'] >= JOB_MAX_ATTEMPTS:
+                conn.execute("UPDATE jobs SET status='failed', worker=NULL, lease_until=NULL WHERE id=?", (row['id'],))
+                post_event(row['id'], 'failed', {'error': f"worker {row['worker']} berhenti merespons"})
+            else:
+                conn.execute("UPDATE jobs SET status='queued', worker=NULL, lease_until=NULL WHERE id=?", (row['id'],))
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    for row in expired:
+        logger.warning(f"Lease job {row['id']} milik worker {row['worker']} habis (percobaan ke-{row['attempts']}).")
+    return len(expired)
+
+def positions(origin: str) -> list:
+    """Posisi antrean job milik front-end ini: [{'id', 'chat_id', 'message_id', 'position'}], urutan sama dengan claim()."""
+    rows = _get_conn().execute(
+        f"SELECT id, chat_id, message_id, position FROM ({_RANKED}) WHERE origin=?",
+        (UNKNOWN_SIZE_BYTES, time.time(), AGING_SECONDS, origin)
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+def take_events(origin: str, limit: int = 100) -> list:
+    """Event untuk front-end ini, urut sesuai waktu kirim, beserta data job-nya."""
+    rows = _get_conn().execute(
+        "SELECT events.id, events.job_id, events.type, events.payload, jobs.chat_id, jobs.message_id, jobs.cache_key "
+        "FROM events JOIN jobs ON jobs.id = events.job_id WHERE events.origin=? ORDER BY events.id LIMIT ?",
+        (origin, limit)
+    ).fetchall()
+    events = []
+    for row in rows:
+        event = dict(row)
+        event['payload'] = json.loads(event['payload'])
+        event['cache_key'] = tuple(json.loads(event['cache_key'])) if event['cache_key'] else None
+        events.append(event)
+    return events
+
+def ack_events(event_ids: list, finished_job_ids: list):
+    """Menghapus event yang sudah diterapkan beserta job yang sudah tuntas."""
+    conn = _get_conn()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.executemany("DELETE FROM events WHERE id=?", [(event_id,) for event_id in event_ids])
+        conn.executemany("DELETE FROM jobs WHERE id=?", [(job_id,) for job_id in finished_job_ids])
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+def stats() -> dict:
+    counts = dict(_get_conn().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+    return {'queued': counts.get('queued', 0), 'running': counts.get('running', 0)}
+
+def close():
+    global _conn
+    if _conn is not None:
+        _conn.close()
+        _conn = None
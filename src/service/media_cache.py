@@ -0,0 +1,154 @@
+# src/service/media_cache.py
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from config import MEDIA_CACHE_ENABLED, MEDIA_CACHE_DIR, MEDIA_CACHE_MAX_BYTES
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# Cache media hasil unduhan di disk, dikunci (id video, format, container).
+# Indeks disimpan di index.json agar bertahan setelah restart. File yang sedang dipakai
+# (di-pin) tidak akan dihapus oleh eviction LRU.
+INDEX_FILE = os.path.join(MEDIA_CACHE_DIR, 'index.json')
+
+_index = None # cache_key -> {'file', 'size', 'last_access', 'media', 'container'}
+_pins = {} # path -> jumlah pemakai
+_dirty = False
+
+def _cache_key(media: str, format_id: str, container: str) -> str:
+    return f"{media}|{format_id}|{container}"
+
+def _load_index() -> dict:
+    global _index
+    if _index is not None:
+        return _index
+    if not os.path.exists(MEDIA_CACHE_DIR):
+        os.makedirs(MEDIA_CACHE_DIR)
+    try:
+        with open(INDEX_FILE, 'r', encoding='utf-8') as f:
+            loaded = json.load(f)
+    except FileNotFoundError:
+        loaded = {}
+    except Exception as e:
+        logger.error(f"Indeks cache media rusak, mulai dari kosong: {e}")
+        loaded = {}
+    # Buang entri yang file-nya sudah tidak ada
+    _index = {key: entry for key, entry in loaded.items()
+              if os.path.exists(os.path.join(MEDIA_CACHE_DIR, entry['file']))}
+    logger.info(f"Cache media dimuat: {len(_index)} file, {total_bytes() / (1024 * 1024):.2f} MB.")
+    return _index
+
+def _save_index():
+    global _dirty
+    tmp_path = INDEX_FILE + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(_index, f)
+    os.replace(tmp_path, INDEX_FILE)
+    _dirty = False
+
+def _path_of(entry: dict) -> str:
+    return os.path.join(MEDIA_CACHE_DIR, entry['file'])
+
+def _pin(path: str):
+    _pins[path] = _pins.get(path, 0) + 1
+
+def total_bytes() -> int:
+    return sum(entry['size'] for entry in (_index or {}).values())
+
+def _evict(needed_bytes: int = 0):
+    """Menghapus entri yang paling lama tidak diakses hingga muat dalam kuota."""
+    for key, entry in sorted(_index.items(), key=lambda item: item[1]['last_access']):
+        if total_bytes() + needed_bytes <= MEDIA_CACHE_MAX_BYTES:
+            break
+        path = _path_of(entry)
+        if _pins.get(path):
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        del _index[key]
+        logger.info(f"Cache media: {entry['file']} dikeluarkan (LRU).")
+
+def lookup(media: str, format_id: str, container: str) -> str | None:
+    """Path file yang sudah ada di cache (dan mem-pin-nya), atau None."""
+    global _dirty
+    if not MEDIA_CACHE_ENABLED:
+        return None
+    entry = _load_index().get(_cache_key(media, format_id, container))
+    hit = entry is not None and os.path.exists(_path_of(entry))
+    metrics.record_cache('media', hit)
+    if not hit:
+        return None
+    entry['last_access'] = time.time()
+    _dirty = True
+    path = _path_of(entry)
+    _pin(path)
+    logger.info(f"Cache media HIT: {media} ({format_id}/{container}).")
+    return path
+
+def find_video(media: str) -> str | None:
+    """Video apa pun dari media yang sama (untuk ekstraksi audio lokal), di-pin jika ditemukan."""
+    if not MEDIA_CACHE_ENABLED:
+        return None
+    for entry in _load_index().values():
+        if entry['media'] == media and entry['container'] == 'mp4' and os.path.exists(_path_of(entry)):
+            path = _path_of(entry)
+            _pin(path)
+            return path
+    return None
+
+def store(media: str, format_id: str, container: str, file_path: str) -> str:
+    """Memindahkan file ke cache dan mengembalikan path barunya (sudah di-pin).
+
+    Jika cache nonaktif atau file tidak bisa dimuat dalam kuota, path asli dikembalikan apa adanya.
+    """
+    if not MEDIA_CACHE_ENABLED or not file_path or not os.path.exists(file_path):
+        return file_path
+    size = os.path.getsize(file_path)
+    if size > MEDIA_CACHE_MAX_BYTES:
+        return file_path
+    index = _load_index()
+    key = _cache_key(media, format_id, container)
+    file_name = hashlib.sha1(key.encode('utf-8')).hexdigest() + os.path.splitext(file_path)[1]
+    cached_path = os.path.join(MEDIA_CACHE_DIR, file_name)
+    previous = index.get(key)
+    if previous is not None and previous['file'] != file_name:
+        # Kunci yang sama dengan ekstensi lain: file lama tidak lagi dirujuk indeks
+        if _pins.get(_path_of(previous)):
+            return file_path # Masih dipakai; file baru tetap file sementara
+        try:
+            os.remove(_path_of(previous))
+        except FileNotFoundError:
+            pass
+        del index[key]
+    _evict(needed_bytes=size)
+    if total_bytes() - (index[key]['size'] if key in index else 0) + size > MEDIA_CACHE_MAX_BYTES:
+        logger.info(f"Cache media penuh oleh file yang sedang dipakai, {media} ({format_id}/{container}) tidak disimpan.")
+        return file_path
+    try:
+        os.replace(file_path, cached_path)
+    except OSError:
+        shutil.move(file_path, cached_path) # Folder unduhan di filesystem lain
+    index[key] = {'file': file_name, 'size': size, 'last_access': time.time(), 'media': media, 'container': container}
+    _save_index()
+    _pin(cached_path)
+    logger.info(f"Cache media: {media} ({format_id}/{container}) disimpan, total {total_bytes() / (1024 * 1024):.2f} MB.")
+    return cached_path
+
+def release_path(file_path: str) -> bool:
+    """Melepas pin. True jika file milik cache (pemanggil tidak boleh menghapusnya)."""
+    if file_path not in _pins:
+        return False
+    _pins[file_path] -= 1
+    if _pins[file_path] <= 0:
+        del _pins[file_path]
+    return True
+
+def close():
+    if _index is not None and _dirty:
+        _save_index()
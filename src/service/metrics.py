@@ -0,0 +1,140 @@
+# src/service/metrics.py
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Metrik per tahap dalam format teks Prometheus, tanpa dependensi tambahan.
+# Bisa dipanggil dari thread executor, jadi semua perubahan lewat satu lock.
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+THROUGHPUT_BUCKETS = (64 * 1024, 256 * 1024, 1024 ** 2, 4 * 1024 ** 2, 16 * 1024 ** 2, 64 * 1024 ** 2, 256 * 1024 ** 2)
+
+METRICS = {
+    'bot_stage_duration_seconds': ('histogram', "Durasi per tahap (probe, download, postprocess, upload_botapi, upload_telethon).", DURATION_BUCKETS),
+    'bot_stage_throughput_bytes_per_second': ('histogram', "Byte per detik per tahap.", THROUGHPUT_BUCKETS),
+    'bot_stage_bytes_total': ('counter', "Total byte yang diproses per tahap.", None),
+    'bot_stage_failures_total': ('counter', "Jumlah kegagalan per tahap dan platform.", None),
+    'bot_queue_wait_seconds': ('histogram', "Waktu tunggu di antrean (scheduler dan pool executor).", DURATION_BUCKETS),
+    'bot_cache_requests_total': ('counter', "Lookup cache per hasil (hit/miss).", None),
+    'bot_rate_limited_total': ('counter', "Link yang ditolak batas laju, per bucket (user/platform/global).", None),
+}
+
+_lock = threading.Lock()
+_series = {} # (nama, label terurut) -> counter: nilai | histogram: {'buckets', 'sum', 'count'}
+_gauge_collectors = [] # fungsi -> [(nama, help, {label: nilai}, nilai)]
+
+def _labels_key(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def inc(name: str, value: float = 1, **labels):
+    key = (name, _labels_key(labels))
+    with _lock:
+        _series[key] = _series.get(key, 0) + value
+
+def observe(name: str, value: float, **labels):
+    buckets = METRICS[name][2]
+    key = (name, _labels_key(labels))
+    with _lock:
+        series = _series.get(key)
+        if series is None:
+            series = _series[key] = {'buckets': [0] * len(buckets), 'sum': 0.0, 'count': 0}
+        for i, bound in enumerate(buckets):
+            if value <= bound:
+                series['buckets'][i] += 1
+        series['sum'] += value
+        series['count'] += 1
+
+def observe_stage(stage: str, platform: str, seconds: float, size_bytes: int | None = None):
+    """Mencatat durasi satu tahap, dan throughput-nya jika jumlah byte diketahui."""
+    observe('bot_stage_duration_seconds', seconds, stage=stage, platform=platform)
+    if size_bytes:
+        inc('bot_stage_bytes_total', size_bytes, stage=stage, platform=platform)
+        if seconds > 0:
+            observe('bot_stage_throughput_bytes_per_second', size_bytes / seconds, stage=stage, platform=platform)
+
+def record_failure(stage: str, platform: str):
+    inc('bot_stage_failures_total', stage=stage, platform=platform)
+
+def record_wait(queue: str, seconds: float):
+    observe('bot_queue_wait_seconds', seconds, queue=queue)
+
+def record_cache(cache: str, hit: bool):
+    inc('bot_cache_requests_total', cache=cache, result='hit' if hit else 'miss')
+
+def record_rate_limited(scope: str, platform: str):
+    inc('bot_rate_limited_total', scope=scope, platform=platform)
+
+class StageTimer:
+    """with metrics.StageTimer('download', platform) as t: ...; t.size_bytes = n
+
+    Exception dicatat sebagai failure, bukan durasi; kecuali tipe di ignored (mis. pembatalan).
+    Hasil gagal tanpa exception (mis. {'ok': False}) ditandai dengan t.failed = True.
+    """
+
+    def __init__(self, stage: str, platform: str, ignored: tuple = ()):
+        self.stage = stage
+        self.platform = platform
+        self.ignored = ignored
+        self.size_bytes = None
+        self.failed = False
+
+    def __enter__(self):
+        self.started = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            if issubclass(exc_type, Exception) and not issubclass(exc_type, self.ignored):
+                record_failure(self.stage, self.platform)
+            return False
+        if self.failed:
+            record_failure(self.stage, self.platform)
+            return False
+        observe_stage(self.stage, self.platform, time.monotonic() - self.started, self.size_bytes)
+        return False
+
+def register_gauges(collector):
+    """collector() -> [(nama, help, labels dict, nilai)], dipanggil saat scrape."""
+    _gauge_collectors.append(collector)
+
+def _format_labels(labels: tuple, extra: tuple = ()) -> str:
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (f'{k}="{v.replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"' for k, v in pairs)
+    return '{' + ','.join(escaped) + '}'
+
+def render() -> str:
+    """Semua metrik dalam format teks Prometheus (versi 0.0.4)."""
+    lines = []
+    with _lock:
+        snapshot = {key: (dict(value, buckets=list(value['buckets'])) if isinstance(value, dict) else value)
+                    for key, value in _series.items()}
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for (series_name, labels), value in sorted(snapshot.items()):
+            if series_name != name:
+                continue
+            if kind == 'counter':
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+                continue
+            for bound, count in zip(buckets, value['buckets']):
+                lines.append(f"{name}_bucket{_format_labels(labels, (('le', str(bound)),))} {count}")
+            lines.append(f"{name}_bucket{_format_labels(labels, (('le', '+Inf'),))} {value['count']}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {value['sum']}")
+            lines.append(f"{name}_count{_format_labels(labels)} {value['count']}")
+    gauges = {}
+    for collector in _gauge_collectors:
+        try:
+            for name, help_text, labels, value in collector():
+                gauges.setdefault(name, (help_text, []))[1].append((_labels_key(labels), value))
+        except Exception as e:
+            logger.warning(f"Kolektor gauge gagal: {e}")
+    for name, (help_text, samples) in gauges.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        for labels, value in samples:
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+    return '\n'.join(lines) + '\n'
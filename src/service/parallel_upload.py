@@ -0,0 +1,119 @@
+# src/service/parallel_upload.py
+import asyncio
+import logging
+import math
+import os
+from telethon import helpers
+from telethon.network import MTProtoSender
+from telethon.tl.functions.upload import SaveBigFilePartRequest, SaveFilePartRequest
+from telethon.tl.types import InputFile, InputFileBig
+
+logger = logging.getLogger(__name__)
+
+PART_SIZE = 512 * 1024 # Ukuran part maksimum yang diterima Telegram
+BIG_FILE_THRESHOLD = 10 * 1024 * 1024 # Di atas ini wajib SaveBigFilePart
+
+async def upload_parts(read_part, total_size: int, part_size: int, senders: list, max_retries: int = 3, progress_callback=None) -> int:
+    """Mesin unggah paralel generik, tidak bergantung pada Telethon.
+
+    read_part(offset, size) -> awaitable bytes, senders adalah list coroutine function
+    send(index, total_parts, data). Setiap sender mengambil part berikutnya dari antrean
+    bersama, sehingga N sender = N koneksi yang bekerja bersamaan. Part yang gagal diulang
+    hingga max_retries kali sebelum seluruh unggahan dibatalkan.
+    """
+    total_parts = math.ceil(total_size / part_size)
+    part_indexes = iter(range(total_parts)) # Dibagi antar worker; aman karena satu event loop
+    uploaded = 0
+
+    async def worker(send):
+        nonlocal uploaded
+        for index in part_indexes:
+            size = min(part_size, total_size - index * part_size)
+            data = await read_part(index * part_size, size)
+            for attempt in range(1, max_retries + 1):
+                try:
+                    await send(index, total_parts, data)
+                    break
+                except Exception as e:
+                    if attempt == max_retries:
+                        raise
+                    logger.warning(f"Part {index}/{total_parts} gagal (percobaan {attempt}): {e}. Mengulang...")
+                    await asyncio.sleep(attempt)
+            uploaded += len(data)
+            if progress_callback:
+                progress_callback(uploaded, total_size)
+
+    tasks = [asyncio.create_task(worker(send)) for send in senders]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    return total_parts
+
+def file_part_reader(file_path: str):
+    """Membuat read_part untuk upload_parts yang membaca part dari file di disk."""
+    async def read_part(offset: int, size: int) -> bytes:
+        with open(file_path, 'rb') as f:
+            return await asyncio.to_thread(os.pread, f.fileno(), size, offset)
+    return read_part
+
+async def _open_extra_senders(client, count: int) -> list:
+    """Membuka koneksi MTProto tambahan ke DC akun, memakai auth key sesi yang sama."""
+    senders = []
+    if count <= 0:
+        return senders
+    dc = await client._get_dc(client.session.dc_id)
+    try:
+        for _ in range(count):
+            sender = MTProtoSender(client.session.auth_key, loggers=client._log)
+            await sender.connect(client._connection(dc.ip_address, dc.port, dc.id, loggers=client._log, proxy=client._proxy))
+            senders.append(sender)
+    except Exception:
+        for sender in senders:
+            await sender.disconnect()
+        raise
+    return senders
+
+async def upload_with_reader(client, read_part, total_size: int, file_name: str, connections: int = 4, max_retries: int = 3, progress_callback=None):
+    """Mengunggah part lewat beberapa koneksi dan mengembalikan InputFile/InputFileBig untuk send_file."""
+    file_id = helpers.generate_random_long()
+    is_big = total_size > BIG_FILE_THRESHOLD
+    try:
+        extra_senders = await _open_extra_senders(client, connections - 1)
+    except Exception as e:
+        # Tetap paralel (request dipipeline lewat satu koneksi) jika koneksi tambahan gagal dibuka
+        logger.warning(f"Gagal membuka koneksi unggah tambahan: {e}. Memakai koneksi utama saja.")
+        extra_senders = []
+
+    def make_send(invoke):
+        async def send(index, total_parts, data):
+            if is_big:
+                request = SaveBigFilePartRequest(file_id, index, total_parts, data)
+            else:
+                request = SaveFilePartRequest(file_id, index, data)
+            if not await invoke(request):
+                raise RuntimeError(f"Telegram menolak part {index}")
+        return send
+
+    senders = [make_send(client)] + [make_send(sender.send) for sender in extra_senders]
+    while len(senders) < connections:
+        senders.append(make_send(client))
+    try:
+        logger.info(f"Mengunggah {file_name} ({total_size} byte) lewat {len(extra_senders) + 1} koneksi, {connections} jalur.")
+        total_parts = await upload_parts(read_part, total_size, PART_SIZE, senders, max_retries, progress_callback)
+    finally:
+        for sender in extra_senders:
+            await sender.disconnect()
+    if is_big:
+        return InputFileBig(file_id, total_parts, file_name)
+    return InputFile(file_id, total_parts, file_name, '')
+
+async def upload_file(client, file_path: str, connections: int = 4, max_retries: int = 3, progress_callback=None):
+    """Mengunggah file dari disk secara paralel. Lihat upload_with_reader."""
+    return await upload_with_reader(
+        client, file_part_reader(file_path), os.path.getsize(file_path), os.path.basename(file_path),
+        connections, max_retries, progress_callback
+    )
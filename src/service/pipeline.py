@@ -0,0 +1,106 @@
+# src/service/pipeline.py
+import asyncio
+import logging
+import os
+import threading
+import uuid
+from yt_dlp.utils import DownloadCancelled
+from telethon.tl.types import DocumentAttributeVideo, DocumentAttributeFilename
+from .downloader_base import get_common_ydl_opts
+from . import info_cache, telethon_uploader
+from config import TEMP_DOWNLOAD_PATH, EXECUTOR_MODE
+
+logger = logging.getLogger(__name__)
+
+# Mode pipeline: unggahan part dimulai selagi file progresif masih diunduh,
+# sehingga total waktu mendekati max(unduh, unggah) alih-alih jumlah keduanya.
+POLL_INTERVAL_SECONDS = 0.2
+
+def _is_progressive(f: dict) -> bool:
+    return (f.get('vcodec') not in (None, 'none') and
+            f.get('acodec') not in (None, 'none') and
+            f.get('protocol') in ('http', 'https') and
+            bool(f.get('filesize'))) # Ukuran pasti wajib: jumlah part harus diketahui di awal
+
+def find_progressive_format(info: dict, format_id: str) -> dict | None:
+    """Mencari format single-file (video+audio dalam satu file HTTP) dengan ukuran pasti."""
+    formats = info.get('formats') or []
+    if format_id == 'best':
+        # yt-dlp mengurutkan formats dari terburuk ke terbaik
+        candidates = [f for f in formats if _is_progressive(f)]
+        return candidates[-1] if candidates else None
+    for f in formats:
+        if f.get('format_id') == format_id:
+            return f if _is_progressive(f) else None
+    return None
+
+def plan(url: str, format_id: str) -> dict | None:
+    """Mengembalikan format yang bisa dipipeline untuk URL ini, atau None. Tanpa akses jaringan."""
+    if EXECUTOR_MODE == 'process':
+        return None # Hook pembatalan tidak bisa dikirim ke proses lain
+    info = info_cache.peek(url)
+    if not info:
+        return None
+    return find_progressive_format(info, format_id)
+
+def tailing_part_reader(file_path: str, download_task: asyncio.Task):
+    """read_part untuk parallel_upload yang menunggu sampai byte yang diminta sudah tertulis di disk."""
+    async def read_part(offset: int, size: int) -> bytes:
+        while True:
+            finished = download_task.done()
+            try:
+                available = os.path.getsize(file_path)
+            except FileNotFoundError:
+                available = 0
+            if available >= offset + size:
+                with open(file_path, 'rb') as f:
+                    return await asyncio.to_thread(os.pread, f.fileno(), size, offset)
+            if finished:
+                download_task.result() # Lempar error unduhan jika ada
+                raise RuntimeError(f"Unduhan selesai tetapi file hanya {available} byte, butuh {offset + size}.")
+            await asyncio.sleep(POLL_INTERVAL_SECONDS)
+    return read_part
+
+async def stream_to_telegram(url: str, fmt: dict, chat_id: int, caption: str, progress_callback=None) -> dict:
+    """Mengunduh format progresif sambil mengunggah part-nya lewat pengunggah Telethon."""
+    info = info_cache.peek(url) or {}
+    file_name = f"{info.get('id', 'video')}_{fmt['format_id']}.{fmt.get('ext', 'mp4')}"
+    file_path = os.path.join(TEMP_DOWNLOAD_PATH, f"stream_{uuid.uuid4().hex[:8]}_{file_name}")
+
+    ydl_opts = get_common_ydl_opts(output_template=file_path)
+    ydl_opts['format'] = fmt['format_id']
+    ydl_opts['nopart'] = True # Tulis langsung ke file tujuan agar bisa dibaca selagi berjalan
+    ydl_opts['continuedl'] = False
+    cancelled = threading.Event()
+    def cancel_hook(status):
+        # Thread unduhan tidak bisa di-cancel dari luar; hentikan lewat hook progres
+        if cancelled.is_set():
+            raise DownloadCancelled("Pipeline dibatalkan")
+    ydl_opts.setdefault('progress_hooks', []).append(cancel_hook)
+    download_task = asyncio.create_task(info_cache.download(url, ydl_opts))
+
+    attributes = [
+        DocumentAttributeVideo(
+            duration=int(info.get('duration') or 0), w=fmt.get('width') or 0,
+            h=fmt.get('height') or 0, supports_streaming=True
+        ),
+        DocumentAttributeFilename(file_name),
+    ]
+    logger.info(f"Pipeline unduh-unggah dimulai untuk {url} (format {fmt['format_id']}, {fmt['filesize']} byte).")
+    try:
+        result = await telethon_uploader.upload_stream(
+            chat_id, tailing_part_reader(file_path, download_task), fmt['filesize'], file_name,
+            caption, attributes=attributes, mime_type='video/mp4', progress_callback=progress_callback
+        )
+        if result['ok']:
+            await download_task # Pastikan unduhan sudah benar-benar selesai
+            actual_size = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+            if actual_size != fmt['filesize']:
+                logger.warning(f"Ukuran akhir {file_path} ({actual_size}) berbeda dari perkiraan ({fmt['filesize']}).")
+        return result
+    finally:
+        cancelled.set()
+        await asyncio.gather(download_task, return_exceptions=True)
+        if os.path.exists(file_path):
+            try: os.remove(file_path); logger.info(f"File pipeline {file_path} dihapus.")
+            except Exception as e_remove: logger.error(f"Gagal hapus file pipeline {file_path}: {e_remove}")
@@ -0,0 +1,76 @@
+# src/service/postprocess.py
+import asyncio
+import logging
+import os
+from . import info_cache, progress, metrics
+from src.utils.url_parser import identify_platform
+from .executor import run_postprocess, postprocess_budget, stats as executor_stats
+from .downloader_base import merge_av_sync, extract_audio_from_file_sync
+
+logger = logging.getLogger(__name__)
+
+# Tahap post-processing terpisah: yt-dlp hanya mengunduh stream mentah di pool download,
+# lalu merge/konversi ffmpeg mengantre di pool postprocess yang dibatasi jumlah core.
+# Slot unduhan langsung bebas untuk job berikutnya selagi CPU bekerja.
+
+def _remove(*paths):
+    for path in paths:
+        if path and os.path.exists(path):
+            try: os.remove(path)
+            except Exception as e_remove: logger.error(f"Gagal hapus file sementara {path}: {e_remove}")
+
+async def download_merged(url: str, ydl_opts: dict, info: dict | None = None) -> str:
+    """Seperti info_cache.download, tetapi video+audio diunduh bersamaan lalu digabung di pool postprocess."""
+    try:
+        selected = await info_cache.select_formats(url, ydl_opts, info)
+    except Exception as e:
+        logger.warning(f"Gagal memilih format untuk {url} ({e}), yt-dlp akan menggabungkan sendiri.")
+        selected = []
+    if len(selected) != 2:
+        return await info_cache.download(url, ydl_opts, info)
+
+    video_fmt, audio_fmt = selected
+    results = await asyncio.gather(
+        *(info_cache.download(url, dict(ydl_opts, format=f['format_id']), info) for f in selected),
+        return_exceptions=True
+    )
+    errors = [r for r in results if isinstance(r, BaseException)]
+    if errors:
+        _remove(*[r for r in results if isinstance(r, str)])
+        raise errors[0]
+    video_path, audio_path = results
+    merge_ext = ydl_opts.get('merge_output_format') or 'mkv'
+    output_path = f"{os.path.splitext(video_path)[0]}+{audio_fmt['format_id']}.{merge_ext}"
+    logger.info(f"Merge {video_fmt['format_id']}+{audio_fmt['format_id']} masuk antrean postprocess ({stats()['waiting']} menunggu).")
+    progress.set_phase('postprocess')
+    try:
+        with metrics.StageTimer('postprocess', identify_platform(url)) as timer:
+            await run_postprocess(merge_av_sync, video_path, audio_path, output_path, postprocess_budget()[1])
+            timer.size_bytes = os.path.getsize(output_path)
+    finally:
+        _remove(video_path, audio_path)
+    return output_path
+
+async def download_audio(url: str, ydl_opts: dict, audio_plan: dict, info: dict | None = None) -> str:
+    """Mengunduh stream sumber audio, lalu copy/transcode sesuai audio_plan di pool postprocess."""
+    source_path = await info_cache.download(url, dict(ydl_opts, format=audio_plan['format']), info)
+    base, source_ext = os.path.splitext(source_path)
+    if audio_plan['mode'] == 'copy' and source_ext.lstrip('.') == audio_plan['ext']:
+        return source_path # Sudah dalam container tujuan, ffmpeg tidak perlu dijalankan
+    output_path = f"{base}.{audio_plan['ext']}"
+    progress.set_phase('postprocess')
+    try:
+        with metrics.StageTimer('postprocess', identify_platform(url)) as timer:
+            await run_postprocess(
+                extract_audio_from_file_sync, source_path, output_path, audio_plan['ext'],
+                audio_plan['mode'] == 'transcode', postprocess_budget()[1]
+            )
+            timer.size_bytes = os.path.getsize(output_path)
+    finally:
+        _remove(source_path)
+    return output_path
+
+def stats() -> dict:
+    """Kedalaman antrean postprocess: {'waiting', 'running', 'workers', 'threads'}."""
+    workers, threads = postprocess_budget()
+    return dict(executor_stats()['postprocess'], workers=workers, threads=threads)
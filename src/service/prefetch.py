@@ -0,0 +1,124 @@
+# src/service/prefetch.py
+import asyncio
+import json
+import logging
+import os
+import threading
+from config import EXECUTOR_MODE, PREFETCH_ENABLED, PREFETCH_MAX_BYTES, PREFETCH_TTL_SECONDS, PREFETCH_STATS_PATH
+from .downloader_base import download_cancel_event
+from . import singleflight, scheduler, progress
+
+logger = logging.getLogger(__name__)
+
+# Prefetch spekulatif: selagi menu format tampil, pilihan yang paling mungkin mulai diunduh
+# lewat singleflight dengan kunci yang sama seperti job sungguhan. Jika user memilihnya, job
+# bergabung ke unduhan yang sudah berjalan; jika tidak, konsumen terakhir membatalkannya.
+MIN_SAMPLES = 5 # Riwayat minimal sebelum statistik dipercaya
+MIN_SHARE = 0.5 # Pilihan teratas harus dipilih di >= 50% kasus
+
+_active = {} # user_id -> {'key', 'size_bytes', 'event', 'task', 'joined', 'timer'}
+_stats = None # platform -> {label: jumlah dipilih}
+_stats_dirty = False
+
+def _load_stats() -> dict:
+    global _stats
+    if _stats is None:
+        try:
+            with open(PREFETCH_STATS_PATH, 'r', encoding='utf-8') as f:
+                _stats = json.load(f)
+        except FileNotFoundError:
+            _stats = {}
+        except Exception as e:
+            logger.error(f"Statistik pilihan rusak, mulai dari kosong: {e}")
+            _stats = {}
+    return _stats
+
+def record_choice(platform: str, label: str):
+    """Mencatat pilihan user (mis. 'video:720p', 'audio:best-auto') untuk prediksi berikutnya."""
+    global _stats_dirty
+    counts = _load_stats().setdefault(platform, {})
+    counts[label] = counts.get(label, 0) + 1
+    _stats_dirty = True
+
+def likely_choice(platform: str, labels: list) -> str | None:
+    """Label yang paling mungkin dipilih dari menu ini, atau None jika riwayat belum meyakinkan."""
+    if len(labels) == 1:
+        return labels[0]
+    counts = _load_stats().get(platform, {})
+    total = sum(counts.get(label, 0) for label in labels)
+    if total < MIN_SAMPLES:
+        return None
+    best = max(labels, key=lambda label: counts.get(label, 0))
+    return best if counts.get(best, 0) / total >= MIN_SHARE else None
+
+def bytes_in_flight() -> int:
+    return sum(entry['size_bytes'] for entry in _active.values())
+
+def _consume_result(task: asyncio.Task):
+    if not task.cancelled():
+        task.exception() # Hasil prefetch hanya dipakai lewat singleflight
+
+def start(user_id: int, key: tuple, size_bytes: int | None, run) -> bool:
+    """Memulai prefetch untuk user (menggantikan prefetch sebelumnya). run sama seperti start singleflight."""
+    if not PREFETCH_ENABLED or EXECUTOR_MODE == 'process':
+        return False # Unduhan di proses lain tidak bisa dibatalkan, prefetch yang tidak terpakai tidak bisa dihentikan
+    cancel(user_id)
+    if not size_bytes or bytes_in_flight() + size_bytes > PREFETCH_MAX_BYTES:
+        logger.info(f"Prefetch {key} dilewati: ukuran {size_bytes or 'N/A'} byte melebihi sisa anggaran.")
+        return False
+    if scheduler.stats()['queued']:
+        return False # Job sungguhan sedang mengantre, jangan rebut slot unduhan
+    entry = {'key': key, 'size_bytes': size_bytes, 'event': threading.Event(), 'joined': False}
+
+    def mark_joined():
+        entry['joined'] = True
+
+    async def speculate():
+        download_cancel_event.set(entry['event']) # Hanya untuk context task ini (dan unduhannya)
+        progress.bind(key) # Job yang bergabung nanti langsung melihat progresnya
+        return await singleflight.acquire(key, run, on_joined=mark_joined)
+
+    entry['task'] = asyncio.create_task(speculate(), name=f"prefetch-{user_id}")
+    entry['task'].add_done_callback(_consume_result)
+    entry['timer'] = asyncio.get_running_loop().call_later(PREFETCH_TTL_SECONDS, cancel, user_id)
+    _active[user_id] = entry
+    logger.info(f"Prefetch dimulai untuk user {user_id}: {key} (~{size_bytes} byte, total {bytes_in_flight()} byte).")
+    return True
+
+def cancel(user_id: int, keep_key: tuple | None = None):
+    """Melepas prefetch user. Unduhan dibatalkan kecuali job lain (mis. job dengan keep_key) ikut memakainya."""
+    entry = _active.pop(user_id, None)
+    if entry is None:
+        return
+    entry['timer'].cancel()
+    if not entry['joined']:
+        entry['task'].cancel() # Belum sempat terdaftar di singleflight
+        return
+    last_consumer = singleflight.consumers(entry['key']) <= 1
+    singleflight.release(entry['key'])
+    if last_consumer:
+        entry['event'].set() # Hentikan thread unduhan lewat progress hook
+        logger.info(f"Prefetch {entry['key']} milik user {user_id} dibatalkan.")
+    elif entry['key'] == keep_key:
+        logger.info(f"Prefetch {entry['key']} terpakai oleh pilihan user {user_id}.")
+
+def release_mismatch(user_id: int, chosen_key: tuple | None):
+    """Dipanggil saat user memilih: prefetch yang tidak cocok dibatalkan segera."""
+    entry = _active.get(user_id)
+    if entry is not None and entry['key'] != chosen_key:
+        cancel(user_id)
+
+def stats() -> dict:
+    return {'active': len(_active), 'bytes_in_flight': bytes_in_flight()}
+
+def shutdown():
+    global _stats_dirty
+    for user_id in list(_active):
+        cancel(user_id)
+    if _stats is not None and _stats_dirty:
+        os.makedirs(os.path.dirname(PREFETCH_STATS_PATH) or '.', exist_ok=True)
+        tmp_path = PREFETCH_STATS_PATH + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(_stats, f)
+        os.replace(tmp_path, PREFETCH_STATS_PATH)
+        _stats_dirty = False
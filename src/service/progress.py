@@ -0,0 +1,169 @@
+# src/service/progress.py
+import asyncio
+import contextvars
+import logging
+import time
+from config import PROGRESS_EDIT_INTERVAL_SECONDS, PROGRESS_STALL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Kanal progres per job. Produsen (progress hook yt-dlp di thread unduhan, tahap ffmpeg,
+# callback unggah Telethon) hanya menimpa angka terakhir di kanal; editor per pesan membaca
+# kanal secara berkala dan mengedit pesan Telegram paling sering sekali per interval per chat.
+PHASE_LABELS = {
+    'download': "⬇️ Mengunduh",
+    'postprocess': "⚙️ Memproses (ffmpeg)",
+    'upload': "⬆️ Mengunggah",
+}
+
+# Kunci kanal untuk unduhan yang berjalan di context task ini (dipasang lewat bind())
+current_key = contextvars.ContextVar('progress_key', default=None)
+
+_channels = {} # key -> {'phase', 'parts', 'started_at', 'updated_at', 'watchers', 'stall_logged'}
+# parts: nama file -> (byte selesai, total byte, kecepatan byte/dtk, eta dtk)
+# Tahap ffmpeg tidak melaporkan progres, jadi tidak dianggap macet
+STALL_PHASES = ('download', 'upload')
+_last_edit = {} # chat_id -> waktu edit terakhir
+_editors_per_chat = {}
+
+def bind(key):
+    """Unduhan yang dimulai dari task ini (termasuk task singleflight-nya) melapor ke kanal key."""
+    current_key.set(key)
+
+def _touch(channel: dict):
+    channel['updated_at'] = time.monotonic()
+    channel['stall_logged'] = False
+
+def set_phase(phase: str, key=None):
+    channel = _channels.get(key if key is not None else current_key.get())
+    if channel is not None and channel['phase'] != phase:
+        channel['phase'] = phase
+        channel['parts'] = {}
+        _touch(channel)
+
+def ydl_hook(key):
+    """progress_hooks yt-dlp. Dipanggil dari thread unduhan; hanya menimpa nilai di dict."""
+    def hook(status):
+        channel = _channels.get(key)
+        if channel is None or status.get('status') != 'downloading':
+            return
+        if channel['phase'] != 'download':
+            channel['phase'] = 'download'
+            channel['parts'] = {}
+        total = status.get('total_bytes') or status.get('total_bytes_estimate')
+        # Video dan audio bisa diunduh bersamaan: dijumlahkan per file
+        channel['parts'][status.get('filename')] = (
+            status.get('downloaded_bytes') or 0, total, status.get('speed'), status.get('eta')
+        )
+        _touch(channel)
+    return hook
+
+def upload_callback(key):
+    """progress_callback(uploaded, total) untuk pengunggah Telethon."""
+    def callback(uploaded_bytes, total_bytes):
+        channel = _channels.get(key)
+        if channel is None:
+            return
+        now = time.monotonic()
+        if channel['phase'] != 'upload':
+            channel['phase'] = 'upload'
+            channel['upload_started_at'] = now
+        elapsed = now - channel['upload_started_at']
+        speed = uploaded_bytes / elapsed if elapsed > 0 and uploaded_bytes else None
+        eta = (total_bytes - uploaded_bytes) / speed if speed else None
+        channel['parts'] = {'upload': (uploaded_bytes, total_bytes, speed, eta)}
+        _touch(channel)
+    return callback
+
+def render(channel: dict) -> str:
+    text = PHASE_LABELS.get(channel['phase'], "⏳ Memproses")
+    parts = list(channel['parts'].values())
+    done = sum(part[0] for part in parts)
+    total = sum(part[1] or 0 for part in parts)
+    if total and all(part[1] for part in parts):
+        text += f"... {min(done / total, 1):.0%} ({done / (1024 * 1024):.1f}/{total / (1024 * 1024):.1f} MB)"
+    elif done:
+        text += f"... {done / (1024 * 1024):.1f} MB"
+    else:
+        text += "..."
+    speed = sum(part[2] or 0 for part in parts)
+    eta = max((part[3] for part in parts if part[3] is not None), default=None)
+    if speed:
+        text += f" • {speed / (1024 * 1024):.1f} MB/s"
+    if eta:
+        text += f" • sisa {int(eta)} dtk"
+    return text
+
+async def _edit_loop(key, chat_id: int, edit):
+    last_text = None
+    while True:
+        await asyncio.sleep(PROGRESS_EDIT_INTERVAL_SECONDS)
+        channel = _channels.get(key)
+        if channel is None:
+            continue
+        idle = time.monotonic() - channel['updated_at']
+        if idle > PROGRESS_STALL_SECONDS and channel['phase'] in STALL_PHASES and not channel['stall_logged']:
+            channel['stall_logged'] = True
+            logger.warning(f"Job {key} macet: tidak ada progres selama {idle:.0f} dtk (tahap {channel['phase']}).")
+        text = render(channel)
+        now = time.monotonic()
+        if text == last_text or now - _last_edit.get(chat_id, 0) < PROGRESS_EDIT_INTERVAL_SECONDS:
+            continue
+        _last_edit[chat_id] = now
+        try:
+            await edit(text)
+            last_text = text
+        except Exception as e:
+            logger.debug(f"Edit progres {key} gagal: {e}")
+
+def watch(key, chat_id: int, edit, phase: str = 'download') -> dict:
+    """Mulai menampilkan progres kanal key lewat edit(text). Wajib diakhiri unwatch()."""
+    channel = _channels.get(key)
+    if channel is None:
+        now = time.monotonic()
+        channel = {'phase': phase, 'parts': {}, 'started_at': now, 'updated_at': now, 'watchers': 0, 'stall_logged': False}
+        _channels[key] = channel
+    channel['watchers'] += 1
+    _editors_per_chat[chat_id] = _editors_per_chat.get(chat_id, 0) + 1
+    task = asyncio.create_task(_edit_loop(key, chat_id, edit), name=f"progress-{key}")
+    return {'key': key, 'chat_id': chat_id, 'task': task, 'active': True}
+
+async def unwatch(editor: dict):
+    """Menghentikan editor (menunggu edit yang sedang berjalan dibatalkan). Aman dipanggil berulang."""
+    if not editor['active']:
+        return
+    editor['active'] = False
+    editor['task'].cancel()
+    await asyncio.gather(editor['task'], return_exceptions=True)
+    channel = _channels.get(editor['key'])
+    if channel is not None:
+        channel['watchers'] -= 1
+        if channel['watchers'] <= 0:
+            del _channels[editor['key']]
+    chat_id = editor['chat_id']
+    _editors_per_chat[chat_id] -= 1
+    if _editors_per_chat[chat_id] <= 0:
+        del _editors_per_chat[chat_id]
+        _last_edit.pop(chat_id, None)
+
+def stalled() -> list:
+    """Job tanpa progres lebih lama dari PROGRESS_STALL_SECONDS, untuk operator."""
+    now = time.monotonic()
+    return [
+        {'key': key, 'phase': channel['phase'], 'idle_seconds': now - channel['updated_at']}
+        for key, channel in _channels.items()
+        if channel['phase'] in STALL_PHASES and now - channel['updated_at'] > PROGRESS_STALL_SECONDS
+    ]
+
+def snapshot() -> list:
+    """Keadaan semua kanal aktif: tahap, byte, kecepatan, umur."""
+    now = time.monotonic()
+    result = []
+    for key, channel in _channels.items():
+        parts = list(channel['parts'].values())
+        result.append({
+            'key': key, 'phase': channel['phase'], 'done_bytes': sum(part[0] for part in parts),
+            'total_bytes': sum(part[1] or 0 for part in parts), 'speed': sum(part[2] or 0 for part in parts),
+            'age_seconds': now - channel['started_at'], 'idle_seconds': now - channel['updated_at'],
+        })
+    return result
@@ -0,0 +1,133 @@
+# src/service/rate_limit.py
+import logging
+import os
+import sqlite3
+import time
+from config import (
+    RATE_LIMIT_USER_BURST, RATE_LIMIT_USER_PER_MINUTE, RATE_LIMIT_PLATFORM_BURST, RATE_LIMIT_PLATFORM_PER_MINUTE,
+    RATE_LIMIT_GLOBAL_BURST, RATE_LIMIT_GLOBAL_PER_MINUTE, RATE_LIMIT_BACKEND, RATE_LIMIT_PATH
+)
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# Token bucket per user, per platform dan global. Satu link mengambil satu token dari ketiganya
+# sekaligus, atau tidak sama sekali. State sebuah bucket hanya (token, waktu update, waktu penuh),
+# jadi setiap pengecekan O(1). Backend 'sqlite' menyimpan state yang sama di satu file agar batasnya
+# berlaku untuk semua instance bot di mesin yang sama.
+MAX_TRACKED_BUCKETS = 10000 # Bucket yang sudah penuh kembali dibuang agar memori tidak tumbuh terus
+SQLITE_PRUNE_EVERY = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    full_at REAL NOT NULL
+);
+"""
+
+_buckets = {} # key -> (tokens, updated_at, full_at), waktu monotonic
+_pruned_at = 0.0
+_conn = None
+_sqlite_checks = 0
+
+def _limits(user_id: int, platform: str) -> list:
+    """[(scope, key, burst, token per detik)] untuk bucket yang aktif."""
+    platform_per_minute = RATE_LIMIT_PLATFORM_PER_MINUTE.get(platform, RATE_LIMIT_PLATFORM_PER_MINUTE['other'])
+    limits = [
+        ('user', f"user:{user_id}", RATE_LIMIT_USER_BURST, RATE_LIMIT_USER_PER_MINUTE / 60),
+        ('platform', f"platform:{platform}", RATE_LIMIT_PLATFORM_BURST, platform_per_minute / 60),
+        ('global', 'global', RATE_LIMIT_GLOBAL_BURST, RATE_LIMIT_GLOBAL_PER_MINUTE / 60),
+    ]
+    return [(scope, key, max(1, burst), rate) for scope, key, burst, rate in limits if rate > 0]
+
+def _decide(limits: list, states: dict, now: float) -> tuple[dict, dict]:
+    """Hasil pengecekan dan state baru untuk disimpan (kosong jika ditolak)."""
+    levels = []
+    for _, key, burst, rate in limits:
+        state = states.get(key)
+        levels.append(float(burst) if state is None else min(float(burst), state[0] + (now - state[1]) * rate))
+    waits = [((1 - level) / rate, scope) for (scope, _, _, rate), level in zip(limits, levels) if level < 1]
+    if waits:
+        retry_after, scope = max(waits)
+        return {'allowed': False, 'scope': scope, 'retry_after': retry_after}, {}
+    updates = {}
+    for (_, key, burst, rate), level in zip(limits, levels):
+        updates[key] = (level - 1, now, now + (burst - level + 1) / rate)
+    return {'allowed': True}, updates
+
+def _check_memory(limits: list) -> dict:
+    global _pruned_at
+    now = time.monotonic()
+    result, updates = _decide(limits, _buckets, now)
+    _buckets.update(updates)
+    if len(_buckets) > MAX_TRACKED_BUCKETS and now - _pruned_at >= 1: # Paling sering sekali per detik
+        _pruned_at = now
+        for key in [key for key, state in _buckets.items() if state[2] <= now]:
+            del _buckets[key]
+    return result
+
+def _get_conn() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        folder = os.path.dirname(RATE_LIMIT_PATH)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        _conn = sqlite3.connect(RATE_LIMIT_PATH, timeout=5, isolation_level=None, check_same_thread=False)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.executescript(_SCHEMA)
+        logger.info(f"State batas laju dibagi lewat {RATE_LIMIT_PATH}")
+    return _conn
+
+def _check_sqlite(limits: list) -> dict:
+    global _sqlite_checks
+    conn = _get_conn()
+    now = time.time() # Jam dinding: dibandingkan antar proses
+    keys = [key for _, key, _, _ in limits]
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        rows = conn.execute(
+            f"SELECT key, tokens, updated_at, full_at FROM buckets WHERE key IN ({', '.join('?' * len(keys))})", keys
+        ).fetchall()
+        result, updates = _decide(limits, {row[0]: tuple(row[1:]) for row in rows}, now)
+        conn.executemany(
+            "INSERT INTO buckets (key, tokens, updated_at, full_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET tokens=excluded.tokens, updated_at=excluded.updated_at, full_at=excluded.full_at",
+            [(key, *state) for key, state in updates.items()]
+        )
+        _sqlite_checks += 1
+        if _sqlite_checks % SQLITE_PRUNE_EVERY == 0:
+            conn.execute("DELETE FROM buckets WHERE full_at <= ?", (now,))
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return result
+
+def check(user_id: int, platform: str) -> dict:
+    """Mengambil satu token untuk link dari user ini. Mengembalikan {'allowed': True} atau
+    {'allowed': False, 'scope': 'user'|'platform'|'global', 'retry_after': detik}."""
+    limits = _limits(user_id, platform)
+    if not limits:
+        return {'allowed': True}
+    if RATE_LIMIT_BACKEND == 'sqlite':
+        try:
+            result = _check_sqlite(limits)
+        except sqlite3.Error as e:
+            # State bersama tidak terbaca: tetap dibatasi, tapi hanya di proses ini
+            logger.warning(f"Gagal membaca state batas laju di {RATE_LIMIT_PATH}: {e}. Memakai state lokal.")
+            result = _check_memory(limits)
+    else:
+        result = _check_memory(limits)
+    if not result['allowed']:
+        metrics.record_rate_limited(result['scope'], platform)
+        logger.info(f"Link dari user {user_id} ({platform}) ditolak batas laju {result['scope']}, "
+                    f"coba lagi dalam {result['retry_after']:.1f} dtk.")
+    return result
+
+def close():
+    global _conn
+    if _conn is not None:
+        _conn.close()
+        _conn = None
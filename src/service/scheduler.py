@@ -0,0 +1,119 @@
+# src/service/scheduler.py
+import asyncio
+import itertools
+import logging
+import time
+from . import metrics
+from config import MAX_CONCURRENT_JOBS, USER_MAX_RUNNING_JOBS, USER_MAX_PENDING_JOBS
+
+logger = logging.getLogger(__name__)
+
+# Ukuran dipakai jika perkiraan tidak ada: cukup besar agar file kecil yang diketahui didahulukan
+UNKNOWN_SIZE_BYTES = 500 * 1024 * 1024
+# Penuaan: setiap menit menunggu "mengecilkan" prioritas job agar file besar tidak kelaparan
+AGING_SECONDS = 60
+
+_job_ids = itertools.count(1)
+_queue = [] # Job yang menunggu, dipilih ulang setiap dispatch (antrean kecil, O(n) cukup)
+_running = {} # job_id -> job
+_running_per_user = {}
+_pending_per_user = {} # Menunggu + berjalan
+_notifier = None # Task pengirim posisi antrean (paling banyak satu)
+_positions_dirty = False
+
+def _priority(job: dict, now: float) -> float:
+    size = job['size_bytes'] or UNKNOWN_SIZE_BYTES
+    waited = now - job['submitted_at']
+    return size / (1 + waited / AGING_SECONDS)
+
+def _queue_order(now: float) -> list:
+    return sorted(_queue, key=lambda job: (_priority(job, now), job['id']))
+
+def _pick_next(now: float) -> dict | None:
+    for job in _queue_order(now):
+        if _running_per_user.get(job['user_id'], 0) < USER_MAX_RUNNING_JOBS:
+            return job
+    return None
+
+async def _run(job: dict):
+    try:
+        await job['run']()
+    except Exception as e:
+        logger.error(f"Job {job['id']} milik user {job['user_id']} gagal: {e}", exc_info=True)
+    finally:
+        user_id = job['user_id']
+        _running.pop(job['id'], None)
+        _running_per_user[user_id] -= 1
+        _pending_per_user[user_id] -= 1
+        logger.info(f"Job {job['id']} selesai dalam {time.monotonic() - job['started_at']:.1f} dtk.")
+        _dispatch()
+
+def _dispatch():
+    """Menjalankan job dari antrean selama slot global masih ada, lalu memperbarui posisi antrean."""
+    now = time.monotonic()
+    while len(_running) < MAX_CONCURRENT_JOBS:
+        job = _pick_next(now)
+        if job is None:
+            break
+        _queue.remove(job)
+        _running[job['id']] = job
+        _running_per_user[job['user_id']] = _running_per_user.get(job['user_id'], 0) + 1
+        job['started_at'] = time.monotonic()
+        metrics.record_wait('scheduler', job['started_at'] - job['submitted_at'])
+        logger.info(f"Job {job['id']} (user {job['user_id']}) mulai setelah menunggu {job['started_at'] - job['submitted_at']:.1f} dtk.")
+        job['task'] = asyncio.create_task(_run(job), name=f"job-{job['id']}")
+    _request_positions()
+
+def _request_positions():
+    """Posisi antrean dikirim di background: submit() dan job yang selesai tidak menunggu edit pesan."""
+    global _notifier, _positions_dirty
+    _positions_dirty = True
+    if _notifier is None or _notifier.done():
+        _notifier = asyncio.create_task(_notify_positions(), name="scheduler-positions")
+
+async def _notify_positions():
+    global _positions_dirty
+    while _positions_dirty: # Antrean berubah selama mengirim: hitung ulang dari keadaan terbaru
+        _positions_dirty = False
+        for position, job in enumerate(_queue_order(time.monotonic()), start=1):
+            if job not in _queue:
+                continue # Sudah mulai berjalan selama edit sebelumnya
+            if not job['on_position'] or job.get('last_position') == position:
+                continue
+            job['last_position'] = position
+            try:
+                await job['on_position'](position)
+            except Exception as e:
+                logger.warning(f"Gagal mengirim posisi antrean job {job['id']}: {e}")
+
+async def submit(user_id: int, size_bytes: int | None, run, on_position=None) -> dict:
+    """Mengantrekan job. run adalah coroutine function tanpa argumen.
+
+    Mengembalikan {'accepted': True, 'job_id'} atau {'accepted': False, 'reason'} jika user
+    sudah mencapai batas USER_MAX_PENDING_JOBS. on_position(posisi) dipanggil setiap posisi
+    job di antrean berubah.
+    """
+    if _pending_per_user.get(user_id, 0) >= USER_MAX_PENDING_JOBS:
+        return {'accepted': False, 'reason': f"Anda masih punya {USER_MAX_PENDING_JOBS} unduhan yang berjalan/menunggu."}
+    job = {
+        'id': next(_job_ids), 'user_id': user_id, 'size_bytes': size_bytes,
+        'run': run, 'on_position': on_position, 'submitted_at': time.monotonic(),
+    }
+    _pending_per_user[user_id] = _pending_per_user.get(user_id, 0) + 1
+    _queue.append(job)
+    logger.info(f"Job {job['id']} (user {user_id}, ~{size_bytes or 'N/A'} byte) masuk antrean.")
+    _dispatch()
+    return {'accepted': True, 'job_id': job['id']}
+
+def stats() -> dict:
+    return {'queued': len(_queue), 'running': len(_running)}
+
+async def shutdown():
+    """Membatalkan job yang berjalan dan mengosongkan antrean."""
+    _queue.clear()
+    if _notifier is not None:
+        _notifier.cancel()
+    tasks = [job['task'] for job in _running.values()]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
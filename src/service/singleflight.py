@@ -0,0 +1,70 @@
+# src/service/singleflight.py
+import asyncio
+import logging
+import os
+from . import media_cache, metrics
+
+logger = logging.getLogger(__name__)
+
+# Satu unduhan untuk banyak peminta: key -> {'task', 'refs'}
+# File hasil baru dihapus setelah konsumen terakhir memanggil release().
+_inflight = {}
+
+async def acquire(key: tuple, start, on_joined=None) -> str | None:
+    """Menjalankan start() sekali per key dan membagikan path hasilnya ke semua peminta.
+
+    start adalah coroutine function tanpa argumen yang mengembalikan path file (atau None).
+    on_joined() dipanggil segera setelah peminta ini terdaftar, sebelum menunggu hasil.
+    Setiap acquire() yang berhasil maupun gagal wajib diikuti release(key).
+    """
+    entry = _inflight.get(key)
+    metrics.record_cache('singleflight', entry is not None)
+    if entry is None:
+        entry = {'task': asyncio.create_task(start(), name=f"singleflight-{key}"), 'refs': 0}
+        _inflight[key] = entry
+    else:
+        logger.info(f"Bergabung dengan unduhan yang sedang berjalan untuk {key} ({entry['refs']} peminta lain).")
+    entry['refs'] += 1
+    if on_joined is not None:
+        on_joined()
+    # shield: pembatalan satu peminta tidak boleh membatalkan unduhan milik peminta lain
+    return await asyncio.shield(entry['task'])
+
+def _discard_result(task: asyncio.Task):
+    """Menghapus file hasil task yang tidak lagi punya konsumen (kecuali milik cache media)."""
+    if task.cancelled() or task.exception() is not None:
+        return
+    file_path = task.result()
+    if media_cache.release_path(file_path):
+        return # File milik cache media, bukan file sementara
+    if file_path and os.path.exists(file_path):
+        try:
+            os.remove(file_path)
+            logger.info(f"File {file_path} dihapus setelah konsumen terakhir selesai.")
+        except Exception as e_remove:
+            logger.error(f"Gagal hapus {file_path} setelah konsumen terakhir: {e_remove}")
+
+def release(key: tuple):
+    """Melepas satu konsumen; konsumen terakhir menghapus file hasil unduhan."""
+    entry = _inflight.get(key)
+    if entry is None:
+        return
+    entry['refs'] -= 1
+    if entry['refs'] > 0:
+        return
+    del _inflight[key]
+    task = entry['task']
+    if not task.done():
+        # Thread unduhan tidak ikut berhenti jika task di-cancel dan file-nya jadi yatim; biarkan
+        # selesai (atau berhenti lewat event pembatalan pemiliknya) lalu hapus hasilnya
+        logger.info(f"Konsumen terakhir {key} pergi sebelum unduhan selesai, hasilnya dibuang nanti.")
+        task.add_done_callback(_discard_result)
+        return
+    _discard_result(task)
+
+def consumers(key: tuple) -> int:
+    entry = _inflight.get(key)
+    return entry['refs'] if entry else 0
+
+def stats() -> dict:
+    return {'inflight': len(_inflight), 'consumers': sum(entry['refs'] for entry in _inflight.values())}
@@ -0,0 +1,102 @@
+# src/service/size_planner.py
+import logging
+from config import BOT_API_UPLOAD_LIMIT_BYTES, USER_BOT_MAX_UPLOAD_BYTES
+from . import info_cache, telethon_uploader, audio_pipeline
+
+logger = logging.getLogger(__name__)
+
+# Perkiraan ukuran hasil akhir dari info yang sudah di-probe, sebelum satu byte pun diunduh.
+# Dipakai untuk memilih jalur kirim (Bot API / akun pribadi) atau menolak sejak awal.
+MUX_OVERHEAD = 1.02 # Header container mp4 setelah video+audio digabung
+
+def _stream_size(f: dict, duration: float | None) -> int | None:
+    size = f.get('filesize') or f.get('filesize_approx')
+    if not size and f.get('tbr') and duration:
+        size = int(f['tbr'] * 1000 / 8 * duration)
+    return size or None
+
+def _find_format(info: dict, format_id: str) -> dict | None:
+    for f in info.get('formats') or []:
+        if f.get('format_id') == format_id:
+            return f
+    return None
+
+def _best_audio(info: dict, ext: str | None = None) -> dict | None:
+    # yt-dlp mengurutkan formats dari terburuk ke terbaik
+    candidates = [f for f in info.get('formats') or []
+                  if f.get('vcodec') == 'none' and f.get('acodec') not in (None, 'none')
+                  and (ext is None or f.get('ext') == ext)]
+    return candidates[-1] if candidates else None
+
+def _best_progressive(info: dict) -> dict | None:
+    candidates = [f for f in info.get('formats') or []
+                  if f.get('vcodec') not in (None, 'none') and f.get('acodec') not in (None, 'none')]
+    return candidates[-1] if candidates else None
+
+def estimate_video_size(info: dict, format_id: str) -> int | None:
+    """Ukuran video akhir; format video-only ditambah audio m4a yang akan digabungkan downloader."""
+    duration = info.get('duration')
+    if format_id == 'best':
+        fmt = _best_progressive(info)
+        return _stream_size(fmt, duration) if fmt else _stream_size(info, duration)
+    fmt = _find_format(info, format_id)
+    if fmt is None:
+        return None
+    video_size = _stream_size(fmt, duration)
+    if video_size is None or fmt.get('acodec') not in (None, 'none'):
+        return video_size
+    audio = _best_audio(info, 'm4a') or _best_audio(info)
+    audio_size = _stream_size(audio, duration) if audio else None
+    if audio_size is None:
+        return video_size
+    return int((video_size + audio_size) * MUX_OVERHEAD)
+
+def estimate_audio_size(info: dict, format_id: str, preferred_format: str) -> int | None:
+    """Ukuran audio akhir: hasil transcode dihitung dari durasi x bitrate, hasil copy dari stream sumber."""
+    duration = info.get('duration')
+    audio_plan = audio_pipeline.plan_from_info(info, format_id, preferred_format)
+    if audio_plan['mode'] == 'transcode' and duration:
+        return int(duration * audio_pipeline.TRANSCODE_BITRATE_KBPS * 1000 / 8)
+    fmt = audio_pipeline.source_format(info, audio_plan['format'])
+    if fmt is None:
+        return None
+    if fmt.get('vcodec') not in (None, 'none'): # Mis. TikTok: audio diambil dari file video
+        return int(fmt['abr'] * 1000 / 8 * duration) if fmt.get('abr') and duration else None
+    return _stream_size(fmt, duration)
+
+def max_deliverable_bytes() -> int:
+    return USER_BOT_MAX_UPLOAD_BYTES if telethon_uploader.is_available() else BOT_API_UPLOAD_LIMIT_BYTES
+
+def route_for(size_bytes: int | None) -> str:
+    """'botapi', 'userbot', 'reject', atau 'unknown' jika ukuran tidak bisa diperkirakan."""
+    if size_bytes is None:
+        return 'unknown'
+    if size_bytes <= BOT_API_UPLOAD_LIMIT_BYTES:
+        return 'botapi'
+    if size_bytes <= USER_BOT_MAX_UPLOAD_BYTES and telethon_uploader.is_available():
+        return 'userbot'
+    return 'reject'
+
+def plan(url: str, format_id: str, kind: str, preferred_format: str = 'mp4', fallback_size: int | None = None) -> dict:
+    """Rencana kirim untuk satu pilihan user: {'route', 'size_bytes'}. Tanpa akses jaringan.
+
+    kind adalah 'video' atau 'audio'. fallback_size dipakai jika info tidak ada di cache.
+    """
+    info = info_cache.peek(url)
+    size_bytes = None
+    if info:
+        if kind == 'video':
+            size_bytes = estimate_video_size(info, format_id)
+        else:
+            size_bytes = estimate_audio_size(info, format_id, preferred_format)
+    if size_bytes is None:
+        size_bytes = fallback_size
+    route = route_for(size_bytes)
+    logger.info(f"Rencana kirim {url} ({kind} {format_id}): ~{size_bytes or 'N/A'} byte -> {route}.")
+    return {'route': route, 'size_bytes': size_bytes}
+
+def suggest_lower(options: dict) -> str | None:
+    """Opsi terbesar (id -> perkiraan byte) yang masih bisa dikirim, atau None."""
+    limit = max_deliverable_bytes()
+    fitting = [(size, option_id) for option_id, size in options.items() if size and size <= limit]
+    return max(fitting)[1] if fitting else None
@@ -0,0 +1,159 @@
+# src/service/telethon_uploader.py
+import asyncio
+import logging
+import os
+from telethon import TelegramClient, utils
+from . import parallel_upload
+from config import (
+    TELEGRAM_API_ID,
+    TELEGRAM_API_HASH,
+    TELEGRAM_PHONE_NUMBER_UPLOADER,
+    TELETHON_UPLOAD_WORKERS,
+    TELETHON_UPLOAD_CONNECTIONS,
+    TELETHON_SESSION_NAME
+)
+
+logger = logging.getLogger(__name__)
+
+# Satu TelegramClient yang tetap terhubung selama bot hidup, menggantikan subprocess per file
+_client = None
+_queue = None
+_workers = []
+_entity_cache = {}
+
+def is_configured() -> bool:
+    return all([TELEGRAM_API_ID, TELEGRAM_API_HASH, TELEGRAM_PHONE_NUMBER_UPLOADER])
+
+def is_available() -> bool:
+    """True jika klien sudah terhubung dan terotorisasi."""
+    return _client is not None and _client.is_connected()
+
+async def start():
+    """Menghubungkan klien Telethon dan menjalankan worker antrean unggahan."""
+    global _client, _queue
+    if not is_configured():
+        logger.warning("Kredensial Telethon tidak lengkap, pengunggah akun pribadi tidak diaktifkan.")
+        return
+    # Bawaannya sama dengan uploader_telethon.py / uploader_telethon_AUTH.py
+    session_name = TELETHON_SESSION_NAME
+    client = TelegramClient(session_name, int(TELEGRAM_API_ID), TELEGRAM_API_HASH)
+    try:
+        await client.connect()
+        if not await client.is_user_authorized():
+            logger.error(f"Sesi Telethon {session_name} belum terotorisasi. Jalankan uploader_telethon_AUTH.py sekali.")
+            await client.disconnect()
+            return
+    except Exception as e:
+        logger.error(f"Gagal menghubungkan klien Telethon: {e}", exc_info=True)
+        return
+    _client = client
+    _queue = asyncio.Queue()
+    for i in range(TELETHON_UPLOAD_WORKERS):
+        _workers.append(asyncio.create_task(_worker(i), name=f"telethon-upload-{i}"))
+    logger.info(f"Pengunggah Telethon siap ({TELETHON_UPLOAD_WORKERS} worker).")
+
+async def stop():
+    global _client, _queue
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+    if _client is not None and _client.is_connected():
+        await _client.disconnect()
+    _client = None
+    _queue = None
+    _entity_cache.clear()
+    logger.info("Pengunggah Telethon dihentikan.")
+
+async def _get_entity(chat_id: int):
+    entity = _entity_cache.get(chat_id)
+    if entity is None:
+        entity = await _client.get_input_entity(chat_id)
+        _entity_cache[chat_id] = entity
+    return entity
+
+async def _send(job: dict) -> dict:
+    entity = await _get_entity(job['chat_id'])
+    if job.get('source_ref'):
+        # Kirim ulang media dari pesan lama tanpa unggah ulang
+        source_chat_id, source_message_id = job['source_ref'].split(':', 1)
+        old_message = await _client.get_messages(int(source_chat_id), ids=int(source_message_id))
+        if not old_message or not old_message.media:
+            return {'ok': False, 'source_missing': True,
+                    'error': f"Pesan sumber {job['source_ref']} tidak ditemukan atau tidak berisi media."}
+        message = await _client.send_file(entity, old_message.media, caption=job['caption'])
+    elif job.get('read_part'):
+        # Mode pipeline: part dibaca selagi file masih diunduh
+        input_file = await parallel_upload.upload_with_reader(
+            _client, job['read_part'], job['total_size'], job['file_name'],
+            connections=TELETHON_UPLOAD_CONNECTIONS, progress_callback=job.get('progress_callback')
+        )
+        message = await _client.send_file(
+            entity, input_file, caption=job['caption'], attributes=job['attributes'],
+            mime_type=job['mime_type'], supports_streaming=job['is_video']
+        )
+    else:
+        input_file = await parallel_upload.upload_file(
+            _client, job['file_path'], connections=TELETHON_UPLOAD_CONNECTIONS,
+            progress_callback=job.get('progress_callback')
+        )
+        # Atribut dibaca dari file aslinya karena InputFile hanya membawa nama file
+        attributes, mime_type = utils.get_attributes(job['file_path'], supports_streaming=job['is_video'])
+        message = await _client.send_file(
+            entity, input_file, caption=job['caption'], attributes=attributes,
+            mime_type=mime_type, supports_streaming=job['is_video']
+        )
+    return {'ok': True, 'message_id': message.id}
+
+async def _worker(index: int):
+    while True:
+        job = await _queue.get()
+        try:
+            result = await _send(job)
+        except asyncio.CancelledError:
+            job['future'].cancel()
+            raise
+        except Exception as e:
+            logger.error(f"Worker Telethon {index} gagal mengirim ke {job['chat_id']}: {e}", exc_info=True)
+            result = {'ok': False, 'error': str(e)}
+        finally:
+            _queue.task_done()
+        if not job['future'].done():
+            job['future'].set_result(result)
+
+async def _submit(job: dict) -> dict:
+    if not is_available():
+        return {'ok': False, 'error': "Pengunggah Telethon tidak aktif."}
+    job['future'] = asyncio.get_running_loop().create_future()
+    await _queue.put(job)
+    return await job['future']
+
+async def upload(chat_id: int, file_path: str, caption: str, is_video: bool, progress_callback=None) -> dict:
+    """Mengantrekan unggahan file dan menunggu hasilnya: {'ok', 'message_id'} atau {'ok': False, 'error'}.
+
+    progress_callback(uploaded_bytes, total_bytes) dipanggil setiap part selesai.
+    """
+    if not os.path.exists(file_path):
+        return {'ok': False, 'error': f"File tidak ditemukan: {file_path}"}
+    return await _submit({
+        'chat_id': chat_id, 'file_path': file_path, 'caption': caption,
+        'is_video': is_video, 'progress_callback': progress_callback
+    })
+
+async def upload_stream(chat_id: int, read_part, total_size: int, file_name: str, caption: str, attributes: list, mime_type: str, progress_callback=None) -> dict:
+    """Seperti upload(), tetapi part diambil dari read_part(offset, size) (lihat pipeline.py)."""
+    return await _submit({
+        'chat_id': chat_id, 'read_part': read_part, 'total_size': total_size, 'file_name': file_name,
+        'caption': caption, 'is_video': True, 'attributes': attributes, 'mime_type': mime_type,
+        'progress_callback': progress_callback
+    })
+
+async def resend(chat_id: int, source_ref: str, caption: str) -> dict:
+    """Mengirim ulang media dari pesan '<chat_id>:<message_id>' milik akun pengunggah.
+
+    Jika pesan itu sudah tidak ada, hasilnya berisi 'source_missing': True (referensi tidak bisa dipakai lagi).
+    """
+    return await _submit({'chat_id': chat_id, 'source_ref': source_ref, 'caption': caption, 'is_video': False})
+
+def queue_size() -> int:
+    return _queue.qsize() if _queue is not None else 0
@@ -1,53 +1,71 @@
 # src/telegram/handlers.py
+import asyncio
+import contextlib
 import logging
+import math
 import os
+import pathlib
 import re
-import subprocess
-import shlex
-import sys
+import time
 
-from telegram import Update
+from telegram import Update, InputFile, InputMediaAudio, InputMediaPhoto, InputMediaVideo
 from telegram.ext import (
     ApplicationBuilder, CommandHandler, MessageHandler,
     filters, ContextTypes, ConversationHandler, CallbackQueryHandler
 )
 from telegram.constants import ChatAction
-from telegram.error import BadRequest, TimedOut, NetworkError
+from telegram.error import BadRequest, RetryAfter, TelegramError, TimedOut, NetworkError
 
 # Impor dari proyek Anda
 from config import (
-    TELEGRAM_BOT_TOKEN,
-    TELEGRAM_API_ID,
-    TELEGRAM_API_HASH,
-    TELEGRAM_PHONE_NUMBER_UPLOADER
+    TELEGRAM_BOT_TOKEN, TEMP_DOWNLOAD_PATH, BOT_API_UPLOAD_LIMIT_BYTES, USER_BOT_MAX_UPLOAD_BYTES, PREFETCH_ENABLED,
+    METRICS_HOST, METRICS_PORT, BOT_MODE, WEBHOOK_LISTEN, WEBHOOK_PORT, WEBHOOK_PATH, WEBHOOK_URL,
+    WEBHOOK_SECRET_TOKEN, WEBHOOK_MAX_CONNECTIONS, JOB_QUEUE_ENABLED, JOB_QUEUE_ORIGIN, JOB_QUEUE_POLL_SECONDS,
+    BOT_API_BASE_URL, BOT_API_LOCAL_MODE, BATCH_CONCURRENCY
 )
 from src.telegram.states import (
     SELECT_PLATFORM, SELECT_DOWNLOAD_TYPE, AWAIT_LINK,
-    SELECT_RESOLUTION_VIDEO, SELECT_QUALITY_AUDIO
+    SELECT_RESOLUTION_VIDEO, SELECT_QUALITY_AUDIO, SELECT_FORMAT
 )
 from src.telegram.keyboard import (
     build_platform_menu, build_download_type_menu,
     build_video_resolution_menu,
-    build_audio_quality_menu
+    build_audio_quality_menu, build_format_menu, build_batch_menu
 )
 # --- PERBAIKAN DI SINI: service -> services ---
 from src.service import youtube, instagram, tiktok
+from src.service import executor, info_cache, file_id_cache, telethon_uploader, pipeline, scheduler, singleflight, media_cache, size_planner, audio_pipeline, prefetch, progress, metrics, job_queue, batch, rate_limit
+from src.service.downloader_base import extract_audio_from_file_sync, get_human_readable_size
 # ---------------------------------------------
-from src.utils import url_parser
+from src.utils import url_parser, canonical_url, http_server
 
 logger = logging.getLogger(__name__)
 
 DOWNLOADER_MODULES = {
     "youtube": youtube, "instagram": instagram, "tiktok": tiktok, "other": youtube,
 }
-BOT_API_UPLOAD_LIMIT_BYTES = 30 * 1024 * 1024  # 30 MB
-USER_BOT_MAX_UPLOAD_BYTES = 2 * 1024 * 1024 * 1024 # 2 GB
+VIDEO_CAPTION = "✅ Video Selesai!\nTerimakasih sudah menggunakan bot ini 😊"
+AUDIO_CAPTION = "🎵 Audio Selesai!\nTerimakasih sudah menggunakan bot ini 😊"
+
+# Antrean bersama: posisi job yang menunggu dihitung ulang paling sering sekali per interval ini
+QUEUE_POSITION_INTERVAL_SECONDS = 5
+_queued_positions = {} # job_id -> posisi terakhir yang ditampilkan
+
+RATE_LIMIT_REASONS = {
+    'user': "Anda mengirim terlalu banyak link.",
+    'platform': "Terlalu banyak permintaan ke {platform} saat ini.",
+    'global': "Bot sedang menerima terlalu banyak permintaan.",
+}
+
+async def reply_rate_limited(update: Update, limited: dict, platform: str) -> None:
+    reason = RATE_LIMIT_REASONS[limited['scope']].format(platform=platform.capitalize())
+    await update.message.reply_text(f"⏳ {reason} Coba lagi dalam {math.ceil(limited['retry_after'])} detik.")
 
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     user = update.effective_user
     logger.info(f"User {user.first_name} ({user.id}) /start.")
     await update.message.reply_text(
-        "Selamat datang! 👋\nPilih platform:",
+        "Selamat datang! 👋\nKirim link langsung, atau pilih platform:",
         reply_markup=build_platform_menu()
     )
     return SELECT_PLATFORM
@@ -88,6 +106,11 @@ async def link_received_handler(update: Update, context: ContextTypes.DEFAULT_TY
         await update.message.reply_text("Link tidak valid. Coba lagi.")
         return AWAIT_LINK
 
+    limited = rate_limit.check(update.effective_user.id, platform)
+    if not limited['allowed']:
+        await reply_rate_limited(update, limited, platform)
+        return AWAIT_LINK
+
     message = await update.message.reply_text(f"🔎 Mencari info {download_type} untuk {platform.capitalize()}...")
     downloader = DOWNLOADER_MODULES.get(platform)
 
@@ -96,35 +119,247 @@ async def link_received_handler(update: Update, context: ContextTypes.DEFAULT_TY
         return ConversationHandler.END
 
     context.user_data['url'] = url
+    await canonical_url.resolve(url)
 
     if download_type == 'video':
         formats = await downloader.get_video_formats(url)
         if not formats:
             await message.edit_text("Gagal menemukan format video. Pastikan link benar & publik.")
             return SELECT_DOWNLOAD_TYPE
+        context.user_data['format_sizes'] = {f['id']: f.get('size_bytes') for f in formats}
+        context.user_data['format_labels'] = {f['id']: f['res'] for f in formats}
         resolution_menu = build_video_resolution_menu(formats, platform)
         if resolution_menu:
             await message.edit_text("Pilih resolusi video:", reply_markup=resolution_menu)
+            start_prefetch(update.effective_user.id, url, platform, formats, with_audio=False)
             return SELECT_RESOLUTION_VIDEO
         else:
             await message.edit_text("Maaf, tidak ada format video yang cocok.")
             return SELECT_DOWNLOAD_TYPE
     elif download_type == 'audio':
         audio_formats = await downloader.get_audio_formats(url)
+        context.user_data['format_sizes'] = {f['id']: f.get('size_bytes') for f in audio_formats or []}
         quality_menu = build_audio_quality_menu(audio_formats, platform)
         if quality_menu:
             await message.edit_text("Pilih kualitas audio:", reply_markup=quality_menu)
+            start_prefetch(update.effective_user.id, url, platform, [], with_audio=True)
             return SELECT_QUALITY_AUDIO
         else:
             await message.edit_text("Gagal menyiapkan opsi kualitas audio.")
             return SELECT_DOWNLOAD_TYPE
     return ConversationHandler.END # Fallback
 
-async def process_file_upload(query: Update.callback_query, context: ContextTypes.DEFAULT_TYPE, file_path: str, caption: str, is_video: bool):
+async def url_message_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Jalur cepat: link dikirim langsung di state mana pun, platform dideteksi dari host."""
+    url = url_parser.extract_url(update.message.text)
+    if not url:
+        await update.message.reply_text("Link tidak valid. Coba lagi.")
+        return ConversationHandler.END
+    platform = url_parser.identify_platform(url)
+    limited = rate_limit.check(update.effective_user.id, platform)
+    if not limited['allowed']:
+        await reply_rate_limited(update, limited, platform)
+        return None # State sebelumnya (menu yang sudah tampil) tetap berlaku
+    downloader = DOWNLOADER_MODULES.get(platform)
+    context.user_data.clear()
+    context.user_data.update(platform=platform, url=url)
+    message = await update.message.reply_text(f"🔎 Mencari format {platform.capitalize()}...")
+    # Setelah balasan pertama: HEAD link pendek bisa memakan waktu hingga batas timeout-nya
+    await canonical_url.resolve(url) # Link pendek di-resolve sekali agar semua cache mengenalinya
+
+    if batch.playlist_only(url):
+        # Link daftar saja: tidak ada media tunggal untuk di-probe, langsung tawarkan mode batch
+        collection = await batch.list_entries(url)
+        if not collection:
+            await message.edit_text("Gagal membaca isi playlist. Pastikan link benar & publik.")
+            context.user_data.clear()
+            return ConversationHandler.END
+        context.user_data['batch'] = collection
+        await message.edit_text(f"📚 {collection['title']}: {len(collection['entries'])} item.\nPilih format:",
+                                reply_markup=build_batch_menu(len(collection['entries']), platform))
+        return SELECT_FORMAT
+
+    # Format video dulu: probe-nya mengisi cache info, sehingga format audio tidak probe ulang
+    video_formats = await downloader.get_video_formats(url)
+    audio_formats = await downloader.get_audio_formats(url)
+    formats = video_formats or []
+    context.user_data['format_sizes'] = {f['id']: f.get('size_bytes') for f in formats + (audio_formats or [])}
+    context.user_data['format_labels'] = {f['id']: f['res'] for f in formats}
+    # Playlist/carousel: tombol batch ditambahkan di atas pilihan media tunggal
+    collection = await batch.list_entries(url) if batch.has_entries(url) else None
+    if collection:
+        context.user_data['batch'] = collection
+    if video_formats is None and audio_formats is None:
+        # Probe gagal: menu audio selalu berisi pilihan "terbaik", jadi isi menu tidak bisa dijadikan patokan
+        if not collection:
+            await message.edit_text("Gagal menemukan format. Pastikan link benar & publik.")
+            context.user_data.clear()
+            return ConversationHandler.END
+        await message.edit_text(f"📚 {collection['title']}: {len(collection['entries'])} item.\nPilih format:",
+                                reply_markup=build_batch_menu(len(collection['entries']), platform))
+        return SELECT_FORMAT
+    format_menu = build_format_menu(formats, audio_formats, platform, batch_count=len(collection['entries']) if collection else 0)
+    await message.edit_text("Pilih format video atau audio:", reply_markup=format_menu)
+    if not collection: # Jangan berspekulasi mengunduh isi playlist
+        start_prefetch(update.effective_user.id, url, platform, formats, with_audio=True)
+    return SELECT_FORMAT
+
+def media_id_for(url: str) -> str | None:
+    """ID kanonis media ('<extractor>:<id>') dari info yang sudah di-probe atau dari bentuk URL-nya."""
+    info = info_cache.peek(url)
+    if info and info.get('id'):
+        return info_cache.media_key(info)
+    return canonical_url.canonical_key(url)
+
+def build_coalesce_key(url: str, format_id: str, output_kind: str) -> tuple:
+    """Kunci penggabungan unduhan identik: (id kanonis, format, jenis keluaran)."""
+    return (media_id_for(url) or url, format_id, output_kind)
+
+async def fetch_video(url: str, platform: str, format_id: str) -> str | None:
+    """Mengambil video dari cache media di disk, atau mengunduhnya lalu menyimpannya ke cache."""
+    media = media_id_for(url)
+    if media:
+        cached_path = media_cache.lookup(media, format_id, 'mp4')
+        if cached_path:
+            return cached_path
+    video_path = await DOWNLOADER_MODULES.get(platform).download_video(url, format_id)
+    return media_cache.store(media, format_id, 'mp4', video_path) if media else video_path
+
+async def fetch_audio(url: str, platform: str, format_id: str, preferred_format: str) -> str | None:
+    """Seperti fetch_video; audio kualitas terbaik juga bisa diambil dari video yang sudah di-cache."""
+    media = media_id_for(url)
+    if media:
+        cached_path = media_cache.lookup(media, format_id, preferred_format)
+        if cached_path:
+            return cached_path
+        video_path = media_cache.find_video(media) if format_id == 'bestaudio/best' else None
+        if video_path:
+            # Video di cache berisi trek AAC (mp4), jadi selain MP3 cukup di-remux ke m4a
+            audio_plan = audio_pipeline.plan_output('aac', preferred_format)
+            output_path = os.path.join(TEMP_DOWNLOAD_PATH, f"{os.path.basename(video_path)}_audio.{audio_plan['ext']}")
+            try:
+                audio_path = await executor.run_postprocess(
+                    extract_audio_from_file_sync, video_path, output_path, audio_plan['ext'],
+                    audio_plan['mode'] == 'transcode', executor.postprocess_budget()[1]
+                )
+                logger.info(f"Audio {media} diambil dari video di cache media tanpa unduhan.")
+                return media_cache.store(media, format_id, preferred_format, audio_path)
+            except Exception as e:
+                logger.warning(f"Gagal mengambil audio dari video di cache ({video_path}): {e}. Mengunduh dari sumber.")
+            finally:
+                media_cache.release_path(video_path)
+    audio_path = await DOWNLOADER_MODULES.get(platform).download_audio(url, format_id=format_id, preferred_format=preferred_format)
+    return media_cache.store(media, format_id, preferred_format, audio_path) if media else audio_path
+
+def start_prefetch(user_id: int, url: str, platform: str, formats: list, with_audio: bool):
+    """Mulai mengunduh pilihan yang paling mungkin selagi menu format tampil (jika diaktifkan)."""
+    if not PREFETCH_ENABLED or JOB_QUEUE_ENABLED:
+        return # Dengan antrean bersama, unduhan terjadi di worker dan tidak bisa memakai file prefetch
+    candidates = {f"video:{f['res']}": ('video', f['id'], 'mp4') for f in formats}
+    if with_audio:
+        candidates['audio:best-auto'] = ('audio', 'bestaudio/best', 'auto')
+        candidates['audio:best-mp3'] = ('audio', 'bestaudio/best', 'mp3')
+    choice = prefetch.likely_choice(platform, list(candidates))
+    if choice is None:
+        return
+    kind, format_id, preferred_format = candidates[choice]
+    delivery = size_planner.plan(url, format_id, kind, preferred_format)
+    if delivery['route'] not in ('botapi', 'userbot'):
+        return
+    if kind == 'video':
+        if delivery['route'] == 'userbot' and pipeline.plan(url, format_id):
+            return # Akan di-stream langsung ke Telegram, bukan lewat file
+        prefetch.start(user_id, build_coalesce_key(url, format_id, 'video'), delivery['size_bytes'],
+                       lambda: fetch_video(url, platform, format_id))
+    else:
+        prefetch.start(user_id, build_coalesce_key(url, format_id, f"audio-{preferred_format}"), delivery['size_bytes'],
+                       lambda: fetch_audio(url, platform, format_id, preferred_format))
+
+def build_cache_key(platform: str, url: str, format_id: str, preferred_format: str) -> tuple | None:
+    """Kunci cache file_id (platform, id video, format_id, preferred_format), None jika id belum diketahui."""
+    info = info_cache.peek(url)
+    if info and info.get('id'):
+        return (platform, str(info['id']), format_id, preferred_format)
+    identity = canonical_url.canonicalize(url)
+    return (platform, identity[1], format_id, preferred_format) if identity else None
+
+async def send_cached_media(query: Update.callback_query, context: ContextTypes.DEFAULT_TYPE, cache_key: tuple, caption: str, is_video: bool) -> bool:
+    """Mengirim ulang media dari cache file_id. Mengembalikan False jika tidak ada atau gagal."""
+    cached = file_id_cache.lookup(*cache_key)
+    if not cached:
+        return False
+    target_chat_id = query.message.chat_id
+    logger.info(f"Cache file_id HIT untuk {cache_key} ({cached['source']}), mengirim ulang tanpa unduh.")
+    try:
+        if cached['source'] == 'botapi':
+            if is_video:
+                await context.bot.send_video(chat_id=target_chat_id, video=cached['file_ref'], supports_streaming=True, caption=caption)
+            else:
+                await context.bot.send_audio(chat_id=target_chat_id, audio=cached['file_ref'], caption=caption)
+        else:
+            result = await telethon_uploader.resend(target_chat_id, cached['file_ref'], caption)
+            if result.get('source_missing'):
+                logger.warning(f"Pengiriman dari cache file_id gagal untuk {cache_key}: {result['error']} Cache dihapus, unduh ulang.")
+                file_id_cache.invalidate(*cache_key)
+                return False
+            if not result['ok']:
+                raise RuntimeError(result['error'])
+    except BadRequest as e:
+        # file_id ditolak Telegram (kedaluwarsa/tidak valid): entri cache tidak bisa dipakai lagi
+        logger.warning(f"Pengiriman dari cache file_id gagal untuk {cache_key}: {e}. Cache dihapus, unduh ulang.")
+        file_id_cache.invalidate(*cache_key)
+        return False
+    except (TelegramError, RuntimeError) as e:
+        # Gangguan sementara (timeout, jaringan, flood): cache tetap disimpan, kali ini lewat unduhan biasa
+        logger.warning(f"Pengiriman dari cache file_id gagal untuk {cache_key}: {e}. Unduh ulang.")
+        return False
+    try:
+        await query.delete_message()
+    except TelegramError as e:
+        logger.debug(f"Gagal menghapus pesan menu setelah kirim dari cache: {e}")
+    return True
+
+async def stream_video_upload(query: Update.callback_query, url: str, fmt: dict) -> dict | None:
+    """Mode pipeline: unduh dan unggah berjalan bersamaan. None berarti perlu kembali ke alur biasa."""
+    file_size_mb = fmt['filesize'] / (1024 * 1024)
+    target_chat_id = query.message.chat_id
+    await query.edit_message_text(f"⚡ Mengunduh sambil mengunggah ({file_size_mb:.2f} MB) via pengunggah khusus... Mohon tunggu.")
+    progress_key = ('stream', target_chat_id, query.message.message_id)
+    editor = progress.watch(progress_key, target_chat_id, query.edit_message_text, phase='upload')
+    try:
+        result = await pipeline.stream_to_telegram(url, fmt, target_chat_id, VIDEO_CAPTION, progress_callback=progress.upload_callback(progress_key))
+    finally:
+        await progress.unwatch(editor)
+    if not result['ok']:
+        logger.warning(f"Pipeline unduh-unggah gagal untuk {url}: {result['error']}. Kembali ke unduh lalu unggah.")
+        return None
+    await query.edit_message_text(f"✅ File ({file_size_mb:.2f} MB) berhasil dikirim via pengunggah khusus!")
+    return {'source': 'telethon', 'file_ref': f"{target_chat_id}:{result['message_id']}"}
+
+@contextlib.contextmanager
+def upload_source(file_path: str, local_mode: bool = BOT_API_LOCAL_MODE, attach: bool = False):
+    """Input file untuk send_video/send_audio. Server Bot API lokal membaca path-nya langsung dari
+    disk, sehingga byte file tidak perlu lewat proses Python sama sekali.
+
+    Selain itu handle file diteruskan ke httpx tanpa dibaca dulu (read_file_handle=False): body
+    multipart di-stream per potongan kecil, jadi memori per unggahan tetap berapa pun ukuran file.
+    attach=True untuk item album (sendMediaGroup) yang merujuk file lewat attach://.
+    """
+    if local_mode:
+        yield pathlib.Path(file_path)
+    else:
+        with open(file_path, 'rb') as f:
+            yield InputFile(f, filename=os.path.basename(file_path), attach=attach, read_file_handle=False)
+
+async def process_file_upload(query: Update.callback_query, context: ContextTypes.DEFAULT_TYPE, file_path: str, caption: str, is_video: bool, platform: str = 'unknown') -> dict | None:
+    """Mengunggah file ke chat. File tidak dihapus di sini karena bisa dipakai bersama (lihat singleflight).
+
+    Mengembalikan referensi media terkirim {'source', 'file_ref'} untuk cache file_id, atau None.
+    """
     if not os.path.exists(file_path):
         logger.error(f"File tidak ditemukan untuk diunggah: {file_path}")
         await query.edit_message_text("Error internal: File unduhan tidak ditemukan.")
-        return
+        return None
 
     file_size_bytes = os.path.getsize(file_path)
     file_size_mb = file_size_bytes / (1024 * 1024)
@@ -134,92 +369,127 @@ async def process_file_upload(query: Update.callback_query, context: ContextType
     if file_size_bytes <= BOT_API_UPLOAD_LIMIT_BYTES:
         await query.edit_message_text(f"⬆️ Mengunggah via Bot API ({file_size_mb:.2f} MB)...")
         await context.bot.send_chat_action(chat_id=target_chat_id, action=ChatAction.UPLOAD_VIDEO if is_video else ChatAction.UPLOAD_AUDIO)
-        with open(file_path, 'rb') as f_to_send:
+        with upload_source(file_path) as f_to_send, metrics.StageTimer('upload_botapi', platform) as timer:
+            timer.size_bytes = file_size_bytes
             if is_video:
-                await context.bot.send_video(chat_id=target_chat_id, video=f_to_send, supports_streaming=True, caption=caption, write_timeout=None)
+                sent = await context.bot.send_video(chat_id=target_chat_id, video=f_to_send, supports_streaming=True, caption=caption, write_timeout=None)
+                sent_media = sent.video or sent.document
             else:
-                await context.bot.send_audio(chat_id=target_chat_id, audio=f_to_send, caption=caption, write_timeout=None)
+                sent = await context.bot.send_audio(chat_id=target_chat_id, audio=f_to_send, caption=caption, write_timeout=None)
+                sent_media = sent.audio or sent.document
         await query.delete_message()
         logger.info(f"File {file_path} berhasil dikirim via Bot API.")
-        if os.path.exists(file_path): # Hapus setelah Bot API upload
-            try: os.remove(file_path); logger.info(f"File {file_path} dihapus setelah Bot API upload.")
-            except Exception as e_remove: logger.error(f"Gagal hapus {file_path} setelah Bot API upload: {e_remove}")
+        return {'source': 'botapi', 'file_ref': sent_media.file_id} if sent_media else None
 
     elif BOT_API_UPLOAD_LIMIT_BYTES < file_size_bytes <= USER_BOT_MAX_UPLOAD_BYTES:
         await query.edit_message_text(f"Ukuran file ({file_size_mb:.2f} MB) besar. Menggunakan pengunggah khusus via akun pribadi... Ini mungkin sangat lama.")
         logger.info(f"Mencoba unggah {file_path} via Telethon uploader ke chat ID {target_chat_id}")
 
-        if not all([TELEGRAM_API_ID, TELEGRAM_API_HASH, TELEGRAM_PHONE_NUMBER_UPLOADER]):
-            logger.error("Kredensial Telethon (API_ID, API_HASH, PHONE_NUMBER) tidak lengkap di .env")
+        if not telethon_uploader.is_available():
+            logger.error("Pengunggah Telethon tidak aktif (kredensial tidak lengkap atau sesi belum terotorisasi).")
             await query.edit_message_text("Gagal memulai pengunggah khusus: Konfigurasi tidak lengkap.")
-            if os.path.exists(file_path): # Hapus jika config Telethon tidak lengkap
-                try: os.remove(file_path); logger.info(f"File {file_path} dihapus karena config Telethon tidak lengkap.")
-                except Exception as e_remove: logger.error(f"Gagal hapus {file_path} (config Telethon tdk lengkap): {e_remove}")
-            return
-
-        python_executable = sys.executable
-        command = [
-            python_executable,
-            "uploader_telethon.py",
-            str(target_chat_id),
-            file_path,
-            caption
-        ]
-        try:
-            logger.info(f"Menjalankan perintah: {' '.join(shlex.quote(c) for c in command)}")
-            process = subprocess.run(command, capture_output=True, text=True, check=False, timeout=7200) # Timeout 2 jam
+            return None
 
-            if process.returncode == 0:
-                logger.info(f"Skrip uploader_telethon.py berhasil untuk {file_path}. Output: {process.stdout}")
-                await query.edit_message_text(f"✅ File ({file_size_mb:.2f} MB) berhasil dikirim via pengunggah khusus!")
-                # Skrip uploader_telethon.py yang idealnya menghapus file jika sukses (sudah diimplementasikan di uploader_telethon.py)
-            else:
-                logger.error(f"Skrip uploader_telethon.py gagal untuk {file_path}. Return code: {process.returncode}. Output: {process.stdout}. Error: {process.stderr}")
-                await query.edit_message_text(f"⚠️ Gagal mengirim file ({file_size_mb:.2f} MB) via pengunggah khusus. Cek log bot.")
-                if os.path.exists(file_path): # Hapus jika Telethon gagal
-                    try: os.remove(file_path); logger.info(f"File {file_path} dihapus setelah Telethon uploader gagal.")
-                    except Exception as e_remove: logger.error(f"Gagal hapus {file_path} (Telethon gagal): {e_remove}")
-        except subprocess.TimeoutExpired:
-            logger.error(f"Skrip uploader_telethon.py timeout untuk {file_path}.")
-            await query.edit_message_text(f"⚠️ Pengiriman file ({file_size_mb:.2f} MB) via pengunggah khusus timeout.")
-            if os.path.exists(file_path): # Hapus jika Telethon timeout
-                try: os.remove(file_path); logger.info(f"File {file_path} dihapus setelah Telethon uploader timeout.")
-                except Exception as e_remove: logger.error(f"Gagal hapus {file_path} (Telethon timeout): {e_remove}")
-        except Exception as e_subproc:
-            logger.error(f"Error menjalankan uploader_telethon.py: {e_subproc}", exc_info=True)
-            await query.edit_message_text("Terjadi kesalahan internal saat mencoba pengunggah khusus.")
-            if os.path.exists(file_path): # Hapus jika error lain
-                try: os.remove(file_path); logger.info(f"File {file_path} dihapus karena error subproses Telethon.")
-                except Exception as e_remove: logger.error(f"Gagal hapus {file_path} (error subproses Telethon): {e_remove}")
+        progress_key = ('upload', target_chat_id, query.message.message_id)
+        editor = progress.watch(progress_key, target_chat_id, query.edit_message_text, phase='upload')
+        try:
+            with metrics.StageTimer('upload_telethon', platform) as timer:
+                timer.size_bytes = file_size_bytes
+                result = await telethon_uploader.upload(target_chat_id, file_path, caption, is_video, progress_callback=progress.upload_callback(progress_key))
+                timer.failed = not result['ok']
+        finally:
+            await progress.unwatch(editor)
+        if result['ok']:
+            logger.info(f"Pengunggah Telethon berhasil untuk {file_path}. ID Pesan: {result['message_id']}")
+            await query.edit_message_text(f"✅ File ({file_size_mb:.2f} MB) berhasil dikirim via pengunggah khusus!")
+            return {'source': 'telethon', 'file_ref': f"{target_chat_id}:{result['message_id']}"}
+        logger.error(f"Pengunggah Telethon gagal untuk {file_path}: {result['error']}")
+        await query.edit_message_text(f"⚠️ Gagal mengirim file ({file_size_mb:.2f} MB) via pengunggah khusus. Cek log bot.")
     else: # File > USER_BOT_MAX_UPLOAD_BYTES
         await query.edit_message_text(
             f"Video/Audio ({file_size_mb:.2f} MB) terlalu besar untuk diunggah "
             f"(maks {USER_BOT_MAX_UPLOAD_BYTES / (1024*1024):.0f} MB).\n"
             "Silakan pilih resolusi/kualitas yang lebih rendah."
         )
-        if os.path.exists(file_path): # Hapus karena terlalu besar
-            try: os.remove(file_path); logger.info(f"File {file_path} dihapus karena terlalu besar.")
-            except Exception as e_remove: logger.error(f"Gagal hapus {file_path} (terlalu besar): {e_remove}")
+    return None
 
-async def video_resolution_selected_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    query = update.callback_query
-    await query.answer()
-    try:
-        _, _, format_id, platform = query.data.split('_', 3)
-    except ValueError:
-        await query.edit_message_text("Error: Data callback video tidak valid.")
-        return ConversationHandler.END
-    url = context.user_data.get('url')
-    if not url:
-        await query.edit_message_text("Sesi berakhir. /start lagi.")
-        return ConversationHandler.END
+async def reject_oversized(query: Update.callback_query, context: ContextTypes.DEFAULT_TYPE, delivery: dict, platform: str, kind: str) -> bool:
+    """Memberi tahu user bahwa pilihannya terlalu besar, dengan tombol format lebih kecil jika ada.
+
+    Mengembalikan True jika saran ditampilkan (percakapan tetap di state pemilihan format).
+    """
+    size_mb = delivery['size_bytes'] / (1024 * 1024)
+    limit_mb = size_planner.max_deliverable_bytes() / (1024 * 1024)
+    text = f"⚠️ Perkiraan ukuran ({size_mb:.2f} MB) melebihi batas kirim ({limit_mb:.0f} MB). Tidak ada yang diunduh."
+    suggestion = size_planner.suggest_lower(context.user_data.get('format_sizes', {})) if kind == 'video' else None
+    if not suggestion:
+        await query.edit_message_text(text + "\nSilakan coba format lain atau link lain dengan /start.")
+        return False
+    label = context.user_data.get('format_labels', {}).get(suggestion, suggestion)
+    suggestion_size = context.user_data['format_sizes'][suggestion]
+    await query.edit_message_text(
+        text + "\nCoba format yang lebih rendah:",
+        reply_markup=build_video_resolution_menu(
+            [{'id': suggestion, 'res': label, 'size_bytes': suggestion_size, 'size_mb': get_human_readable_size(suggestion_size)}],
+            platform
+        )
+    )
+    return True
+
+def remember_delivery(cache_key: tuple | None, delivery: dict | None):
+    """Menyimpan media yang baru terkirim ke cache file_id agar permintaan berikutnya dikirim ulang."""
+    if cache_key and delivery:
+        file_id_cache.store(*cache_key, source=delivery['source'], file_ref=delivery['file_ref'])
+
+def queue_position_text(position: int) -> str:
+    return f"⏳ Menunggu worker... posisi {position} dalam antrean."
+
+async def submit_download_job(query: Update.callback_query, context: ContextTypes.DEFAULT_TYPE, size_bytes: int | None,
+                              kind: str, params: dict, cache_key: tuple | None) -> None:
+    """Menyerahkan unduhan ke scheduler lokal, atau ke antrean bersama jika worker terpisah dipakai.
+
+    kind adalah kunci JOB_RUNNERS dan params argumen kata kuncinya (harus bisa di-JSON-kan).
+    """
+    if JOB_QUEUE_ENABLED:
+        # Info hasil probe ikut dikirim: worker memakainya ulang (unduh tanpa ekstraksi, pipeline, rencana audio)
+        info = info_cache.peek(params['url'])
+        result = job_queue.enqueue(JOB_QUEUE_ORIGIN, query.from_user.id, query.message.chat_id, query.message.message_id,
+                                   kind, {**params, 'info': info} if info else params, cache_key, size_bytes)
+        if result['accepted']:
+            _queued_positions[result['job_id']] = result['position']
+            await query.edit_message_text(queue_position_text(result['position']))
+    else:
+        async def run():
+            remember_delivery(cache_key, await JOB_RUNNERS[kind](query, context, **params))
+        async def on_position(position: int):
+            await query.edit_message_text(f"⏳ Menunggu giliran... posisi {position} dalam antrean.")
+        result = await scheduler.submit(query.from_user.id, size_bytes, run, on_position=on_position)
+    if not result['accepted']:
+        await query.edit_message_text(f"⚠️ {result['reason']} Tunggu hingga selesai lalu coba lagi.")
+
+async def run_video_job(query: Update.callback_query, context: ContextTypes.DEFAULT_TYPE, url: str, platform: str, format_id: str) -> dict | None:
+    """Mengunduh lalu mengirim video; mengembalikan referensi media terkirim atau None."""
+    # File progresif besar: unggah part selagi unduhan berjalan
+    stream_fmt = pipeline.plan(url, format_id) if telethon_uploader.is_available() else None
+    if stream_fmt and BOT_API_UPLOAD_LIMIT_BYTES < stream_fmt['filesize'] <= USER_BOT_MAX_UPLOAD_BYTES:
+        delivery = await stream_video_upload(query, url, stream_fmt)
+        if delivery:
+            return delivery
     await query.edit_message_text(f"⚙️ Mengunduh video ({format_id})... Mohon tunggu.")
-    downloader = DOWNLOADER_MODULES.get(platform)
-    video_path = None
+    coalesce_key = build_coalesce_key(url, format_id, 'video')
+    progress.bind(coalesce_key)
+    editor = progress.watch(coalesce_key, query.message.chat_id, query.edit_message_text)
     try:
-        video_path = await downloader.download_video(url, format_id)
+        try:
+            # Prefetch milik user ini dilepas setelah job terdaftar: unduhannya berlanjut jika kuncinya sama
+            video_path = await singleflight.acquire(
+                coalesce_key, lambda: fetch_video(url, platform, format_id),
+                on_joined=lambda: prefetch.cancel(query.from_user.id, keep_key=coalesce_key)
+            )
+        finally:
+            await progress.unwatch(editor) # Pesan status berikutnya ditulis langsung
         if video_path and os.path.exists(video_path):
-            await process_file_upload(query, context, video_path, "✅ Video Selesai!\nTerimakasih sudah menggunakan bot ini 😊", is_video=True)
+            return await process_file_upload(query, context, video_path, VIDEO_CAPTION, is_video=True, platform=platform)
         else:
             logger.error(f"Download_video mengembalikan path tidak valid atau file tidak ada: {video_path} untuk URL {url}")
             await query.edit_message_text("Maaf, gagal mengunduh video dari sumbernya (file tidak ditemukan setelah download).")
@@ -227,30 +497,188 @@ async def video_resolution_selected_callback(update: Update, context: ContextTyp
         logger.error(f"Error saat proses download_video: {e}", exc_info=True)
         await query.edit_message_text("Terjadi kesalahan saat mengunduh video.")
     finally:
-        # File akan dihapus oleh process_file_upload jika dihandle Bot API atau jika gagal/timeout di Telethon
-        # atau jika terlalu besar. Jika Telethon sukses, skrip Telethon yang menghapus.
-        # Jika download_video gagal sebelum process_file_upload, file perlu dihapus di sini.
-        if video_path and os.path.exists(video_path):
-            # Cek apakah file masih ada (belum dihapus oleh process_file_upload atau Telethon)
-            # Ini adalah fallback jika proses tidak sampai ke penghapusan di process_file_upload
-            # atau jika Telethon tidak menghapusnya.
-            # Untuk menghindari error jika file sudah dihapus, kita cek lagi.
-            try:
-                # Jika file tidak diserahkan ke Telethon (karena ukuran atau error config), maka hapus di sini.
-                file_size_bytes_check = os.path.getsize(video_path)
-                if not (BOT_API_UPLOAD_LIMIT_BYTES < file_size_bytes_check <= USER_BOT_MAX_UPLOAD_BYTES and \
-                        all([TELEGRAM_API_ID, TELEGRAM_API_HASH, TELEGRAM_PHONE_NUMBER_UPLOADER])):
-                    os.remove(video_path)
-                    logger.info(f"File sementara {video_path} dihapus dari finally video_resolution_selected.")
-            except FileNotFoundError:
-                logger.info(f"File {video_path} sudah dihapus sebelumnya (mungkin oleh process_file_upload atau Telethon).")
-            except Exception as e_remove:
-                logger.error(f"Gagal hapus file {video_path} di finally video_res: {e_remove}")
+        # File dihapus oleh konsumen terakhir dari unduhan yang sama
+        singleflight.release(coalesce_key)
+    return None
+
+async def run_audio_job(query: Update.callback_query, context: ContextTypes.DEFAULT_TYPE, url: str, platform: str, format_id: str, preferred_format: str) -> dict | None:
+    """Mengunduh lalu mengirim audio; mengembalikan referensi media terkirim atau None."""
+    audio_plan = audio_pipeline.plan_for(url, format_id, preferred_format)
+    await query.edit_message_text(f"⚙️ Mengunduh audio ({format_id}, {audio_pipeline.describe(audio_plan)})... Mohon tunggu.")
+    coalesce_key = build_coalesce_key(url, format_id, f"audio-{preferred_format}")
+    progress.bind(coalesce_key)
+    editor = progress.watch(coalesce_key, query.message.chat_id, query.edit_message_text)
+    try:
+        try:
+            audio_path = await singleflight.acquire(
+                coalesce_key, lambda: fetch_audio(url, platform, format_id, preferred_format),
+                on_joined=lambda: prefetch.cancel(query.from_user.id, keep_key=coalesce_key)
+            )
+        finally:
+            await progress.unwatch(editor) # Pesan status berikutnya ditulis langsung
+        if audio_path and os.path.exists(audio_path):
+            return await process_file_upload(query, context, audio_path, AUDIO_CAPTION, is_video=False, platform=platform)
+        else:
+            logger.error(f"Download_audio mengembalikan path tidak valid atau file tidak ada: {audio_path} untuk URL {url}")
+            await query.edit_message_text("Maaf, gagal mengunduh audio dari sumbernya (file tidak ditemukan setelah download).")
+    except Exception as e:
+        logger.error(f"Error saat proses download_audio: {e}", exc_info=True)
+        await query.edit_message_text("Terjadi kesalahan saat mengunduh audio.")
+    finally:
+        singleflight.release(coalesce_key)
+    return None
+
+ALBUM_MEDIA = {'video': InputMediaVideo, 'photo': InputMediaPhoto, 'audio': InputMediaAudio}
+
+async def send_with_flood_retry(send, chat_id: int):
+    """Menjalankan send() dan mengulanginya sekali setelah menunggu jika terkena flood control."""
+    for attempt in range(2):
+        try:
+            return await send()
+        except RetryAfter as e:
+            # Album dihitung per item oleh flood control; tunggu sekali lalu kirim ulang
+            if attempt:
+                raise
+            wait = e.retry_after # int sekarang, timedelta di PTB versi mayor berikutnya
+            wait = wait.total_seconds() if hasattr(wait, 'total_seconds') else wait
+            logger.warning(f"Flood control saat mengirim ke {chat_id}, menunggu {wait} dtk.")
+            await asyncio.sleep(wait)
+
+async def send_album(bot, chat_id: int, album: list, kind: str, caption: str) -> int:
+    """Mengirim satu kelompok item batch sebagai album Bot API; foto di atas batas sendPhoto dikirim
+    sebagai dokumen, item di atas batas Bot API dikirim sendiri lewat pengunggah khusus jika tersedia.
+    Mengembalikan jumlah item yang terkirim."""
+    fits, documents, oversized = [], [], []
+    for item in album:
+        size = os.path.getsize(item['path'])
+        if size > BOT_API_UPLOAD_LIMIT_BYTES:
+            oversized.append(item)
+        elif batch.media_type(item['path'], kind) == 'photo' and size > batch.PHOTO_LIMIT_BYTES:
+            documents.append(item)
+        else:
+            fits.append(item)
+    sent = 0
+    if fits:
+        with contextlib.ExitStack() as stack:
+            media = [(batch.media_type(item['path'], kind), stack.enter_context(upload_source(item['path'], attach=len(fits) > 1)))
+                     for item in fits]
+            if len(media) == 1: # sendMediaGroup butuh minimal 2 item
+                media_type, source = media[0]
+                send = getattr(bot, f"send_{media_type}")
+                await send_with_flood_retry(
+                    lambda: send(chat_id=chat_id, caption=caption, write_timeout=None, **{media_type: source}), chat_id)
+            else:
+                await send_with_flood_retry(lambda: bot.send_media_group(chat_id=chat_id, write_timeout=None, media=[
+                    ALBUM_MEDIA[media_type](source, caption=caption if i == 0 else None)
+                    for i, (media_type, source) in enumerate(media)
+                ]), chat_id)
+        sent += len(fits)
+    for item in documents:
+        with upload_source(item['path']) as source:
+            await send_with_flood_retry(
+                lambda: bot.send_document(chat_id=chat_id, document=source, caption=caption, write_timeout=None), chat_id)
+        sent += 1
+    for item in oversized:
+        if os.path.getsize(item['path']) <= USER_BOT_MAX_UPLOAD_BYTES and telethon_uploader.is_available():
+            result = await telethon_uploader.upload(chat_id, item['path'], caption, is_video=kind == 'video')
+            if result['ok']:
+                sent += 1
+                continue
+            logger.error(f"Pengunggah Telethon gagal untuk item batch {item['path']}: {result['error']}")
+        else:
+            logger.warning(f"Item batch {item['path']} melebihi batas kirim, dilewati.")
+    return sent
+
+async def run_batch_job(query: Update.callback_query, context: ContextTypes.DEFAULT_TYPE, url: str, platform: str,
+                        kind: str, title: str, entries: list) -> dict | None:
+    """Mengunduh semua item playlist/carousel dan mengirimnya per album begitu tiap kelompok siap.
+
+    Tidak ada satu media yang bisa di-cache file_id-nya, jadi selalu mengembalikan None.
+    """
+    total = len(entries)
+    chat_id = query.message.chat_id
+    await query.edit_message_text(f"📚 Mengunduh {total} item dari \"{title}\" ({BATCH_CONCURRENCY} bersamaan)...")
+    failed, sent, skipped = [], 0, 0
+    tag = f"{chat_id}_{query.message.message_id}"
+    try:
+        async with contextlib.aclosing(batch.albums(url, entries, kind, tag, failed)) as albums:
+            async for album in albums:
+                try:
+                    delivered = await send_album(context.bot, chat_id, album, kind, caption=f"📚 {title}")
+                finally:
+                    batch.release(album)
+                sent += delivered
+                skipped += len(album) - delivered
+                await query.edit_message_text(f"📚 {sent}/{total} item terkirim. Melanjutkan...")
+    except Exception as e:
+        logger.error(f"Job batch untuk {url} ({platform}) berhenti: {e}", exc_info=True)
+        await query.edit_message_text(f"Terjadi kesalahan saat mengirim album ({sent}/{total} item terkirim).")
+        return None
+    summary = f"✅ {sent}/{total} item dari \"{title}\" terkirim."
+    if failed:
+        summary += f"\n⚠️ {len(failed)} item gagal diunduh."
+    if skipped:
+        summary += f"\n⚠️ {skipped} item terlalu besar atau gagal dikirim."
+    await query.edit_message_text(summary)
+    return None
+
+# Pekerjaan yang bisa diantrekan, dipakai scheduler lokal maupun worker (src/telegram/worker.py)
+JOB_RUNNERS = {'video': run_video_job, 'audio': run_audio_job, 'batch': run_batch_job}
+
+def claim_menu(query: Update.callback_query, context: ContextTypes.DEFAULT_TYPE) -> bool:
+    """False jika pilihan dari pesan menu ini sudah diproses. Dengan concurrent_updates, ketukan ganda
+    sampai sebelum state percakapan berpindah; dipanggil sebelum await pertama agar tidak saling mendahului."""
+    message_id = query.message.message_id
+    if context.user_data.get('submitted_menu') == message_id:
+        return False
+    context.user_data['submitted_menu'] = message_id
+    return True
+
+def end_conversation(context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Membuang data sesi, tapi tanda menu yang sudah dipakai tetap ada untuk ketukan ganda yang datang belakangan."""
+    submitted = context.user_data.get('submitted_menu')
     context.user_data.clear()
+    if submitted is not None:
+        context.user_data['submitted_menu'] = submitted
     return ConversationHandler.END
 
+async def video_resolution_selected_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    query = update.callback_query
+    if not claim_menu(query, context):
+        await query.answer()
+        return None # Ketukan ganda pada menu yang sudah diproses
+    await query.answer()
+    try:
+        _, _, format_id, platform = query.data.split('_', 3)
+    except ValueError:
+        await query.edit_message_text("Error: Data callback video tidak valid.")
+        return ConversationHandler.END
+    url = context.user_data.get('url')
+    if not url:
+        await query.edit_message_text("Sesi berakhir. /start lagi.")
+        return ConversationHandler.END
+    prefetch.record_choice(platform, f"video:{context.user_data.get('format_labels', {}).get(format_id, format_id)}")
+    prefetch.release_mismatch(query.from_user.id, build_coalesce_key(url, format_id, 'video'))
+    cache_key = build_cache_key(platform, url, format_id, 'mp4')
+    if cache_key and await send_cached_media(query, context, cache_key, VIDEO_CAPTION, is_video=True):
+        prefetch.cancel(query.from_user.id)
+        return end_conversation(context)
+    delivery = size_planner.plan(url, format_id, 'video', fallback_size=context.user_data.get('format_sizes', {}).get(format_id))
+    if delivery['route'] == 'reject':
+        prefetch.cancel(query.from_user.id)
+        if await reject_oversized(query, context, delivery, platform, 'video'):
+            context.user_data.pop('submitted_menu', None) # Pesan yang sama kini berisi pilihan baru
+            return SELECT_RESOLUTION_VIDEO
+        return end_conversation(context)
+    await submit_download_job(query, context, delivery['size_bytes'], 'video',
+                              {'url': url, 'platform': platform, 'format_id': format_id}, cache_key)
+    return end_conversation(context)
+
 async def audio_quality_selected_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     query = update.callback_query
+    if not claim_menu(query, context):
+        await query.answer()
+        return None # Ketukan ganda pada menu yang sudah diproses
     await query.answer()
     try:
         parts = query.data.split('_')
@@ -272,34 +700,42 @@ async def audio_quality_selected_callback(update: Update, context: ContextTypes.
     if not url:
         await query.edit_message_text("Sesi berakhir. /start lagi.")
         return ConversationHandler.END
-    await query.edit_message_text(f"⚙️ Mengunduh audio ({format_id_or_quality} sebagai {preferred_format})... Mohon tunggu.")
-    downloader = DOWNLOADER_MODULES.get(platform)
-    audio_path = None
+    prefetch.record_choice(platform, f"audio:{format_id_or_quality}")
+    prefetch.release_mismatch(query.from_user.id, build_coalesce_key(url, format_id, f"audio-{preferred_format}"))
+    cache_key = build_cache_key(platform, url, format_id, preferred_format)
+    if cache_key and await send_cached_media(query, context, cache_key, AUDIO_CAPTION, is_video=False):
+        prefetch.cancel(query.from_user.id)
+        return end_conversation(context)
+    delivery = size_planner.plan(url, format_id, 'audio', preferred_format, fallback_size=context.user_data.get('format_sizes', {}).get(format_id))
+    if delivery['route'] == 'reject':
+        prefetch.cancel(query.from_user.id)
+        await reject_oversized(query, context, delivery, platform, 'audio')
+        return end_conversation(context)
+    await submit_download_job(query, context, delivery['size_bytes'], 'audio',
+                              {'url': url, 'platform': platform, 'format_id': format_id, 'preferred_format': preferred_format}, cache_key)
+    return end_conversation(context)
+
+async def batch_selected_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    query = update.callback_query
+    if not claim_menu(query, context):
+        await query.answer()
+        return None # Ketukan ganda pada menu yang sudah diproses
+    await query.answer()
     try:
-        audio_path = await downloader.download_audio(url, format_id=format_id, preferred_format=preferred_format)
-        if audio_path and os.path.exists(audio_path):
-            await process_file_upload(query, context, audio_path, "🎵 Audio Selesai!\nTerimakasih sudah menggunakan bot ini 😊", is_video=False)
-        else:
-            logger.error(f"Download_audio mengembalikan path tidak valid atau file tidak ada: {audio_path} untuk URL {url}")
-            await query.edit_message_text("Maaf, gagal mengunduh audio dari sumbernya (file tidak ditemukan setelah download).")
-    except Exception as e:
-        logger.error(f"Error saat proses download_audio: {e}", exc_info=True)
-        await query.edit_message_text("Terjadi kesalahan saat mengunduh audio.")
-    finally:
-        # Logika penghapusan file sama seperti untuk video
-        if audio_path and os.path.exists(audio_path):
-            try:
-                file_size_bytes_check = os.path.getsize(audio_path)
-                if not (BOT_API_UPLOAD_LIMIT_BYTES < file_size_bytes_check <= USER_BOT_MAX_UPLOAD_BYTES and \
-                        all([TELEGRAM_API_ID, TELEGRAM_API_HASH, TELEGRAM_PHONE_NUMBER_UPLOADER])):
-                    os.remove(audio_path)
-                    logger.info(f"File sementara {audio_path} dihapus dari finally audio_quality_selected.")
-            except FileNotFoundError:
-                logger.info(f"File {audio_path} sudah dihapus sebelumnya.")
-            except Exception as e_remove:
-                logger.error(f"Gagal hapus file {audio_path} di finally audio_quality: {e_remove}")
-    context.user_data.clear()
-    return ConversationHandler.END
+        _, kind, platform = query.data.split('_', 2)
+    except ValueError:
+        await query.edit_message_text("Error: Data callback batch tidak valid.")
+        return ConversationHandler.END
+    url = context.user_data.get('url')
+    collection = context.user_data.get('batch')
+    if not url or not collection:
+        await query.edit_message_text("Sesi berakhir. /start lagi.")
+        return ConversationHandler.END
+    prefetch.cancel(query.from_user.id)
+    await submit_download_job(query, context, None, 'batch',
+                              {'url': url, 'platform': platform, 'kind': kind,
+                               'title': collection['title'], 'entries': collection['entries']}, None)
+    return end_conversation(context)
 
 async def cancel_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     text = "Operasi dibatalkan."
@@ -311,37 +747,168 @@ async def cancel_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         except BadRequest: pass
     else:
         await update.message.reply_text(text)
+    prefetch.cancel(update.effective_user.id)
     context.user_data.clear()
     return ConversationHandler.END
 
 async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> None:
     logger.error("Exception while handling an update:", exc_info=context.error)
 
+def collect_gauges() -> list:
+    """Kedalaman antrean dan keadaan subsistem saat scrape metrik."""
+    gauges = [
+        ('bot_scheduler_jobs', "Job di scheduler.", {'state': 'queued'}, scheduler.stats()['queued']),
+        ('bot_scheduler_jobs', "Job di scheduler.", {'state': 'running'}, scheduler.stats()['running']),
+        ('bot_telethon_upload_queue', "Unggahan Telethon yang mengantre.", {}, telethon_uploader.queue_size()),
+        ('bot_stalled_jobs', "Job tanpa progres melebihi PROGRESS_STALL_SECONDS.", {}, len(progress.stalled())),
+        ('bot_singleflight_inflight', "Unduhan unik yang sedang berjalan.", {}, singleflight.stats()['inflight']),
+        ('bot_prefetch_bytes', "Byte spekulatif yang sedang di-prefetch.", {}, prefetch.stats()['bytes_in_flight']),
+        ('bot_media_cache_bytes', "Ukuran cache media di disk.", {}, media_cache.total_bytes()),
+    ]
+    for kind, values in executor.stats().items():
+        for state, value in values.items():
+            gauges.append(('bot_executor_tasks', "Pekerjaan di pool executor.", {'pool': kind, 'state': state}, value))
+    if JOB_QUEUE_ENABLED:
+        for state, value in job_queue.stats().items():
+            gauges.append(('bot_job_queue_jobs', "Job di antrean bersama (semua worker).", {'state': state}, value))
+    return gauges
+
+async def apply_job_event(bot, event: dict) -> bool:
+    """Menerapkan satu event dari worker ke pesan status di chat. True jika job sudah tuntas."""
+    chat_id, message_id = event['chat_id'], event['message_id']
+    try:
+        if event['type'] == 'edit':
+            await bot.edit_message_text(event['payload']['text'], chat_id=chat_id, message_id=message_id)
+        elif event['type'] == 'delete':
+            await bot.delete_message(chat_id=chat_id, message_id=message_id)
+        elif event['type'] == 'failed':
+            logger.error(f"Job {event['job_id']} gagal di worker: {event['payload']['error']}")
+            await bot.edit_message_text("Terjadi kesalahan saat memproses unduhan. Silakan coba lagi.", chat_id=chat_id, message_id=message_id)
+    except BadRequest as e:
+        if 'not modified' not in str(e).lower():
+            logger.warning(f"Gagal menerapkan event {event['type']} job {event['job_id']}: {e}")
+    except Exception as e:
+        logger.warning(f"Gagal menerapkan event {event['type']} job {event['job_id']}: {e}")
+    if event['type'] == 'done':
+        remember_delivery(event['cache_key'], event['payload']['delivery'])
+    return event['type'] in ('done', 'failed')
+
+async def update_queue_positions(bot):
+    """Mengedit pesan job yang masih menunggu jika posisinya di antrean bersama berubah."""
+    current = {job['id']: job for job in job_queue.positions(JOB_QUEUE_ORIGIN)}
+    for job_id in [job_id for job_id in _queued_positions if job_id not in current]:
+        del _queued_positions[job_id] # Sudah diambil worker; pesannya kini diubah lewat event
+    for job_id, job in current.items():
+        if _queued_positions.get(job_id) == job['position']:
+            continue
+        _queued_positions[job_id] = job['position']
+        try:
+            await bot.edit_message_text(queue_position_text(job['position']), chat_id=job['chat_id'], message_id=job['message_id'])
+        except Exception as e:
+            logger.debug(f"Gagal memperbarui posisi antrean job {job_id}: {e}")
+
+async def relay_job_events(bot):
+    """Front-end: meneruskan status dan hasil job dari worker ke chat, berurutan per event."""
+    positions_at = 0.0
+    while True:
+        try:
+            events = job_queue.take_events(JOB_QUEUE_ORIGIN)
+            finished = [event['job_id'] for event in events if await apply_job_event(bot, event)]
+            if events:
+                job_queue.ack_events([event['id'] for event in events], finished)
+                continue
+            if time.monotonic() - positions_at >= QUEUE_POSITION_INTERVAL_SECONDS:
+                positions_at = time.monotonic()
+                await update_queue_positions(bot)
+        except Exception as e:
+            logger.error(f"Gagal membaca event antrean job: {e}", exc_info=True)
+        await asyncio.sleep(JOB_QUEUE_POLL_SECONDS)
+
+async def metrics_route():
+    return 200, 'text/plain; version=0.0.4; charset=utf-8', metrics.render()
+
+async def on_startup(application) -> None:
+    await telethon_uploader.start()
+    if METRICS_PORT:
+        metrics.register_gauges(collect_gauges)
+        application.bot_data['metrics_server'] = await http_server.serve(METRICS_HOST, METRICS_PORT, {'/metrics': metrics_route})
+    if JOB_QUEUE_ENABLED:
+        application.bot_data['job_relay'] = asyncio.create_task(relay_job_events(application.bot), name="job-relay")
+        logger.info(f"Antrean job bersama aktif (origin {JOB_QUEUE_ORIGIN}); unduhan dikerjakan worker.py.")
+
+async def on_shutdown(application) -> None:
+    metrics_server = application.bot_data.pop('metrics_server', None)
+    if metrics_server is not None:
+        metrics_server.close()
+    job_relay = application.bot_data.pop('job_relay', None)
+    if job_relay is not None:
+        job_relay.cancel()
+        await asyncio.gather(job_relay, return_exceptions=True)
+        job_queue.close()
+    prefetch.shutdown()
+    await scheduler.shutdown()
+    await telethon_uploader.stop()
+    executor.shutdown(wait=False)
+    file_id_cache.close()
+    media_cache.close()
+    rate_limit.close()
+
+# Hanya jenis update yang dipakai ConversationHandler; sisanya tidak perlu dikirim Telegram
+ALLOWED_UPDATES = [Update.MESSAGE, Update.CALLBACK_QUERY]
+
+def bot_api_urls() -> dict:
+    """Argumen base_url/base_file_url/local_mode untuk server Bot API sendiri, kosong jika memakai api.telegram.org."""
+    if not BOT_API_BASE_URL:
+        return {}
+    return {'base_url': f"{BOT_API_BASE_URL}/bot", 'base_file_url': f"{BOT_API_BASE_URL}/file/bot", 'local_mode': BOT_API_LOCAL_MODE}
+
 def run_bot():
-    application = (
+    builder = (
         ApplicationBuilder()
         .token(TELEGRAM_BOT_TOKEN)
         .connect_timeout(None)
         .read_timeout(None)
         .write_timeout(None)
         .pool_timeout(None)
-        .build()
+        .concurrent_updates(True)
+        .post_init(on_startup)
+        .post_shutdown(on_shutdown)
     )
+    api_urls = bot_api_urls()
+    if api_urls:
+        builder = builder.base_url(api_urls['base_url']).base_file_url(api_urls['base_file_url']).local_mode(api_urls['local_mode'])
+        logger.info(f"Memakai server Bot API {BOT_API_BASE_URL} (local mode: {BOT_API_LOCAL_MODE}, batas unggah {BOT_API_UPLOAD_LIMIT_BYTES // (1024 * 1024)} MB).")
+    application = builder.build()
+    url_message = MessageHandler(filters.TEXT & ~filters.COMMAND & filters.Regex(r'https?://'), url_message_handler)
     conv_handler = ConversationHandler(
-        entry_points=[CommandHandler('start', start_command)],
+        entry_points=[CommandHandler('start', start_command), url_message],
         states={
             SELECT_PLATFORM: [CallbackQueryHandler(platform_selected_callback, pattern='^platform_')],
             SELECT_DOWNLOAD_TYPE: [CallbackQueryHandler(download_type_selected_callback, pattern='^dltype_')],
             AWAIT_LINK: [MessageHandler(filters.TEXT & ~filters.COMMAND & filters.Regex(r'https?://'), link_received_handler)],
             SELECT_RESOLUTION_VIDEO: [CallbackQueryHandler(video_resolution_selected_callback, pattern='^res_video_')],
             SELECT_QUALITY_AUDIO: [CallbackQueryHandler(audio_quality_selected_callback, pattern='^res_audio_')],
+            SELECT_FORMAT: [
+                CallbackQueryHandler(video_resolution_selected_callback, pattern='^res_video_'),
+                CallbackQueryHandler(audio_quality_selected_callback, pattern='^res_audio_'),
+                CallbackQueryHandler(batch_selected_callback, pattern='^batch_'),
+            ],
         },
         fallbacks=[
-            CommandHandler('start', start_command), CommandHandler('cancel', cancel_handler),
+            CommandHandler('start', start_command), CommandHandler('cancel', cancel_handler), url_message,
             CallbackQueryHandler(cancel_handler, pattern='^cancel$'), ],
         per_user=True, conversation_timeout=None
     )
     application.add_handler(conv_handler)
     application.add_error_handler(error_handler)
-    logger.info("Bot siap dan mulai polling...")
-    application.run_polling(allowed_updates=Update.ALL_TYPES)
\ No newline at end of file
+    if BOT_MODE == 'webhook':
+        # Telegram hanya mengirim update dengan header secret yang cocok; PTB menolak sisanya dengan 403
+        logger.info(f"Bot siap, webhook mendengarkan di {WEBHOOK_LISTEN}:{WEBHOOK_PORT}/{WEBHOOK_PATH} ({WEBHOOK_URL}).")
+        application.run_webhook(
+            listen=WEBHOOK_LISTEN, port=WEBHOOK_PORT, url_path=WEBHOOK_PATH, webhook_url=WEBHOOK_URL,
+            secret_token=WEBHOOK_SECRET_TOKEN, allowed_updates=ALLOWED_UPDATES,
+            max_connections=WEBHOOK_MAX_CONNECTIONS
+        )
+    else:
+        logger.info("Bot siap dan mulai polling...")
+        application.run_polling(allowed_updates=ALLOWED_UPDATES)
\ No newline at end of file
@@ -20,7 +20,7 @@ def build_download_type_menu(platform: str) -> InlineKeyboardMarkup:
     keyboard = [
         [
             InlineKeyboardButton("🎬 Video", callback_data=f"dltype_video_{platform}"),
-            InlineKeyboardButton("🎵 Audio (MP3)", callback_data=f"dltype_audio_{platform}"),
+            InlineKeyboardButton("🎵 Audio", callback_data=f"dltype_audio_{platform}"),
         ],
         [InlineKeyboardButton("❌ Batal", callback_data="cancel")],
     ]
@@ -51,13 +51,14 @@ def build_audio_quality_menu(formats: list | None, platform: str) -> InlineKeybo
     keyboard = []
     MAX_BUTTONS = 10
     
-    keyboard.append([InlineKeyboardButton("🎵 Kualitas Terbaik (MP3)", callback_data=f"res_audio_best-mp3_{platform}")])
+    keyboard.append([InlineKeyboardButton("🎵 Kualitas Terbaik (tanpa konversi)", callback_data=f"res_audio_best-auto_{platform}")])
+    keyboard.append([InlineKeyboardButton("🎵 MP3 (192kbps)", callback_data=f"res_audio_best-mp3_{platform}")])
 
     if formats:
         formats.sort(key=lambda x: x.get('abr') if x.get('abr') is not None else 0, reverse=True)
         count = 0
         for f in formats:
-            if count >= MAX_BUTTONS -1 : break
+            if count >= MAX_BUTTONS - 2: break
             format_id = f.get('id', 'unknown')
             note = f.get('note', 'Audio')
             ext = f.get('ext', 'N/A').lower()
@@ -69,4 +70,31 @@ def build_audio_quality_menu(formats: list | None, platform: str) -> InlineKeybo
             
     if not keyboard: return None
     keyboard.append([InlineKeyboardButton("❌ Batal", callback_data="cancel")])
-    return InlineKeyboardMarkup(keyboard)
\ No newline at end of file
+    return InlineKeyboardMarkup(keyboard)
+
+def build_batch_rows(entry_count: int, platform: str) -> list:
+    """Tombol unduh semua item playlist/carousel, dikirim sebagai album."""
+    return [
+        [InlineKeyboardButton(f"📚 Semua {entry_count} item (Video/Foto)", callback_data=f"batch_video_{platform}")],
+        [InlineKeyboardButton(f"📚 Semua {entry_count} item (Audio)", callback_data=f"batch_audio_{platform}")],
+    ]
+
+def build_batch_menu(entry_count: int, platform: str) -> InlineKeyboardMarkup:
+    keyboard = build_batch_rows(entry_count, platform)
+    keyboard.append([InlineKeyboardButton("❌ Batal", callback_data="cancel")])
+    return InlineKeyboardMarkup(keyboard)
+
+def build_format_menu(video_formats: list | None, audio_formats: list | None, platform: str, batch_count: int = 0) -> InlineKeyboardMarkup | None:
+    """Menu gabungan video + audio untuk jalur cepat (link dikirim langsung), plus tombol batch jika link berisi banyak item."""
+    keyboard = build_batch_rows(batch_count, platform) if batch_count else []
+    video_menu = build_video_resolution_menu(video_formats or [], platform)
+    if video_menu:
+        for row in video_menu.inline_keyboard[:-1]: # Tanpa tombol batal
+            keyboard.append([InlineKeyboardButton(f"🎬 {b.text}", callback_data=b.callback_data) for b in row])
+    audio_menu = build_audio_quality_menu(audio_formats, platform)
+    if audio_menu:
+        for row in audio_menu.inline_keyboard[:-1]:
+            keyboard.append([InlineKeyboardButton(b.text if b.text.startswith("🎵") else f"🎵 {b.text}", callback_data=b.callback_data) for b in row])
+    if not keyboard: return None
+    keyboard.append([InlineKeyboardButton("❌ Batal", callback_data="cancel")])
+    return InlineKeyboardMarkup(keyboard)
@@ -4,5 +4,6 @@
     SELECT_DOWNLOAD_TYPE,
     AWAIT_LINK,
     SELECT_RESOLUTION_VIDEO,
-    SELECT_QUALITY_AUDIO
-) = range(5)
\ No newline at end of file
+    SELECT_QUALITY_AUDIO,
+    SELECT_FORMAT
+) = range(6)
\ No newline at end of file
@@ -0,0 +1,111 @@
+# src/telegram/worker.py
+import asyncio
+import logging
+import os
+import signal
+import socket
+from types import SimpleNamespace
+
+from telegram import Bot
+from telegram.request import HTTPXRequest
+
+from config import (
+    TELEGRAM_BOT_TOKEN, JOB_QUEUE_POLL_SECONDS, JOB_LEASE_SECONDS, WORKER_CONCURRENCY, METRICS_HOST, METRICS_PORT
+)
+from src.service import executor, info_cache, job_queue, media_cache, metrics, telethon_uploader
+from src.telegram.handlers import JOB_RUNNERS, bot_api_urls, collect_gauges, metrics_route
+from src.utils import http_server
+
+logger = logging.getLogger(__name__)
+
+# Worker mengambil job dari antrean bersama dan menjalankan JOB_RUNNERS yang sama dengan bot.
+# Pesan status tidak disentuh langsung: edit/hapus dikirim balik sebagai event ke front-end.
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+class QueuedQuery:
+    """Pengganti CallbackQuery untuk job dari antrean; perubahan pesan status menjadi event."""
+
+    def __init__(self, job: dict):
+        self.job_id = job['id']
+        self.message = SimpleNamespace(chat_id=job['chat_id'], message_id=job['message_id'])
+        self.from_user = SimpleNamespace(id=job['user_id'])
+
+    async def edit_message_text(self, text: str, **kwargs):
+        job_queue.post_event(self.job_id, 'edit', {'text': text})
+
+    async def delete_message(self):
+        job_queue.post_event(self.job_id, 'delete')
+
+async def _keep_lease(job_id: int):
+    while True:
+        await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+        if not job_queue.renew(job_id, WORKER_ID):
+            logger.warning(f"Lease job {job_id} hilang; job mungkin dikerjakan ulang worker lain.")
+            return
+
+async def _execute(bot: Bot, job: dict):
+    lease = asyncio.create_task(_keep_lease(job['id']), name=f"lease-{job['id']}")
+    delivery = None
+    try:
+        context = SimpleNamespace(bot=bot)
+        params = dict(job['params'])
+        info = params.pop('info', None)
+        if info:
+            info_cache.prime(params['url'], info) # Probe front-end dipakai ulang, tanpa ekstraksi kedua
+        delivery = await JOB_RUNNERS[job['kind']](QueuedQuery(job), context, **params)
+    except Exception as e:
+        logger.error(f"Job {job['id']} gagal di worker: {e}", exc_info=True)
+        job_queue.post_event(job['id'], 'edit', {'text': "Terjadi kesalahan saat memproses unduhan."})
+    finally:
+        lease.cancel()
+    job_queue.finish(job['id'], WORKER_ID, delivery)
+
+async def _claim_loop(bot: Bot, stop: asyncio.Event):
+    running = set()
+    while not stop.is_set():
+        job_queue.requeue_expired()
+        while len(running) < WORKER_CONCURRENCY:
+            job = job_queue.claim(WORKER_ID)
+            if job is None:
+                break
+            task = asyncio.create_task(_execute(bot, job), name=f"job-{job['id']}")
+            running.add(task)
+            task.add_done_callback(running.discard)
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=JOB_QUEUE_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+    # Berhenti dengan rapi: job yang belum selesai dikembalikan ke antrean untuk worker lain
+    for task in running:
+        task.cancel()
+    await asyncio.gather(*running, return_exceptions=True)
+    released = job_queue.release_worker(WORKER_ID)
+    if released:
+        logger.info(f"{released} job dikembalikan ke antrean.")
+
+async def _main():
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    request = HTTPXRequest(connect_timeout=None, read_timeout=None, write_timeout=None, pool_timeout=None,
+                           connection_pool_size=WORKER_CONCURRENCY * 2 + 2)
+    metrics_server = None
+    async with Bot(TELEGRAM_BOT_TOKEN, request=request, **bot_api_urls()) as bot:
+        await telethon_uploader.start()
+        if METRICS_PORT:
+            metrics.register_gauges(collect_gauges)
+            metrics_server = await http_server.serve(METRICS_HOST, METRICS_PORT, {'/metrics': metrics_route})
+        logger.info(f"Worker {WORKER_ID} siap ({WORKER_CONCURRENCY} job bersamaan).")
+        try:
+            await _claim_loop(bot, stop)
+        finally:
+            if metrics_server is not None:
+                metrics_server.close()
+            await telethon_uploader.stop()
+            executor.shutdown(wait=False)
+            media_cache.close()
+            job_queue.close()
+
+def run_worker():
+    asyncio.run(_main())
@@ -0,0 +1,103 @@
+# src/utils/canonical_url.py
+import asyncio
+import functools
+import logging
+import re
+import urllib.request
+from collections import OrderedDict
+from urllib.parse import urlsplit, parse_qs
+from src.utils.url_parser import identify_platform
+
+logger = logging.getLogger(__name__)
+
+# Identitas link: URL -> (platform, id video) tanpa akses jaringan.
+# Nama platform sama dengan extractor yt-dlp (huruf kecil), sehingga f"{platform}:{id}"
+# sama dengan info_cache.media_key() dari hasil probe.
+YOUTUBE_ID = re.compile(r"^[A-Za-z0-9_-]{11}$")
+YOUTUBE_PATH = re.compile(r"^/(?:shorts|embed|live|v|e)/([A-Za-z0-9_-]{11})(?:[/?#]|$)")
+TIKTOK_PATH = re.compile(r"^/(?:@[^/]+/(?:video|photo)|v|embed(?:/v2)?)/(\d{15,22})(?:\.html)?(?:[/?#]|$)")
+INSTAGRAM_PATH = re.compile(r"^/(?:[A-Za-z0-9_.]+/)?(?:p|reels?|tv)/([A-Za-z0-9_-]+)(?:[/?#]|$)")
+
+# Link pendek yang id-nya hanya bisa diketahui lewat redirect
+SHORT_LINK_HOSTS = ("vm.tiktok.com", "vt.tiktok.com")
+SHORT_LINK_PATHS = {"tiktok": re.compile(r"^/t/[A-Za-z0-9]+"), "instagram": re.compile(r"^/share/")}
+RESOLVE_TIMEOUT_SECONDS = 10
+RESOLVED_MAX_ENTRIES = 4096
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+
+_resolved = OrderedDict() # link pendek -> (platform, id)
+
+def _youtube_id(parts) -> str | None:
+    host = parts.hostname or ""
+    if host == "youtu.be" or host.endswith(".youtu.be"):
+        candidate = parts.path.strip("/").split("/")[0]
+        return candidate if YOUTUBE_ID.match(candidate) else None
+    match = YOUTUBE_PATH.match(parts.path)
+    if match:
+        return match.group(1)
+    if parts.path.rstrip("/") in ("/watch", "/attribution_link"):
+        query = parse_qs(parts.query)
+        candidate = (query.get("v") or [""])[0]
+        if not candidate and "u" in query: # attribution_link?u=/watch%3Fv%3DID
+            return _youtube_id(urlsplit("https://www.youtube.com" + query["u"][0]))
+        return candidate if YOUTUBE_ID.match(candidate) else None
+    return None
+
+@functools.lru_cache(maxsize=8192)
+def _parse(url: str) -> tuple[str, str] | None:
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return None
+    platform = identify_platform(url)
+    if platform == "youtube":
+        video_id = _youtube_id(parts)
+    elif platform == "tiktok":
+        match = TIKTOK_PATH.match(parts.path)
+        video_id = match.group(1) if match else None
+    elif platform == "instagram":
+        match = INSTAGRAM_PATH.match(parts.path)
+        video_id = match.group(1) if match else None
+    else:
+        video_id = None
+    return (platform, video_id) if video_id else None
+
+def canonicalize(url: str) -> tuple[str, str] | None:
+    """(platform, id) dari bentuk URL yang dikenal atau link pendek yang sudah di-resolve. Offline."""
+    return _parse(url) or _resolved.get(url)
+
+def is_short_link(url: str) -> bool:
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or "").lower()
+    if host in SHORT_LINK_HOSTS:
+        return True
+    pattern = SHORT_LINK_PATHS.get(identify_platform(url))
+    return bool(pattern and pattern.match(parts.path))
+
+def canonical_key(url: str) -> str | None:
+    """'<platform>:<id>' untuk kunci cache, None jika identitas belum diketahui."""
+    identity = canonicalize(url)
+    return f"{identity[0]}:{identity[1]}" if identity else None
+
+def _follow_redirects_sync(url: str) -> str:
+    request = urllib.request.Request(url, method="HEAD", headers={"User-Agent": USER_AGENT})
+    with urllib.request.urlopen(request, timeout=RESOLVE_TIMEOUT_SECONDS) as response:
+        return response.geturl()
+
+async def resolve(url: str) -> tuple[str, str] | None:
+    """Seperti canonicalize(), tetapi link pendek di-resolve sekali lewat redirect lalu di-cache."""
+    identity = canonicalize(url)
+    if identity or not is_short_link(url):
+        return identity
+    try:
+        final_url = await asyncio.to_thread(_follow_redirects_sync, url)
+    except Exception as e:
+        logger.warning(f"Gagal me-resolve link pendek {url}: {e}")
+        return None
+    identity = canonicalize(final_url)
+    if identity:
+        _resolved[url] = identity
+        while len(_resolved) > RESOLVED_MAX_ENTRIES:
+            _resolved.popitem(last=False)
+        logger.info(f"Link pendek {url} -> {identity[0]}:{identity[1]}")
+    return identity
@@ -0,0 +1,44 @@
+# src/utils/http_server.py
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Server HTTP/1.0 minimal di atas asyncio untuk endpoint internal (metrics, dsb.).
+# Hanya GET tanpa body; cukup untuk scraper Prometheus dan curl, tanpa dependensi tambahan.
+MAX_HEADER_BYTES = 16 * 1024
+STATUS_TEXT = {200: 'OK', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+async def _handle(reader, writer, routes: dict):
+    status, content_type, body = 500, 'text/plain; charset=utf-8', b''
+    try:
+        head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), timeout=10)
+        if len(head) > MAX_HEADER_BYTES:
+            raise ValueError("Header terlalu besar")
+        method, target, _ = head.split(b'\r\n', 1)[0].decode('latin-1').split(' ', 2)
+        handler = routes.get(target.split('?', 1)[0])
+        if handler is None:
+            status, body = 404, b'not found\n'
+        elif method != 'GET':
+            status, body = 405, b'method not allowed\n'
+        else:
+            status, content_type, text = await handler()
+            body = text.encode('utf-8')
+    except Exception as e:
+        logger.warning(f"Permintaan HTTP internal gagal: {e}")
+        body = b'error\n'
+    try:
+        writer.write(
+            f"HTTP/1.0 {status} {STATUS_TEXT.get(status, '')}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode('latin-1') + body
+        )
+        await writer.drain()
+    finally:
+        writer.close()
+
+async def serve(host: str, port: int, routes: dict) -> asyncio.Server:
+    """Menjalankan server; routes: path -> coroutine function tanpa argumen yang
+    mengembalikan (status, content_type, text)."""
+    server = await asyncio.start_server(lambda r, w: _handle(r, w, routes), host, port)
+    logger.info(f"Server HTTP internal berjalan di http://{host}:{port} ({', '.join(routes)}).")
+    return server
@@ -1,14 +1,30 @@
 # src/utils/url_parser.py
 import re
+from urllib.parse import urlsplit
+
+URL_PATTERN = re.compile(r"https?://[^\s<>\"']+", re.IGNORECASE)
+
+# Domain -> platform, dicocokkan dari akhiran host (m.youtube.com, vm.tiktok.com, dst.)
+PLATFORM_HOSTS = {
+    "youtube.com": "youtube",
+    "youtu.be": "youtube",
+    "youtube-nocookie.com": "youtube",
+    "instagram.com": "instagram",
+    "instagr.am": "instagram",
+    "tiktok.com": "tiktok",
+}
+
+def extract_url(text: str) -> str | None:
+    """Mengambil URL pertama dari teks pesan."""
+    match = URL_PATTERN.search(text or "")
+    return match.group(0) if match else None
 
 def identify_platform(url: str) -> str:
     """Mengidentifikasi platform media sosial dari URL."""
-    url = url.lower()
-    if re.search(r"(youtube\.com|youtu\.be)", url):
-        return "youtube"
-    elif "instagram.com" in url:
-        return "instagram"
-    elif re.search(r"(tiktok\.com|vm\.tiktok\.com|vt\.tiktok\.com)", url):
-        return "tiktok"
-    else:
-        return "other"
\ No newline at end of file
+    host = (urlsplit(url.strip()).hostname or "").rstrip(".")
+    labels = host.split(".")
+    for i in range(len(labels) - 1):
+        platform = PLATFORM_HOSTS.get(".".join(labels[i:]))
+        if platform:
+            return platform
+    return "other"
@@ -9,7 +9,8 @@ from dotenv import load_dotenv
 load_dotenv() # Muat variabel dari .env
 
 async def main_uploader(api_id_int, api_hash_str, phone_str, target_chat_id_str, file_path_str, caption_str):
-    session_name = f"user_session_{phone_str.replace('+', '')}"
+    # Nama sesi sama dengan pengunggah di dalam bot (config.TELETHON_SESSION_NAME)
+    session_name = os.getenv('TELETHON_SESSION_NAME') or f"user_session_{phone_str.replace('+', '')}"
     try:
         target_chat_id = int(target_chat_id_str)
     except ValueError:
@@ -9,7 +9,8 @@ from dotenv import load_dotenv
 load_dotenv()
 
 async def authenticate_session(api_id_int, api_hash_str, phone_str):
-    session_name = f"user_session_{phone_str.replace('+', '')}"
+    # TELETHON_SESSION_NAME dipakai untuk membuat sesi terpisah bagi tiap proses worker
+    session_name = os.getenv('TELETHON_SESSION_NAME') or f"user_session_{phone_str.replace('+', '')}"
     client = TelegramClient(session_name, api_id_int, api_hash_str)
 
     try:
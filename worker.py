@@ -0,0 +1,33 @@
+# worker.py
+import logging
+import os
+
+# Folder unduhan per proses, kecuali diatur sendiri lewat WORKER_TEMP_DIR (dibaca config.py saat import)
+os.environ.setdefault('WORKER_TEMP_DIR', os.path.join('downloads', f"worker_{os.getpid()}"))
+from src.telegram.worker import run_worker
+
+if not os.path.exists('logs'):
+    os.makedirs('logs')
+
+logging.basicConfig(
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    level=logging.INFO,
+    handlers=[
+        logging.StreamHandler(),
+        logging.FileHandler(f"logs/worker_{os.getpid()}.log")
+    ]
+)
+
+logger = logging.getLogger(__name__)
+
+# Proses worker untuk JOB_QUEUE_ENABLED=true: jalankan satu atau lebih di samping bot.py.
+# Setiap worker butuh MEDIA_CACHE_DIR dan TELETHON_SESSION_NAME sendiri; folder unduhannya
+# otomatis downloads/worker_<pid>/ (atau WORKER_TEMP_DIR).
+if __name__ == '__main__':
+    logger.info("Memulai worker dari worker.py...")
+    try:
+        run_worker()
+    except Exception as e:
+        logger.critical(f"Worker berhenti karena error fatal: {e}", exc_info=True)
+    finally:
+        logger.info("Worker berhenti.")